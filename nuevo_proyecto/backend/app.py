@@ -46,6 +46,7 @@ def create_app():
     # --- Imports de Módulos ---
     from .modules.auth import bp as auth_bp
     from .modules.ordenes import bp as ordenes_bp
+    from .modules.lista_ordenes import bp as lista_ordenes_bp
     from .modules.ordenes_pago import bp as ordenes_pago_bp
     from .modules.ingresos import bp as ingresos_bp
     from .modules.proveedores import bp as proveedores_bp
@@ -59,11 +60,13 @@ def create_app():
     from .modules.trabajadores import bp as trabajadores_bp
     from .modules.usuarios import bp as usuarios_bp
     from .rutas.pdf_orden_compra_routes import pdf_oc_bp
+    from .rutas.pdf_trabajos_routes import pdf_trabajos_bp
     from .rutas.graficos_presupuesto_routes import bp as graficos_presupuesto_bp
     from .modules.gastos_directos import bp as gastos_directos_bp
     from .modules.ordenes_no_recepcionadas import bp as ordenes_no_recepcionadas_bp
     from .modules.dashboard import bp as dashboard_bp
     from .modules.chatbot import bp as chatbot_bp
+    from .modules.cache_admin import bp as cache_admin_bp
 
     # --- Registro de Blueprints ---
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -71,6 +74,7 @@ def create_app():
     app.register_blueprint(bp_documentos_pendientes, url_prefix='/api/documentos-pendientes')
     app.register_blueprint(estado_presupuesto_bp, url_prefix='/api/estado-presupuesto')
     app.register_blueprint(ordenes_bp, url_prefix='/api/ordenes')
+    app.register_blueprint(lista_ordenes_bp, url_prefix='/api/lista-ordenes')
     app.register_blueprint(ordenes_pago_bp, url_prefix='/api/ordenes_pago')
     app.register_blueprint(ingresos_bp, url_prefix='/api/ingresos')
     app.register_blueprint(proveedores_bp, url_prefix='/api/proveedores')
@@ -84,8 +88,10 @@ def create_app():
     app.register_blueprint(ordenes_no_recepcionadas_bp, url_prefix='/api/ordenes-no-recepcionadas')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(pdf_oc_bp, url_prefix='/api')
+    app.register_blueprint(pdf_trabajos_bp, url_prefix='/api/pdf')
     app.register_blueprint(graficos_presupuesto_bp, url_prefix='/api')
     app.register_blueprint(chatbot_bp, url_prefix='/api/chatbot')
+    app.register_blueprint(cache_admin_bp, url_prefix='/api/cache')
 
     # ==========================================
     # ZONA SSO
@@ -1,20 +1,116 @@
 import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from backend.utils.cache import registrar_cache_local
+from backend.utils.typeahead import fold
+
+# Caché de respuestas del LLM: (namespace, hash del prompt normalizado) -> (texto, vence)
+LLM_CACHE_MAX = 1000
+LLM_CACHE_TTL = 3600  # segundos
+_llm_cache = OrderedDict()
+_llm_stats = {}  # namespace -> {"hits", "misses", "segundos_modelo"}
+_llm_lock = threading.Lock()
+
+_PUNTUACION = re.compile(r"[¿?¡!.,;:\"'«»]+")
+
+
 def is_db_available(db):
     """Verifica si la conexión a la BD es válida."""
     return db is not None
 
 
-def safe_generate(model, prompt, default=None):
-    """Envía un prompt a Gemini de forma segura."""
+def _clave_prompt(namespace, prompt):
+    """Prompt normalizado (sin tildes, mayúsculas, puntuación ni espacios de más)."""
+    normalizado = " ".join(_PUNTUACION.sub(" ", fold(prompt)).split())
+    return namespace, hashlib.sha1(normalizado.encode("utf-8")).hexdigest()
+
+
+def _stats_llm(namespace):
+    return _llm_stats.setdefault(namespace, {"hits": 0, "misses": 0, "segundos_modelo": 0.0})
+
+
+def safe_generate(model, prompt, default=None, namespace=None):
+    """
+    Envía un prompt a Gemini de forma segura.
+    Con namespace (p.ej. 'intencion', 'proyecto', 'proveedor') la respuesta se
+    guarda en caché por prompt normalizado: las preguntas repetidas no vuelven
+    a llamar al modelo. Los errores (default) no se guardan.
+    """
     if not model:
         return default
+
+    clave = None
+    if namespace:
+        clave = _clave_prompt(namespace, prompt)
+        with _llm_lock:
+            item = _llm_cache.get(clave)
+            if item is not None and item[1] > time.time():
+                _llm_cache.move_to_end(clave)
+                _stats_llm(namespace)["hits"] += 1
+                return item[0]
+            # El miss se cuenta antes de llamar al modelo: errores y timeouts también
+            _stats_llm(namespace)["misses"] += 1
+
+    inicio = time.time()
     try:
         response = model.generate_content(prompt)
-        return response.text.strip()
+        texto = response.text.strip()
     except Exception as e:
         print(f"⚠️ Error IA: {e}")
         return default
+    finally:
+        if clave is not None:
+            with _llm_lock:
+                _stats_llm(namespace)["segundos_modelo"] += time.time() - inicio
+
+    if clave is not None:
+        with _llm_lock:
+            _llm_cache[clave] = (texto, time.time() + LLM_CACHE_TTL)
+            _llm_cache.move_to_end(clave)
+            while len(_llm_cache) > LLM_CACHE_MAX:
+                _llm_cache.popitem(last=False)
+    return texto
+
+
+def estadisticas_llm():
+    """Aciertos por namespace y segundos de modelo ahorrados (estimados)."""
+    with _llm_lock:
+        entradas = {}
+        for ns, _ in _llm_cache:
+            entradas[ns] = entradas.get(ns, 0) + 1
+        por_namespace = {}
+        for ns, s in _llm_stats.items():
+            total = s["hits"] + s["misses"]
+            promedio = s["segundos_modelo"] / s["misses"] if s["misses"] else 0.0
+            por_namespace[ns] = {
+                "hits": s["hits"],
+                "misses": s["misses"],
+                "hit_ratio": round(s["hits"] / total, 3) if total else None,
+                "entradas": entradas.get(ns, 0),
+                "modelo_promedio_ms": round(promedio * 1000, 1),
+                "segundos_ahorrados": round(promedio * s["hits"], 1),
+            }
+        return {
+            "max_entradas": LLM_CACHE_MAX,
+            "ttl": LLM_CACHE_TTL,
+            "entradas": len(_llm_cache),
+            "namespaces": por_namespace,
+        }
+
+
+def _descartar_llm(namespace=None):
+    with _llm_lock:
+        if namespace is None:
+            _llm_cache.clear()
+        else:
+            for clave in [c for c in _llm_cache if c[0] == namespace]:
+                del _llm_cache[clave]
+
+
+registrar_cache_local("llm", estadisticas_llm, _descartar_llm)
 
 def format_money(value):
     """Formatea números a dinero chileno (CLP)."""
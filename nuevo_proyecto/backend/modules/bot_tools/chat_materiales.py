@@ -14,7 +14,7 @@ def procesar_consulta(texto_usuario, db, model=None):
 
         # Intentar extraer palabra clave con LLM si disponible
         prompt = f"Extrae SOLO la palabra clave del material en: '{texto_usuario}'"
-        material_key = safe_generate(model, prompt, default=None) or ''
+        material_key = safe_generate(model, prompt, default=None, namespace='material') or ''
         if not material_key:
             # fallback: tomar la última palabra si la frase contiene 'material' o 'precio'
             parts = texto_usuario.split()
@@ -17,7 +17,7 @@ def procesar_consulta(texto_usuario, db, model=None):
         lower = (texto_usuario or '').lower()
         if 'proveedor' in lower and is_db_available(db):
             prompt = f"Extrae SOLO el nombre del proveedor de: '{texto_usuario}'"
-            prov_name = safe_generate(model, prompt, default=None) or ''
+            prov_name = safe_generate(model, prompt, default=None, namespace='proveedor') or ''
             if not prov_name:
                 return "Indica el nombre del proveedor para listar sus órdenes."
             # Buscar proveedor y listar OCs
@@ -35,7 +35,7 @@ def procesar_consulta(texto_usuario, db, model=None):
         if any(k in lower for k in ['compra', 'compras']) and is_db_available(db):
             # Intentar extraer nombre del proyecto
             prompt = f"Extrae SOLO el nombre del proyecto de: '{texto_usuario}'"
-            proyecto_name = safe_generate(model, prompt, default=None) or ''
+            proyecto_name = safe_generate(model, prompt, default=None, namespace='proyecto') or ''
             proyecto_name = proyecto_name.strip()
             if not proyecto_name:
                 return "Indica el nombre del proyecto para listar las compras (ej: 'Compras proyecto Borgoño')"
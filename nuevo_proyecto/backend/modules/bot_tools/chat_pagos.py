@@ -1,3 +1,4 @@
+from backend.utils import resumen_financiero, typeahead
 from .base import is_db_available, safe_generate, format_money, extract_order_number
 
 def procesar_consulta(texto_usuario, db, model=None):
@@ -14,7 +15,7 @@ def procesar_consulta(texto_usuario, db, model=None):
         if any(k in texto_usuario.lower() for k in ['proveedor', 'deuda', 'deuda total', 'saldo']):
             # intentar extraer nombre del proveedor con LLM si está disponible
             prompt = f"Extrae SOLO el nombre de proveedor del texto: '{texto_usuario}'"
-            prov_name = safe_generate(model, prompt, default=None) or ''
+            prov_name = safe_generate(model, prompt, default=None, namespace='proveedor') or ''
             if not prov_name:
                 # si no podemos extraer, preguntar al usuario
                 return "¿Podrías indicar el nombre del proveedor? (ej: 'Deuda de Disantel')"
@@ -65,29 +66,18 @@ def estado_pago_por_oc(numero_oc, db):
 
 
 def deuda_proveedor(nombre_proveedor, db):
-    """Calcula deuda total por proveedor (suma ordenes de pago menos abonos)."""
+    """Deuda total por proveedor (ordenes de pago menos abonos), desde el resumen precalculado."""
     try:
-        res_prov = db.table('proveedores').select('id, nombre, rut').ilike('nombre', f'%{nombre_proveedor}%').limit(1).execute()
-        if not res_prov.data:
+        encontrados = typeahead.buscar('proveedores', nombre_proveedor, limite=1)
+        if not encontrados:
             return f"No encontré al proveedor '{nombre_proveedor}'"
 
-        prov = res_prov.data[0]
-        prov_id = prov['id']
-
-        res_op = db.table('orden_de_pago').select('costo_final_con_iva, orden_numero').eq('proveedor', prov_id).execute()
-        if not res_op.data:
+        prov = encontrados[0]
+        r = resumen_financiero.resumen_proveedor(prov['id'])
+        if not r["ordenes_pago"]:
             return f"No hay ordenes de pago registradas para {prov['nombre']}."
 
-        total_deuda = sum([op.get('costo_final_con_iva', 0) or 0 for op in res_op.data])
-        op_ids = [op['orden_numero'] for op in res_op.data]
-
-        total_pagado = 0
-        if op_ids:
-            res_abonos = db.table('abonos_op').select('monto_abono').in_('orden_numero', op_ids).execute()
-            total_pagado = sum([ab.get('monto_abono', 0) or 0 for ab in res_abonos.data]) if res_abonos.data else 0
-
-        saldo = total_deuda - total_pagado
-        return f"{prov['nombre']} (RUT: {prov.get('rut','N/A')}): Deuda total {format_money(total_deuda)} - Pagado {format_money(total_pagado)} - Saldo {format_money(saldo)}"
+        return f"{prov['nombre']} (RUT: {prov.get('rut') or 'N/A'}): Deuda total {format_money(r['deuda'])} - Pagado {format_money(r['pagado'])} - Saldo {format_money(r['saldo'])}"
 
     except Exception as e:
         try:
@@ -19,7 +19,7 @@ def procesar_consulta(texto_usuario, db, model):
         Responde SOLO con el dato extraído.
         """
         try:
-            busqueda = safe_generate(model, prompt, default=None)
+            busqueda = safe_generate(model, prompt, default=None, namespace='proveedor')
             if busqueda:
                 busqueda = busqueda.strip().replace('"', '').replace("'", "")
         except Exception:
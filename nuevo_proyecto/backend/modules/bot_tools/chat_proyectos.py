@@ -1,5 +1,6 @@
 import re
 from flask import current_app
+from backend.utils import resumen_financiero
 from .base import safe_generate, is_db_available, format_money
 
 def procesar_consulta(texto_usuario, db, model):
@@ -22,7 +23,7 @@ def procesar_consulta(texto_usuario, db, model):
         Responde SOLO con el dato extraído.
         """
         try:
-            busqueda = safe_generate(model, prompt, default='NONE')
+            busqueda = safe_generate(model, prompt, default='NONE', namespace='proyecto')
             if busqueda:
                 busqueda = busqueda.strip().replace('"', '').replace("'", "")
         except Exception:
@@ -67,33 +68,14 @@ def procesar_consulta(texto_usuario, db, model):
         p = res.data[0]
         p_id = p['id']
 
-        # --- CÁLCULO FINANCIERO ---
-        # 1) Presupuesto total (tabla 'presupuesto')
-        try:
-            presup_data = db.table('presupuesto').select('monto').eq('proyecto_id', p_id).execute()
-            total_presupuesto = sum([float(x.get('monto', 0) or 0) for x in (presup_data.data or [])])
-        except Exception:
-            total_presupuesto = 0
-
-        # 2) Órdenes de pago (tabla 'orden_de_pago')
-        try:
-            ops = db.table('orden_de_pago').select('costo_final_con_iva, orden_numero').eq('proyecto', p_id).execute()
-            ordenes_pago = ops.data or []
-            total_ordenes_pago = sum([float(op.get('costo_final_con_iva', 0) or 0) for op in ordenes_pago])
-            cantidad_ordenes_pago = len(ordenes_pago)
-        except Exception:
-            total_ordenes_pago = 0
-            cantidad_ordenes_pago = 0
-
-        # 3) Gastos directos
-        try:
-            gd = db.table('gastos_directos').select('monto').eq('proyecto_id', p_id).execute()
-            gastos_directos = gd.data or []
-            total_gastos_directos = sum([float(g.get('monto', 0) or 0) for g in gastos_directos])
-        except Exception:
-            total_gastos_directos = 0
+        # --- CÁLCULO FINANCIERO (resumen precalculado) ---
+        r = resumen_financiero.resumen_proyecto(p_id)
+        total_presupuesto = r["presupuesto"]
+        total_ordenes_pago = r["total_ordenes_pago"]
+        cantidad_ordenes_pago = r["ordenes_pago"]
+        total_gastos_directos = r["gastos_directos"]
 
-        total_real = total_ordenes_pago + total_gastos_directos
+        total_real = r["total_real"]
         total_fmt = format_money(total_real)
         total_presupuesto_fmt = format_money(total_presupuesto)
         total_ordenes_pago_fmt = format_money(total_ordenes_pago)
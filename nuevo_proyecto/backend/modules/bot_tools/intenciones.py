@@ -0,0 +1,191 @@
+# backend/modules/bot_tools/intenciones.py
+"""
+Clasificador de intención por reglas, previo al LLM.
+
+Cada intención tiene reglas (regex compiladas sobre el texto plegado: sin
+tildes y en minúsculas) con un peso. El puntaje de una intención es la suma
+de los pesos de sus reglas que coinciden, y la confianza es la fracción del
+puntaje total que se lleva la mejor. Si la mejor no alcanza PUNTAJE_MINIMO y
+CONFIANZA_MINIMA el mensaje es ambiguo y se deja al LLM (ver
+clasificar_intencion en chatbot.py).
+
+MUESTRAS son mensajes del trace (/chatbot/trace) etiquetados a mano;
+evaluar() mide exactitud y cobertura de las reglas sobre ellas.
+"""
+import re
+from backend.utils.typeahead import fold
+from .base import extract_order_number
+
+INTENCIONES = ("PROVEEDORES", "PROYECTOS", "PAGOS", "ORDENES", "MATERIALES", "ESTADO_OC", "CHARLA")
+
+PUNTAJE_MINIMO = 2
+CONFIANZA_MINIMA = 0.65
+
+_REGLAS = {
+    "PAGOS": [
+        (r"\b(deudas?|debemos|debe|adeud\w*|saldos?)\b", 3),
+        (r"\b(pagos?|pagad[oa]s?|pagar|abonos?|abonad[oa]s?)\b", 3),
+        # "deuda proveedor X" la responde chat_pagos, no la ficha del proveedor
+        (r"\b(deudas?|saldos?|debemos|pagos?|pagad[oa]s?)\b.*\bproveedor", 4),
+        (r"\bordenes? de pago\b|\bops?\b", 2),
+    ],
+    "PROVEEDORES": [
+        (r"\bproveedor(es)?\b", 3),
+        (r"\brut\b", 2),
+        (r"\b(fono|telefono|celular|correo|e?mail|contacto)\b", 2),
+        (r"\b(banco|cuenta corriente|datos bancarios|paguese a)\b", 2),
+    ],
+    "PROYECTOS": [
+        (r"\b(proyectos?|obras?)\b", 3),
+        (r"\b(presupuestos?|gastos?|estado financiero|finanzas)\b", 2),
+    ],
+    "ORDENES": [
+        (r"\bordene?s? de compras?\b", 4),
+        (r"\bocs?\b", 3),
+        (r"\b(compras?|pedidos?)\b", 2),
+    ],
+    "MATERIALES": [
+        (r"\bmateriale?s?\b", 3),
+        (r"\bstock\b", 3),
+        (r"\b(precios?|codigo)\b", 2),
+    ],
+    "CHARLA": [
+        (r"^(hola|holi|buen[oa]s?( dias| tardes| noches)?|saludos|gracias|muchas gracias|ok|okay|vale|chao|adios|hasta luego)\b", 3),
+        (r"\b(quien eres|que puedes hacer|como funcionas|ayuda)\b", 3),
+    ],
+}
+
+REGLAS = {
+    intencion: [(re.compile(patron), peso) for patron, peso in reglas]
+    for intencion, reglas in _REGLAS.items()
+}
+
+
+def puntajes(texto):
+    """Dict intención -> puntaje (solo las que tienen alguna regla que coincide)."""
+    plegado = fold(texto)
+    resultado = {}
+    for intencion, reglas in REGLAS.items():
+        puntaje = sum(peso for patron, peso in reglas if patron.search(plegado))
+        if puntaje:
+            resultado[intencion] = puntaje
+    return resultado
+
+
+def clasificar(texto):
+    """
+    Clasificación por reglas. Devuelve un dict con:
+      intencion: la mejor intención ('ESTADO_OC|<n>' si hay número de OC) o None
+      confianza: 0..1
+      decidido:  True si no hace falta consultar al LLM
+      puntajes:  puntaje por intención
+    """
+    texto = texto or ""
+    scores = puntajes(texto)
+
+    # Un número de OC es inequívoco; si además habla de pagos va a chat_pagos
+    oc_num = extract_order_number(texto)
+    if oc_num:
+        intencion = "PAGOS" if scores.get("PAGOS", 0) >= 3 else f"ESTADO_OC|{oc_num}"
+        return {"intencion": intencion, "confianza": 1.0, "decidido": True, "puntajes": scores}
+
+    if not scores:
+        return {"intencion": None, "confianza": 0.0, "decidido": False, "puntajes": scores}
+
+    mejor = max(scores, key=scores.get)
+    confianza = scores[mejor] / sum(scores.values())
+    decidido = scores[mejor] >= PUNTAJE_MINIMO and confianza >= CONFIANZA_MINIMA
+    return {
+        "intencion": mejor,
+        "confianza": round(confianza, 2),
+        "decidido": decidido,
+        "puntajes": scores,
+    }
+
+
+def normalizar_respuesta_llm(respuesta):
+    """Lleva la respuesta del LLM a una intención conocida (o None)."""
+    if not respuesta:
+        return None
+    limpia = respuesta.replace('"', '').replace("'", "").strip().upper()
+    for intencion in INTENCIONES:
+        if limpia.startswith(intencion):
+            if intencion == "ESTADO_OC":
+                numero = re.search(r"\d+", limpia)
+                return f"ESTADO_OC|{numero.group(0)}" if numero else None
+            return intencion
+    return None
+
+
+# Mensajes del trace etiquetados a mano (texto, intención esperada)
+MUESTRAS = [
+    ("OC 3529", "ESTADO_OC"),
+    ("estado de la orden 3610", "ESTADO_OC"),
+    ("como va el pedido #4102", "ESTADO_OC"),
+    ("pagos de la OC 3529", "PAGOS"),
+    ("cuanto se ha pagado de la orden 3777", "PAGOS"),
+    ("deuda proveedor Disantel", "PAGOS"),
+    ("cuanto le debemos a Sodimac", "PAGOS"),
+    ("saldo del proveedor Ferretería Imperial", "PAGOS"),
+    ("pagos pendientes", "PAGOS"),
+    ("ordenes de pago de esta semana", "PAGOS"),
+    ("abonos de Easy", "PAGOS"),
+    ("datos del proveedor Disantel", "PROVEEDORES"),
+    ("rut de Sodimac", "PROVEEDORES"),
+    ("correo de Construmart", "PROVEEDORES"),
+    ("lista de proveedores", "PROVEEDORES"),
+    ("telefono de contacto de Easy", "PROVEEDORES"),
+    ("datos bancarios de Imperial", "PROVEEDORES"),
+    ("ver obras", "PROYECTOS"),
+    ("cuales son los proyectos activos", "PROYECTOS"),
+    ("estado financiero Huawei", "PROYECTOS"),
+    ("gastos de Borgoño", "PROYECTOS"),
+    ("presupuesto de la obra Borgoño", "PROYECTOS"),
+    ("proyecto Santa Rosa", "PROYECTOS"),
+    ("ordenes de compra de Disantel", "ORDENES"),
+    ("ultimas compras", "ORDENES"),
+    ("ocs del proveedor Sodimac", "ORDENES"),
+    ("material cemento", "MATERIALES"),
+    ("hay stock de arena", "MATERIALES"),
+    ("precio del fierro 12", "MATERIALES"),
+    ("buscar materiales eléctricos", "MATERIALES"),
+    ("hola", "CHARLA"),
+    ("buenos días", "CHARLA"),
+    ("gracias!", "CHARLA"),
+    ("que puedes hacer", "CHARLA"),
+    ("Borgoño", "PROYECTOS"),
+    ("necesito saber lo de ayer", "CHARLA"),
+    ("compras del proyecto Borgoño", "ORDENES"),
+]
+
+
+def evaluar(muestras=None):
+    """
+    Exactitud y cobertura de las reglas sobre muestras etiquetadas.
+      cobertura: fracción decidida por reglas (sin LLM)
+      exactitud: aciertos entre las decididas
+    'ambiguas' y 'errores' listan los casos para ajustar reglas.
+    """
+    muestras = MUESTRAS if muestras is None else muestras
+    decididas = aciertos = 0
+    errores, ambiguas = [], []
+    for texto, esperada in muestras:
+        r = clasificar(texto)
+        if not r["decidido"]:
+            ambiguas.append({"texto": texto, "esperada": esperada, "puntajes": r["puntajes"]})
+            continue
+        decididas += 1
+        obtenida = r["intencion"].split("|")[0]
+        if obtenida == esperada:
+            aciertos += 1
+        else:
+            errores.append({"texto": texto, "esperada": esperada, "obtenida": obtenida})
+    total = len(muestras)
+    return {
+        "muestras": total,
+        "decididas": decididas,
+        "cobertura": round(decididas / total, 3) if total else None,
+        "exactitud": round(aciertos / decididas, 3) if decididas else None,
+        "errores": errores,
+        "ambiguas": ambiguas,
+    }
@@ -0,0 +1,108 @@
+"""
+Administración de cachés: métricas, invalidación y precalentamiento.
+
+Cubre las funciones con @cache_result (Redis + L1) y las cachés en memoria
+registradas con registrar_cache_local (pagos, catálogos, recepciones).
+
+Solo para usuarios con el módulo de administración (MODULOS_ADMIN): vaciar
+una caché afecta a todos los workers y /warmup dispara llamadas a la API.
+"""
+from flask import Blueprint, request, jsonify, current_app
+from backend.utils.decorators import token_required, modulo_required
+from backend.utils.cache import (
+    resumen_cache, invalidate, vaciar_cache_local, precalentar_cache_local,
+    asegurar_suscripcion,
+)
+
+bp = Blueprint("cache_admin", __name__)
+
+MAX_WARMUP_URLS = 50
+MODULOS_ADMIN = ("Administración", "Administracion")
+
+
+@bp.before_app_request
+def _suscribir_invalidaciones():
+    # Cada worker necesita escuchar los avisos aunque no use @cache_result
+    asegurar_suscripcion()
+
+
+@bp.route("/stats", methods=["GET"])
+@token_required
+@modulo_required(*MODULOS_ADMIN)
+def get_stats(current_user):
+    """
+    Métricas por función, por etiqueta y de las cachés en memoria.
+    ?medir=0 omite el conteo de entradas/bytes en Redis (usa SCAN).
+    """
+    try:
+        medir = request.args.get("medir", "1") != "0"
+        return jsonify({"success": True, "data": resumen_cache(medir=medir)})
+    except Exception as e:
+        current_app.logger.error(f"Error obteniendo métricas de caché: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@bp.route("/invalidate", methods=["POST"])
+@token_required
+@modulo_required(*MODULOS_ADMIN)
+def invalidate_tags(current_user):
+    """
+    Invalida etiquetas de @cache_result.
+    Body: {"tags": ["proveedores", "get_listado_ordenes"], "motivo": "..."}
+    """
+    data = request.get_json() or {}
+    tags = [str(t).strip() for t in data.get("tags") or [] if str(t).strip()]
+    if not tags:
+        return jsonify({"success": False, "message": "Debe indicar al menos una etiqueta"}), 400
+
+    motivo = data.get("motivo") or f"admin:{current_user.get('nombre') or current_user.get('user_id')}"
+    invalidate(*tags, motivo=motivo)
+    current_app.logger.info(f"🧹 Caché invalidada por admin: {tags} ({motivo})")
+    return jsonify({"success": True, "invalidadas": tags})
+
+
+@bp.route("/flush/<string:nombre>", methods=["POST"])
+@token_required
+@modulo_required(*MODULOS_ADMIN)
+def flush_local(current_user, nombre):
+    """Vacía una caché en memoria (pagos, catalogos, recepciones) en todos los workers."""
+    data = request.get_json(silent=True) or {}
+    motivo = data.get("motivo") or f"admin:{current_user.get('nombre') or current_user.get('user_id')}"
+    if not vaciar_cache_local(nombre, motivo):
+        return jsonify({"success": False, "message": f"Caché desconocida: {nombre}"}), 404
+    return jsonify({"success": True, "vaciada": nombre})
+
+
+@bp.route("/warmup", methods=["POST"])
+@token_required
+@modulo_required(*MODULOS_ADMIN)
+def warmup(current_user):
+    """
+    Precalienta cachés.
+    Body: {
+        "locales": ["catalogos", "pagos"],           # en este worker
+        "urls": ["/api/ordenes/helpers/autocomplete/proveedores"]  # GET con el token del admin
+    }
+    Las URLs llenan Redis, que es compartido por todos los workers.
+    """
+    data = request.get_json() or {}
+    resultado = {"locales": {}, "urls": {}}
+
+    for nombre in data.get("locales") or []:
+        try:
+            resultado["locales"][nombre] = "ok" if precalentar_cache_local(nombre) else "no precalentable"
+        except Exception as e:
+            current_app.logger.error(f"Error precalentando {nombre}: {str(e)}")
+            resultado["locales"][nombre] = f"error: {e}"
+
+    urls = [u for u in data.get("urls") or [] if isinstance(u, str) and u.startswith("/api/")]
+    if len(urls) > MAX_WARMUP_URLS:
+        return jsonify({"success": False, "message": f"Máximo {MAX_WARMUP_URLS} URLs por llamada"}), 400
+    if urls:
+        client = current_app.test_client()
+        headers = {"Authorization": request.headers.get("Authorization", "")}
+        for url in urls:
+            resp = client.get(url, headers=headers)
+            resultado["urls"][url] = resp.status_code
+
+    return jsonify({"success": True, "data": resultado})
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, current_app, jsonify
 from collections import deque
 import time
+import threading
 import logging
 import requests
 import google.generativeai as genai
@@ -9,7 +10,10 @@ import json
 
 # IMPORTAMOS TUS ESPECIALISTAS (INTACTOS)
 from .bot_tools import chat_proveedores, operaciones, chat_proyectos, chat_pagos, chat_ordenes, chat_materiales
-from .bot_tools.base import extract_order_number, safe_generate
+from .bot_tools import intenciones
+from .bot_tools.base import extract_order_number, safe_generate, estadisticas_llm
+from backend.utils.cola_mensajes import ColaMensajes, BackendRedis
+from backend.utils.cache import redis_client
 
 bp = Blueprint("chatbot", __name__)
 
@@ -22,6 +26,11 @@ VERIFY_TOKEN = os.environ.get("META_VERIFY_TOKEN")      # Tu contraseña inventa
 WHATSAPP_TOKEN = os.environ.get("META_WHATSAPP_TOKEN")  # Token (comienza con EAA...)
 PHONE_NUMBER_ID = os.environ.get("META_PHONE_ID")       # ID del teléfono (no el número, el ID)
 
+# Cola de procesamiento del webhook: "memoria" (default) o "redis"
+COLA_BACKEND = os.environ.get("CHATBOT_COLA", "memoria")
+COLA_WORKERS = int(os.environ.get("CHATBOT_COLA_WORKERS", "4"))
+COLA_MAX = int(os.environ.get("CHATBOT_COLA_MAX", "1000"))
+
 GEMINI_KEY = os.environ.get("GEMINI_API_KEY")
 model = None
 
@@ -39,19 +48,67 @@ else:
     logger.warning("⚠️ FALTA LA CLAVE GEMINI")
 
 
+# ==========================================
+# COLA DE MENSAJES ENTRANTES
+# ==========================================
+# El webhook solo encola y responde 200; los hilos de la cola clasifican,
+# consultan y responden a Meta. Necesitan la app para current_app.
+
+_cola_estado = {"cola": None, "app": None}
+
+
+def _procesar_desde_cola(message_data):
+    with _cola_estado["app"].app_context():
+        procesar_mensaje_entrante(message_data)
+
+
+def get_cola():
+    """Cola del chatbot (se crea la primera vez que se usa)."""
+    if _cola_estado["cola"] is None:
+        backend = None
+        if COLA_BACKEND == "redis" and redis_client is not None:
+            backend = BackendRedis(redis_client, "chatbot", COLA_WORKERS, COLA_MAX)
+        _cola_estado["cola"] = ColaMensajes(
+            "chatbot",
+            _procesar_desde_cola,
+            clave_orden=lambda m: m.get("from"),
+            clave_dedupe=lambda m: m.get("id"),
+            workers=COLA_WORKERS,
+            max_items=COLA_MAX,
+            backend=backend,
+        )
+    return _cola_estado["cola"]
+
+
+def encolar_mensaje(message_data):
+    """Encola un mensaje de texto de Meta. Devuelve el resultado de la cola."""
+    if _cola_estado["app"] is None:
+        _cola_estado["app"] = current_app._get_current_object()
+    return get_cola().encolar(message_data)
+
+
 @bp.route('/health', methods=['GET'])
 def chatbot_health():
     """Estado de salud del bot."""
+    cola = _cola_estado["cola"]
     return {
         'status': 'ok',
         'provider': 'meta_cloud_api',
-        'llm': bool(model)
+        'llm': bool(model),
+        'cola': cola.estadisticas() if cola else None
     }
 
 @bp.route('/trace', methods=['GET'])
 def chatbot_trace():
     """Historial de debug."""
-    return jsonify({'success': True, 'items': list(INTERACTIONS)[:50]})
+    cola = _cola_estado["cola"]
+    return jsonify({
+        'success': True,
+        'items': list(INTERACTIONS)[:50],
+        'cola': cola.estadisticas() if cola else None,
+        'router': estadisticas_router(),
+        'llm_cache': estadisticas_llm()
+    })
 
 
 def enviar_mensaje_meta(telefono, texto):
@@ -81,32 +138,71 @@ def enviar_mensaje_meta(telefono, texto):
             logger.error(f"Detalle Meta: {response.text}")
 
 
-def clasificar_intencion(texto):
-    """Misma lógica de clasificación que ya tenías."""
-    # 1. Heurísticas rápidas
-    oc_num = extract_order_number(texto)
-    if oc_num: return f"ESTADO_OC|{oc_num}"
+_router_stats = {"regla": 0, "llm": 0, "sin_llm": 0, "llm_invalido": 0}
+_router_lock = threading.Lock()
 
-    lower = texto.lower()
-    if any(k in lower for k in ['proveedor', 'rut', 'fono', 'correo']): return 'PROVEEDORES'
-    if any(k in lower for k in ['proyecto', 'obra']): return 'PROYECTOS'
-    if any(k in lower for k in ['deuda', 'pago', 'saldo']): return 'PAGOS'
-    if any(k in lower for k in ['orden', 'oc ', 'compra']): return 'ORDENES'
-    if any(k in lower for k in ['material', 'stock']): return 'MATERIALES'
 
-    # 2. Fallback LLM
-    if not model: return 'CHARLA'
+def _contar_ruta(fuente):
+    with _router_lock:
+        _router_stats[fuente] += 1
 
+
+def clasificar_intencion(texto, detalle=None):
+    """
+    Clasifica primero con reglas (bot_tools/intenciones.py) y consulta al LLM
+    solo si el mensaje es ambiguo. Si se pasa un dict en detalle, se anota
+    la fuente (regla / llm / sin_llm) y la confianza.
+    """
+    detalle = detalle if detalle is not None else {}
+
+    # 1. Reglas
+    r = intenciones.clasificar(texto)
+    detalle["confianza"] = r["confianza"]
+    if r["decidido"]:
+        detalle["fuente"] = "regla"
+        _contar_ruta("regla")
+        return r["intencion"]
+
+    # Sin LLM: la mejor regla, aunque sea ambigua
+    respaldo = r["intencion"] or 'CHARLA'
+    if not model:
+        detalle["fuente"] = "sin_llm"
+        _contar_ruta("sin_llm")
+        return respaldo
+
+    # 2. Fallback LLM
     prompt = f"""
     Analiza: "{texto}"
-    Clasifica en: PROVEEDORES, PROYECTOS, ESTADO_OC|Numero, PAGOS, o CHARLA.
+    Clasifica en: PROVEEDORES, PROYECTOS, ESTADO_OC|Numero, PAGOS, ORDENES, MATERIALES o CHARLA.
     Solo responde la categoría.
     """
-    try:
-        respuesta = safe_generate(model, prompt, default='CHARLA')
-        return respuesta.replace('"', '').strip() if respuesta else 'CHARLA'
-    except:
-        return 'CHARLA'
+    respuesta = intenciones.normalizar_respuesta_llm(safe_generate(model, prompt, default=None, namespace='intencion'))
+    if respuesta is None:
+        detalle["fuente"] = "llm_invalido"
+        _contar_ruta("llm_invalido")
+        return respaldo
+    detalle["fuente"] = "llm"
+    _contar_ruta("llm")
+    return respuesta
+
+
+def estadisticas_router():
+    with _router_lock:
+        stats = dict(_router_stats)
+    total = sum(stats.values())
+    stats["total"] = total
+    stats["sin_llm_pct"] = round((total - stats["llm"] - stats["llm_invalido"]) / total * 100, 1) if total else None
+    return stats
+
+
+@bp.route('/router', methods=['GET'])
+def chatbot_router():
+    """Uso del clasificador por reglas y su evaluación sobre las muestras etiquetadas."""
+    return jsonify({
+        'success': True,
+        'uso': estadisticas_router(),
+        'evaluacion': intenciones.evaluar()
+    })
 
 
 # ==========================================
@@ -132,7 +228,7 @@ def verify_webhook():
 
 @bp.route("/webhook", methods=['POST'])
 def whatsapp_reply():
-    """Recibe mensajes, procesa y responde asíncronamente (HTTP request a Meta)."""
+    """Recibe mensajes y los encola; la respuesta a Meta la envía la cola."""
     body = request.get_json()
     
     # Validar que sea un evento de mensaje
@@ -149,11 +245,14 @@ def whatsapp_reply():
                     for message in value["messages"]:
                         # Solo procesamos texto por ahora
                         if message["type"] == "text":
-                            procesar_mensaje_entrante(message)
+                            resultado = encolar_mensaje(message)
+                            if resultado != "encolado":
+                                logger.info(f"Mensaje {message.get('id')} {resultado}")
 
         return jsonify({"status": "success"}), 200
 
     except Exception as e:
+        # Meta reintenta ante un error; los ids ya encolados se deduplican
         logger.exception(f"Error procesando webhook: {e}")
         return jsonify({"status": "error"}), 500
 
@@ -169,11 +268,12 @@ def procesar_mensaje_entrante(message_data):
     
     respuesta = None
     intencion_raw = "DESCONOCIDA"
+    detalle_intencion = {}
 
     try:
         # 1. Clasificar
-        intencion_raw = clasificar_intencion(texto_usuario)
-        logger.info(f"🧠 Intención: {intencion_raw}")
+        intencion_raw = clasificar_intencion(texto_usuario, detalle_intencion)
+        logger.info(f"🧠 Intención: {intencion_raw} ({detalle_intencion.get('fuente')})")
 
         # 2. Enrutar
         if "PROVEEDORES" in intencion_raw:
@@ -216,6 +316,8 @@ def procesar_mensaje_entrante(message_data):
             'from': telefono,
             'body': texto_usuario,
             'intent': intencion_raw,
+            'intent_fuente': detalle_intencion.get('fuente'),
+            'intent_confianza': detalle_intencion.get('confianza'),
             'response': respuesta
         })
     except: pass
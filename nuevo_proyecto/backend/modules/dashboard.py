@@ -292,6 +292,173 @@ def get_documentos_pendientes_detalle():
         }), 500
 
 
+def obtener_documentos_pendientes_pdf():
+    """
+    Documentos pendientes (sin fecha de pago y con saldo) y estadísticas para
+    el PDF. La usan la descarga directa y los trabajos de render en segundo
+    plano (backend/pdf/trabajos.py).
+    """
+    # Obtener datos CON PAGINACIÓN (igual que documentos-pendientes-detalle)
+    page_size = 1000
+    offset = 0
+    ordenes_pago_raw = []
+    while True:
+        batch = supabase.table('orden_de_pago').select('*').range(offset, offset + page_size - 1).execute().data or []
+        ordenes_pago_raw.extend(batch)
+        if len(batch) < page_size:
+            break
+        offset += page_size
+    
+    offset = 0
+    fechas_pago = []
+    while True:
+        batch = supabase.table('fechas_de_pagos_op').select('*').range(offset, offset + page_size - 1).execute().data or []
+        fechas_pago.extend(batch)
+        if len(batch) < page_size:
+            break
+        offset += page_size
+    
+    offset = 0
+    abonos_data = []
+    while True:
+        batch = supabase.table('abonos_op').select('*').range(offset, offset + page_size - 1).execute().data or []
+        abonos_data.extend(batch)
+        if len(batch) < page_size:
+            break
+        offset += page_size
+    
+    # Obtener proyectos
+    response_proy = supabase.table('proyectos').select('id, proyecto').execute()
+    proyectos = response_proy.data if response_proy.data else []
+    proyecto_map = {p["id"]: p["proyecto"] for p in proyectos}
+    
+    # Crear maps (igual que en documentos-pendientes-detalle)
+    fecha_map = {}
+    for f in fechas_pago:
+        k = f.get("orden_numero")
+        v = f.get("fecha_pago")
+        if k is None:
+            continue
+        fecha_map[str(k)] = v
+        try:
+            fecha_map[int(k)] = v
+        except:
+            pass
+    
+    abonos_map = {}
+    for ab in abonos_data:
+        num = ab.get("orden_numero")
+        try:
+            monto = int(round(float(ab.get("monto_abono") or 0)))
+        except:
+            monto = 0
+        if num is None:
+            continue
+        try:
+            num_int = int(num)
+            abonos_map[num_int] = abonos_map.get(num_int, 0) + monto
+        except:
+            abonos_map[num] = abonos_map.get(num, 0) + monto
+    
+    # Agrupar por orden_numero
+    pagos_dict = {}
+    for r in ordenes_pago_raw:
+        num = r.get("orden_numero")
+        if num not in pagos_dict:
+            proyecto_id = r.get("proyecto")
+            proyecto_nombre = proyecto_map.get(proyecto_id, f"Proyecto {proyecto_id}" if proyecto_id else "---")
+            
+            pagos_dict[num] = {
+                "orden_numero": num,
+                "proveedor": r.get("proveedor_nombre", "---"),
+                "proyecto": proyecto_nombre,
+                "factura": r.get("factura"),
+                "vencimiento": r.get("vencimiento"),
+                "fecha_op": r.get("fecha"),
+                "total_pago": 0
+            }
+        try:
+            monto = int(round(float(r.get("costo_final_con_iva") or 0)))
+        except:
+            monto = 0
+        pagos_dict[num]["total_pago"] += monto
+    
+    # Filtrar documentos pendientes
+    pagos_pendientes = []
+    pagos_con_abonos = []
+    fecha_hoy = datetime.now()
+    
+    for num, pago in pagos_dict.items():
+        total_pago = pago["total_pago"]
+        total_abonado = abonos_map.get(num, 0)
+        fecha_pago = fecha_map.get(num)
+        vencimiento = pago.get("vencimiento")
+        
+        if not fecha_pago:
+            saldo = max(0, total_pago - total_abonado)
+            if saldo > 0:
+                dias_atraso = 0
+                tipo_pago = "Pendiente"
+                estado = "pendiente"
+                fecha_vencimiento_formatted = "---"
+                
+                if vencimiento:
+                    try:
+                        fecha_venc = datetime.fromisoformat(vencimiento.replace('Z', '+00:00'))
+                        fecha_vencimiento_formatted = fecha_venc.strftime('%d/%m/%Y')
+                        
+                        if fecha_venc.date() < fecha_hoy.date():
+                            dias_atraso = (fecha_hoy.date() - fecha_venc.date()).days
+                            tipo_pago = f"Vencido ({dias_atraso} días)"
+                            estado = "vencido"
+                        else:
+                            dias_para_vencer = (fecha_venc.date() - fecha_hoy.date()).days
+                            tipo_pago = f"Pendiente (vence en {dias_para_vencer} días)"
+                    except:
+                        pass
+                
+                fecha_op_formatted = "---"
+                if pago.get("fecha_op"):
+                    try:
+                        fecha_op_dt = datetime.fromisoformat(str(pago.get("fecha_op")).replace('Z', '+00:00'))
+                        fecha_op_formatted = fecha_op_dt.strftime('%d/%m/%Y')
+                    except:
+                        fecha_op_formatted = str(pago.get("fecha_op"))[:10]
+                
+                documento = {
+                    "orden_numero": num,
+                    "proveedor": pago["proveedor"],
+                    "proyecto": pago["proyecto"],
+                    "factura": pago.get("factura", "---"),
+                    "fecha_op": fecha_op_formatted,
+                    "monto_total": round(total_pago, 2),
+                    "total_abonado": round(total_abonado, 2),
+                    "saldo": round(saldo, 2),
+                    "dias_atraso": dias_atraso,
+                    "fecha_vencimiento": fecha_vencimiento_formatted,
+                    "tipo": tipo_pago,
+                    "estado": estado
+                }
+                
+                if total_abonado > 0:
+                    pagos_con_abonos.append(documento)
+                else:
+                    pagos_pendientes.append(documento)
+    
+    pagos_pendientes.sort(key=lambda x: x['dias_atraso'], reverse=True)
+    pagos_con_abonos.sort(key=lambda x: x['dias_atraso'], reverse=True)
+    todos_documentos = pagos_pendientes + pagos_con_abonos
+    
+    stats = {
+        "total": len(todos_documentos),
+        "pendientes": len(pagos_pendientes),
+        "con_abonos": len(pagos_con_abonos),
+        "vencidos": sum(1 for d in todos_documentos if d['estado'] == 'vencido')
+    }
+    
+    return todos_documentos, stats
+
+
 @bp.route('/documentos-pendientes-pdf', methods=['GET'])
 def generar_pdf_documentos_pendientes():
     """
@@ -305,163 +472,7 @@ def generar_pdf_documentos_pendientes():
         
         print("🔍 Generando PDF de documentos pendientes...")
         
-        # Obtener datos CON PAGINACIÓN (igual que documentos-pendientes-detalle)
-        page_size = 1000
-        offset = 0
-        ordenes_pago_raw = []
-        while True:
-            batch = supabase.table('orden_de_pago').select('*').range(offset, offset + page_size - 1).execute().data or []
-            ordenes_pago_raw.extend(batch)
-            if len(batch) < page_size:
-                break
-            offset += page_size
-        
-        offset = 0
-        fechas_pago = []
-        while True:
-            batch = supabase.table('fechas_de_pagos_op').select('*').range(offset, offset + page_size - 1).execute().data or []
-            fechas_pago.extend(batch)
-            if len(batch) < page_size:
-                break
-            offset += page_size
-        
-        offset = 0
-        abonos_data = []
-        while True:
-            batch = supabase.table('abonos_op').select('*').range(offset, offset + page_size - 1).execute().data or []
-            abonos_data.extend(batch)
-            if len(batch) < page_size:
-                break
-            offset += page_size
-        
-        # Obtener proyectos
-        response_proy = supabase.table('proyectos').select('id, proyecto').execute()
-        proyectos = response_proy.data if response_proy.data else []
-        proyecto_map = {p["id"]: p["proyecto"] for p in proyectos}
-        
-        # Crear maps (igual que en documentos-pendientes-detalle)
-        fecha_map = {}
-        for f in fechas_pago:
-            k = f.get("orden_numero")
-            v = f.get("fecha_pago")
-            if k is None:
-                continue
-            fecha_map[str(k)] = v
-            try:
-                fecha_map[int(k)] = v
-            except:
-                pass
-        
-        abonos_map = {}
-        for ab in abonos_data:
-            num = ab.get("orden_numero")
-            try:
-                monto = int(round(float(ab.get("monto_abono") or 0)))
-            except:
-                monto = 0
-            if num is None:
-                continue
-            try:
-                num_int = int(num)
-                abonos_map[num_int] = abonos_map.get(num_int, 0) + monto
-            except:
-                abonos_map[num] = abonos_map.get(num, 0) + monto
-        
-        # Agrupar por orden_numero
-        pagos_dict = {}
-        for r in ordenes_pago_raw:
-            num = r.get("orden_numero")
-            if num not in pagos_dict:
-                proyecto_id = r.get("proyecto")
-                proyecto_nombre = proyecto_map.get(proyecto_id, f"Proyecto {proyecto_id}" if proyecto_id else "---")
-                
-                pagos_dict[num] = {
-                    "orden_numero": num,
-                    "proveedor": r.get("proveedor_nombre", "---"),
-                    "proyecto": proyecto_nombre,
-                    "factura": r.get("factura"),
-                    "vencimiento": r.get("vencimiento"),
-                    "fecha_op": r.get("fecha"),
-                    "total_pago": 0
-                }
-            try:
-                monto = int(round(float(r.get("costo_final_con_iva") or 0)))
-            except:
-                monto = 0
-            pagos_dict[num]["total_pago"] += monto
-        
-        # Filtrar documentos pendientes
-        pagos_pendientes = []
-        pagos_con_abonos = []
-        fecha_hoy = datetime.now()
-        
-        for num, pago in pagos_dict.items():
-            total_pago = pago["total_pago"]
-            total_abonado = abonos_map.get(num, 0)
-            fecha_pago = fecha_map.get(num)
-            vencimiento = pago.get("vencimiento")
-            
-            if not fecha_pago:
-                saldo = max(0, total_pago - total_abonado)
-                if saldo > 0:
-                    dias_atraso = 0
-                    tipo_pago = "Pendiente"
-                    estado = "pendiente"
-                    fecha_vencimiento_formatted = "---"
-                    
-                    if vencimiento:
-                        try:
-                            fecha_venc = datetime.fromisoformat(vencimiento.replace('Z', '+00:00'))
-                            fecha_vencimiento_formatted = fecha_venc.strftime('%d/%m/%Y')
-                            
-                            if fecha_venc.date() < fecha_hoy.date():
-                                dias_atraso = (fecha_hoy.date() - fecha_venc.date()).days
-                                tipo_pago = f"Vencido ({dias_atraso} días)"
-                                estado = "vencido"
-                            else:
-                                dias_para_vencer = (fecha_venc.date() - fecha_hoy.date()).days
-                                tipo_pago = f"Pendiente (vence en {dias_para_vencer} días)"
-                        except:
-                            pass
-                    
-                    fecha_op_formatted = "---"
-                    if pago.get("fecha_op"):
-                        try:
-                            fecha_op_dt = datetime.fromisoformat(str(pago.get("fecha_op")).replace('Z', '+00:00'))
-                            fecha_op_formatted = fecha_op_dt.strftime('%d/%m/%Y')
-                        except:
-                            fecha_op_formatted = str(pago.get("fecha_op"))[:10]
-                    
-                    documento = {
-                        "orden_numero": num,
-                        "proveedor": pago["proveedor"],
-                        "proyecto": pago["proyecto"],
-                        "factura": pago.get("factura", "---"),
-                        "fecha_op": fecha_op_formatted,
-                        "monto_total": round(total_pago, 2),
-                        "total_abonado": round(total_abonado, 2),
-                        "saldo": round(saldo, 2),
-                        "dias_atraso": dias_atraso,
-                        "fecha_vencimiento": fecha_vencimiento_formatted,
-                        "tipo": tipo_pago,
-                        "estado": estado
-                    }
-                    
-                    if total_abonado > 0:
-                        pagos_con_abonos.append(documento)
-                    else:
-                        pagos_pendientes.append(documento)
-        
-        pagos_pendientes.sort(key=lambda x: x['dias_atraso'], reverse=True)
-        pagos_con_abonos.sort(key=lambda x: x['dias_atraso'], reverse=True)
-        todos_documentos = pagos_pendientes + pagos_con_abonos
-        
-        stats = {
-            "total": len(todos_documentos),
-            "pendientes": len(pagos_pendientes),
-            "con_abonos": len(pagos_con_abonos),
-            "vencidos": sum(1 for d in todos_documentos if d['estado'] == 'vencido')
-        }
+        todos_documentos, stats = obtener_documentos_pendientes_pdf()
         
         print(f"✅ {len(todos_documentos)} documentos pendientes para PDF")
         
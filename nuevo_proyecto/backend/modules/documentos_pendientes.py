@@ -7,6 +7,39 @@ from backend.utils.decorators import token_required
 bp = Blueprint("documentos_pendientes", __name__)
 
 
+def invalidar_caches_documentos():
+    """Invalida el caché de pagos (los documentos pendientes no se cachean)."""
+    from backend.modules.pagos import invalidar_cache_pagos
+    invalidar_cache_pagos()
+
+
+def _es_lista_de_ids(valor):
+    return isinstance(valor, list) and all(isinstance(i, int) and not isinstance(i, bool) for i in valor)
+
+
+def completar_documentos(supabase, ids, factura):
+    """
+    Asigna la factura y marca como completadas varias líneas de orden_de_pago
+    con un único UPDATE ... WHERE id IN (...).
+    Devuelve la cantidad de filas afectadas.
+    """
+    ids_unicos = list(dict.fromkeys(i for i in ids if i is not None))
+    if not ids_unicos:
+        return 0
+
+    result = (
+        supabase
+        .table("orden_de_pago")
+        .update({"factura": factura, "estado_documento": "completado"})
+        .in_("id", ids_unicos)
+        .execute()
+    )
+    filas = len(result.data or [])
+    if filas:
+        invalidar_caches_documentos()
+    return filas
+
+
 @bp.route("/", methods=["GET"])
 @token_required
 def list_pendientes(current_user):
@@ -132,38 +165,29 @@ def update_pendiente(current_user):
         
         current_app.logger.info(f"Actualizando documento: id={id_unico}, factura={factura}")
         
+        if not id_unico and not ids_multiple:
+            return jsonify({"success": False, "message": "Debe especificar 'id' o 'ids'"}), 400
+        if not id_unico and not _es_lista_de_ids(ids_multiple):
+            return jsonify({"success": False, "message": "'ids' debe ser una lista de enteros"}), 400
+        
+        ids = [id_unico] if id_unico else ids_multiple
+        filas = completar_documentos(supabase, ids, factura)
+        
+        current_app.logger.info(f"Resultado actualización: {filas} registros")
+        
+        if not filas:
+            return jsonify({"success": False, "message": "No se encontró el documento para actualizar"}), 404
+        
         if id_unico:
-            result = (
-                supabase
-                .table("orden_de_pago")
-                .update({"factura": factura, "estado_documento": "completado"})
-                .eq("id", id_unico)
-                .execute()
-            )
-            
-            current_app.logger.info(f"Resultado actualización: {len(result.data) if result.data else 0} registros")
-            
-            if result.data:
-                return jsonify({
-                    "success": True, 
-                    "message": f"Documento actualizado con factura {factura}"
-                })
-            else:
-                return jsonify({"success": False, "message": "No se encontró el documento para actualizar"}), 404
-                
-        elif ids_multiple:
-            for doc_id in ids_multiple:
-                supabase.table("orden_de_pago").update({
-                    "factura": factura,
-                    "estado_documento": "completado"
-                }).eq("id", doc_id).execute()
-            
-            return jsonify({
-                "success": True,
-                "message": f"{len(ids_multiple)} documento(s) actualizado(s)"
-            })
+            mensaje = f"Documento actualizado con factura {factura}"
         else:
-            return jsonify({"success": False, "message": "Debe especificar 'id' o 'ids'"}), 400
+            mensaje = f"{filas} documento(s) actualizado(s)"
+        
+        return jsonify({
+            "success": True,
+            "message": mensaje,
+            "filas_actualizadas": filas
+        })
             
     except Exception as e:
         current_app.logger.error(f"Error al actualizar documento: {e}")
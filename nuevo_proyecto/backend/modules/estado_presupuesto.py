@@ -17,10 +17,59 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from backend.pdf.tablas import tabla_en_bloques
 
 bp = Blueprint("estado_presupuesto", __name__)
 logger = logging.getLogger(__name__)
 
+# Estilos del PDF de detalle (se construyen una vez y se reutilizan)
+_pdf_styles = getSampleStyleSheet()
+PDF_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_pdf_styles['Heading1'],
+    fontSize=16,
+    textColor=colors.HexColor('#1e40af'),
+    spaceAfter=12,
+    alignment=TA_CENTER
+)
+PDF_INFO_STYLE = ParagraphStyle('Info', parent=_pdf_styles['Normal'], fontSize=10, spaceAfter=6)
+PDF_SECCION_STYLE = ParagraphStyle('Seccion', parent=_pdf_styles['Heading2'], keepWithNext=1)
+PDF_CELL_STYLE = ParagraphStyle('CellStyle', parent=_pdf_styles['Normal'], fontSize=8, leading=10)
+PDF_TOTAL_STYLE = ParagraphStyle('TotalStyle', parent=_pdf_styles['Normal'], fontSize=9, fontName='Helvetica-Bold')
+
+
+def _estilo_tabla_detalle(color_encabezado, color_filas):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), color_encabezado),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('TOPPADDING', (0, 1), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+        ('BACKGROUND', (0, 1), (-1, -1), color_filas),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+    ])
+
+
+PDF_ORDENES_STYLE = _estilo_tabla_detalle(colors.HexColor('#1e40af'), colors.beige)
+PDF_GASTOS_STYLE = _estilo_tabla_detalle(colors.HexColor('#059669'), colors.lightgrey)
+PDF_FILA_TOTAL_STYLE = TableStyle([('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e5e7eb'))])
+PDF_TOTAL_GENERAL_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#1e40af')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.whitesmoke),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 14),
+    ('PADDING', (0, 0), (-1, -1), 12)
+])
+
 
 def get_produccion_actual_nhost(supabase_proyecto_id):
     """
@@ -885,142 +934,83 @@ def generar_pdf_detalle(current_user):
         doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
         
         elements = []
-        styles = getSampleStyleSheet()
-        
-        # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=12,
-            alignment=TA_CENTER
-        )
         
         meses_nombres = ['', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 
                         'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
         mes_nombre = meses_nombres[mes] if 1 <= mes <= 12 else str(mes)
         
-        elements.append(Paragraph("Detalle de Gastos", title_style))
+        elements.append(Paragraph("Detalle de Gastos", PDF_TITLE_STYLE))
         elements.append(Spacer(1, 0.2*inch))
         
         # Información del proyecto
-        info_style = ParagraphStyle('Info', parent=styles['Normal'], fontSize=10, spaceAfter=6)
-        elements.append(Paragraph(f"<b>Proyecto:</b> {nombre_proyecto}", info_style))
-        elements.append(Paragraph(f"<b>Item:</b> {nombre_item}", info_style))
-        elements.append(Paragraph(f"<b>Mes:</b> {mes_nombre}", info_style))
+        elements.append(Paragraph(f"<b>Proyecto:</b> {nombre_proyecto}", PDF_INFO_STYLE))
+        elements.append(Paragraph(f"<b>Item:</b> {nombre_item}", PDF_INFO_STYLE))
+        elements.append(Paragraph(f"<b>Mes:</b> {mes_nombre}", PDF_INFO_STYLE))
         elements.append(Spacer(1, 0.3*inch))
         
-        # Tabla de Órdenes de Pago
+        # Tabla de Órdenes de Pago (en bloques, ver backend/pdf/tablas.py)
         if ordenes_filtradas:
-            elements.append(Paragraph("<b>Órdenes de Pago</b>", styles['Heading2']))
+            elements.append(Paragraph("<b>Órdenes de Pago</b>", PDF_SECCION_STYLE))
             elements.append(Spacer(1, 0.1*inch))
             
-            # Estilo para texto en celdas
-            cell_style = ParagraphStyle('CellStyle', parent=styles['Normal'], fontSize=8, leading=10)
-            
-            data = [['Orden', 'O.Compra', 'Proveedor', 'Descripción', 'Monto']]
+            filas = []
             for op in ordenes_filtradas:
                 # Limitar longitud y usar Paragraph para wrap automático
                 proveedor = op['proveedor'][:30] + '...' if len(op['proveedor']) > 30 else op['proveedor']
                 descripcion = op['descripcion'][:60] + '...' if len(op['descripcion']) > 60 else op['descripcion']
                 
-                data.append([
-                    Paragraph(str(op['orden_numero']), cell_style),
-                    Paragraph(str(op['orden_compra']), cell_style),
-                    Paragraph(proveedor, cell_style),
-                    Paragraph(descripcion, cell_style),
-                    Paragraph(f"${op['monto']:,.0f}", cell_style)
+                filas.append([
+                    Paragraph(str(op['orden_numero']), PDF_CELL_STYLE),
+                    Paragraph(str(op['orden_compra']), PDF_CELL_STYLE),
+                    Paragraph(proveedor, PDF_CELL_STYLE),
+                    Paragraph(descripcion, PDF_CELL_STYLE),
+                    Paragraph(f"${op['monto']:,.0f}", PDF_CELL_STYLE)
                 ])
             
-            # Fila de total
-            total_style = ParagraphStyle('TotalStyle', parent=styles['Normal'], fontSize=9, fontName='Helvetica-Bold')
-            data.append([
+            total = [
                 '', '', '', 
-                Paragraph('Total Órdenes:', total_style),
-                Paragraph(f"${total_ordenes:,.0f}", total_style)
-            ])
+                Paragraph('Total Órdenes:', PDF_TOTAL_STYLE),
+                Paragraph(f"${total_ordenes:,.0f}", PDF_TOTAL_STYLE)
+            ]
             
             # Ajustar anchos: Orden, O.Compra, Proveedor, Descripción, Monto
-            table = Table(data, colWidths=[0.6*inch, 0.8*inch, 1.8*inch, 2.8*inch, 1*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # ✅ Alineación vertical
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 1), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e5e7eb')),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
-            ]))
-            elements.append(table)
+            elements.extend(tabla_en_bloques(
+                ['Orden', 'O.Compra', 'Proveedor', 'Descripción', 'Monto'], filas, PDF_ORDENES_STYLE,
+                col_widths=[0.6*inch, 0.8*inch, 1.8*inch, 2.8*inch, 1*inch],
+                total=total, estilo_total=PDF_FILA_TOTAL_STYLE,
+            ))
             elements.append(Spacer(1, 0.3*inch))
         
         # Tabla de Gastos Directos
         if gastos_filtrados:
-            elements.append(Paragraph("<b>Gastos Directos</b>", styles['Heading2']))
+            elements.append(Paragraph("<b>Gastos Directos</b>", PDF_SECCION_STYLE))
             elements.append(Spacer(1, 0.1*inch))
             
-            cell_style = ParagraphStyle('CellStyle2', parent=styles['Normal'], fontSize=8, leading=10)
-            
-            data = [['Descripción', 'Fecha', 'Monto']]
+            filas = []
             for g in gastos_filtrados:
                 desc = g['descripcion'][:80] + '...' if len(g['descripcion']) > 80 else g['descripcion']
-                data.append([
-                    Paragraph(desc, cell_style),
-                    Paragraph(g['fecha'], cell_style),
-                    Paragraph(f"${g['monto']:,.0f}", cell_style)
+                filas.append([
+                    Paragraph(desc, PDF_CELL_STYLE),
+                    Paragraph(g['fecha'], PDF_CELL_STYLE),
+                    Paragraph(f"${g['monto']:,.0f}", PDF_CELL_STYLE)
                 ])
             
-            # Fila de total
-            total_style = ParagraphStyle('TotalStyle2', parent=styles['Normal'], fontSize=9, fontName='Helvetica-Bold')
-            data.append([
-                Paragraph('Total Gastos Directos:', total_style),
+            total = [
+                Paragraph('Total Gastos Directos:', PDF_TOTAL_STYLE),
                 '',
-                Paragraph(f"${total_gastos:,.0f}", total_style)
-            ])
+                Paragraph(f"${total_gastos:,.0f}", PDF_TOTAL_STYLE)
+            ]
             
-            table = Table(data, colWidths=[4.2*inch, 1.5*inch, 1.3*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#059669')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 1), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('BACKGROUND', (0, 1), (-1, -2), colors.lightgrey),
-                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e5e7eb')),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
-            ]))
-            elements.append(table)
+            elements.extend(tabla_en_bloques(
+                ['Descripción', 'Fecha', 'Monto'], filas, PDF_GASTOS_STYLE,
+                col_widths=[4.2*inch, 1.5*inch, 1.3*inch],
+                total=total, estilo_total=PDF_FILA_TOTAL_STYLE,
+            ))
             elements.append(Spacer(1, 0.3*inch))
         
         # Total General
         total_data = [['TOTAL GENERAL:', f"${total_general:,.0f}"]]
-        total_table = Table(total_data, colWidths=[5.5*inch, 1.3*inch])
-        total_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#1e40af')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.whitesmoke),
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 14),
-            ('PADDING', (0, 0), (-1, -1), 12)
-        ]))
-        elements.append(total_table)
+        elements.append(Table(total_data, colWidths=[5.5*inch, 1.3*inch], style=PDF_TOTAL_GENERAL_STYLE))
         
         # Generar PDF
         doc.build(elements)
@@ -5,6 +5,7 @@ Incluye funcionalidad de importación/exportación Excel
 
 from flask import Blueprint, request, jsonify, current_app, send_file
 from backend.utils.decorators import token_required
+from backend.utils.resumen_financiero import invalidar_resumenes
 from datetime import datetime
 import io
 import openpyxl
@@ -189,6 +190,7 @@ def new_gasto_directo(current_user):
         
         # Insertar en BD
         result = supabase.table("gastos_directos").insert(nuevo_gasto).execute()
+        invalidar_resumenes()
         
         if result.data:
             return jsonify({
@@ -219,6 +221,7 @@ def delete_gasto_directo(current_user, gasto_id):
         
         # Eliminar
         result = supabase.table("gastos_directos").delete().eq("id", gasto_id).execute()
+        invalidar_resumenes()
         
         if result.data:
             return jsonify({"success": True, "message": "Gasto eliminado exitosamente"})
@@ -506,6 +509,7 @@ def importar_excel(current_user):
         
         # Insertar en lote
         result = supabase.table("gastos_directos").insert(gastos).execute()
+        invalidar_resumenes()
         
         if result.data:
             return jsonify({
@@ -1,11 +1,15 @@
 import re
+import time
+import threading
 from datetime import date
 from collections import defaultdict
 from flask import Blueprint, request, jsonify, current_app
 
 # ========= Importaciones de Utilidades =========
 from backend.utils.decorators import token_required
-from backend.utils.cache import cache_result
+from backend.utils.cache import cache_result, invalidate
+from backend.utils import reference_data
+from backend.utils import recepciones
 
 bp = Blueprint("ingresos", __name__)
 
@@ -20,6 +24,85 @@ def normalize_text(text):
     return ' '.join(str(text).replace('\n', ' ').split()).lower()
 
 
+# ================================================================
+# ÍNDICE DE FACTURAS POR PROVEEDOR
+# ================================================================
+# Set de facturas normalizadas por proveedor, mantenido incrementalmente:
+# cada consulta trae solo los ingresos con id mayor al último visto, así que
+# el costo no crece con el historial del proveedor y los demás workers ven
+# las facturas nuevas en su siguiente consulta.
+
+_facturas_index = {}  # proveedor_id -> {"facturas": set, "max_id": int, "timestamp": float}
+_facturas_lock = threading.Lock()
+FACTURAS_INDEX_TTL = 3600  # reconstrucción completa cada hora como red de seguridad
+
+
+def _actualizar_indice_facturas(supabase, proveedor_id):
+    """Trae los ingresos nuevos del proveedor y devuelve su set de facturas."""
+    key = str(proveedor_id)
+    entry = _facturas_index.get(key)
+    if entry is None or time.time() - entry["timestamp"] > FACTURAS_INDEX_TTL:
+        entry = {"facturas": set(), "max_id": 0, "timestamp": time.time()}
+
+    page_size = 1000
+    max_id = entry["max_id"]
+    nuevas = set()
+    while True:
+        batch = (
+            supabase.table("ingresos")
+            .select("id, factura")
+            .eq("proveedor", proveedor_id)
+            .gt("id", max_id)
+            .order("id")
+            .limit(page_size)
+            .execute().data or []
+        )
+        for row in batch:
+            fct_val = normalize_text(row.get("factura") or "")
+            if fct_val:
+                nuevas.add(fct_val)
+        if batch:
+            max_id = max(max_id, batch[-1]["id"])
+        if len(batch) < page_size:
+            break
+
+    with _facturas_lock:
+        actual = _facturas_index.get(key)
+        if actual is None or actual["timestamp"] < entry["timestamp"]:
+            actual = entry
+            _facturas_index[key] = actual
+        elif actual is not entry:
+            # Otro hilo reconstruyó la entrada mientras consultábamos: fusionar
+            actual["facturas"] |= entry["facturas"]
+        actual["facturas"] |= nuevas
+        actual["max_id"] = max(actual["max_id"], max_id)
+        return actual["facturas"]
+
+
+def factura_ya_ingresada(supabase, proveedor_id, factura):
+    """True si la factura (normalizada) ya fue ingresada para el proveedor."""
+    factura_normalizada = normalize_text(factura)
+    if not factura_normalizada:
+        return False
+    return factura_normalizada in _actualizar_indice_facturas(supabase, proveedor_id)
+
+
+def registrar_factura(proveedor_id, factura, ids_insertados):
+    """Agrega al índice una factura recién insertada."""
+    factura_normalizada = normalize_text(factura)
+    with _facturas_lock:
+        entry = _facturas_index.get(str(proveedor_id))
+        if entry is None:
+            return
+        if factura_normalizada:
+            entry["facturas"].add(factura_normalizada)
+        # Solo avanzamos la marca si los ids son contiguos a lo ya visto;
+        # si no, el próximo refresco trae lo que falte.
+        ids = sorted(i for i in ids_insertados if i is not None)
+        if ids and ids[0] == entry["max_id"] + 1 and ids[-1] - ids[0] == len(ids) - 1:
+            entry["max_id"] = ids[-1]
+
+
 # ================================================================
 # ENDPOINT PRINCIPAL DE INGRESOS
 # ================================================================
@@ -78,24 +161,12 @@ def get_ingresos_por_oc(current_user):
         # Obtener nombre del solicitante
         solicita_nombre = od["solicita"]
         if solicita_nombre and str(solicita_nombre).isdigit():
-            trabajador = (
-                supabase.table("trabajadores")
-                .select("nombre")
-                .eq("id", int(solicita_nombre))
-                .limit(1)
-                .execute().data or []
-            )
+            trabajador = reference_data.get_por_id("trabajadores", int(solicita_nombre))
             if trabajador:
-                solicita_nombre = trabajador[0]["nombre"]
+                solicita_nombre = trabajador["nombre"]
         
         # 3. Obtener datos del proveedor
-        prov = (
-            supabase.table("proveedores")
-            .select("nombre, rut")
-            .eq("id", od["proveedor"])
-            .limit(1)
-            .execute().data or []
-        )
+        prov = reference_data.get_por_id("proveedores", od["proveedor"])
         
         response_data["header"] = {
             "orden_compra": od["orden_compra"],
@@ -103,8 +174,8 @@ def get_ingresos_por_oc(current_user):
             "solicita": solicita_nombre,
             "fac_sin_iva": bool(od["fac_sin_iva"]),
             "proveedor_id": od["proveedor"],
-            "proveedor_nombre": prov[0]["nombre"] if prov else "",
-            "rut": prov[0]["rut"] if prov else ""
+            "proveedor_nombre": prov["nombre"] if prov else "",
+            "rut": prov["rut"] if prov else ""
         }
         
         # 4. Obtener líneas de la OC con paginación manual
@@ -124,13 +195,8 @@ def get_ingresos_por_oc(current_user):
                 break
             offset += page_size
         
-        # 5. Mapear descripciones a material_id
-        mats = (
-            supabase.table("materiales")
-            .select("id, material")
-            .execute().data or []
-        )
-        mat_id_map = {normalize_text(m["material"]): m["id"] for m in mats}
+        # 5. Mapear descripciones a material_id (catálogo en caché)
+        mat_por_nombre = reference_data.get_catalogo("materiales")["by_nombre"]
         
         # 6. Obtener recepciones previas agrupadas por art_corr
         prev = (
@@ -169,7 +235,7 @@ def get_ingresos_por_oc(current_user):
                 "total": total,
                 "total_recibido": prev_r,
                 "pendiente": pend,
-                "material_id": mat_id_map.get(norm_desc, None),
+                "material_id": (mat_por_nombre.get(norm_desc) or {}).get("id"),
                 "art_corr": ln["art_corr"],
             })
         
@@ -224,23 +290,12 @@ def save_ingreso(current_user):
         if not proveedor_id:
             return jsonify({"success": False, "message": "Proveedor requerido"}), 400
         
-        # 4. Validar factura duplicada (normalizada)
-        if factura:
-            factura_normalizada = normalize_text(factura)
-            facturas_existentes = (
-                supabase.table("ingresos")
-                .select("factura")
-                .eq("proveedor", proveedor_id)
-                .execute().data or []
-            )
-            
-            for fct in facturas_existentes:
-                fct_val = normalize_text(fct.get("factura") or "")
-                if fct_val and fct_val == factura_normalizada:
-                    return jsonify({
-                        "success": False, 
-                        "message": f"La factura '{factura}' para este proveedor ya fue ingresada"
-                    }), 400
+        # 4. Validar factura duplicada (normalizada) contra el índice del proveedor
+        if factura and factura_ya_ingresada(supabase, proveedor_id, factura):
+            return jsonify({
+                "success": False, 
+                "message": f"La factura '{factura}' para este proveedor ya fue ingresada"
+            }), 400
         
         # 5. Calcular próximo n_ingreso
         last = (
@@ -261,20 +316,8 @@ def save_ingreso(current_user):
         )
         oc_map = {d["descripcion"]: d for d in oc_dt}
         
-        # Obtener materiales y tipos
-        mats = (
-            supabase.table("materiales")
-            .select("id, material, tipo, item")
-            .execute().data or []
-        )
-        mat_map = {normalize_text(m["material"]): m for m in mats}
-        
-        items = (
-            supabase.table("item")
-            .select("id, tipo")
-            .execute().data or []
-        )
-        tipo_to_id = {it["tipo"]: it["id"] for it in items}
+        # Materiales y tipos desde el catálogo en caché
+        items_por_tipo = reference_data.get_catalogo("items")["by_nombre"]
         
         hoy = date.today().isoformat()
         to_insert = []
@@ -286,11 +329,12 @@ def save_ingreso(current_user):
                 continue
             
             desc = linea.get("descripcion", "")
-            norm_desc = normalize_text(desc)
-            mat = mat_map.get(norm_desc)
+            raw_mat_id = linea.get("material_id")
+            # Si no viene material_id, forzamos recarga ante un fallo
+            # (el material pudo crearse en otro worker hace instantes)
+            mat = reference_data.get_por_nombre("materiales", desc, recargar_si_falta=not raw_mat_id)
             
             # Validar material_id
-            raw_mat_id = linea.get("material_id")
             if not raw_mat_id and mat:
                 raw_mat_id = mat.get("id")
             
@@ -306,7 +350,8 @@ def save_ingreso(current_user):
             next_n += 1
             
             ocd = oc_map.get(desc, {})
-            tipo_id = tipo_to_id.get(mat.get("tipo")) if mat else None
+            tipo_item = items_por_tipo.get(normalize_text(mat.get("tipo"))) if mat else None
+            tipo_id = tipo_item["id"] if tipo_item else None
             fac_sin = 1 if ocd.get("fac_sin_iva") else 0
             
             insert_data = {
@@ -339,6 +384,11 @@ def save_ingreso(current_user):
         res = supabase.table("ingresos").insert(to_insert).execute()
         
         if res.data:
+            registrar_factura(proveedor_id, factura, [r.get("id") for r in res.data])
+            recepciones.registrar_ingresos(res.data)
+            # Estado y cantidades recibidas cambian en el listado y detalle de OCs
+            invalidate("ordenes", f"ordenes:oc:{oc_val}")
+            
             # Mensaje de advertencia si no hay factura
             warning = None
             if not factura:
@@ -5,6 +5,9 @@ Mantiene compatibilidad con estructura existente
 
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils.cache import invalidate
+from backend.utils.reference_data import invalidar_catalogo
+from backend.utils import typeahead
 
 bp = Blueprint("items", __name__)
 
@@ -82,6 +85,8 @@ def new_item(current_user):
         result = supabase.table("item").insert({"tipo": tipo}).execute()
         
         if result.data:
+            invalidate("items")
+            invalidar_catalogo("items")
             return jsonify({
                 "success": True,
                 "message": "Item creado exitosamente",
@@ -129,6 +134,8 @@ def edit_item(current_user, id):
         result = supabase.table("item").update({"tipo": tipo_new}).eq("id", id).execute()
         
         if result.data:
+            invalidate("items")
+            invalidar_catalogo("items")
             return jsonify({
                 "success": True,
                 "message": "Item actualizado exitosamente",
@@ -154,15 +161,7 @@ def api_search_items(current_user):
         if not term:
             return jsonify({"success": True, "data": []})
         
-        supabase = current_app.config['SUPABASE']
-        
-        items = supabase.table("item") \
-            .select("*") \
-            .ilike("tipo", f"%{term}%") \
-            .order("tipo") \
-            .limit(20) \
-            .execute() \
-            .data or []
+        items = typeahead.buscar("items", term, 20)
         
         return jsonify({"success": True, "data": items})
         
@@ -2,104 +2,205 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils import recepciones
+from backend.utils import reference_data
 from collections import defaultdict
 
 bp = Blueprint("lista_ordenes_compra", __name__)
 
 
+CAMPOS_LINEA = "orden_compra, fecha, total, proveedor, proyecto, art_corr, cantidad"
+BUSQUEDA_LIMITE = 100   # OCs por página en búsquedas de texto
+LOTE_LINEAS = 1000      # líneas por consulta al recorrer resultados
+MAX_IDS_FILTRO = 300    # ids por consulta in.(...) para no exceder la URL
+CAMPOS_BUSQUEDA = "id, " + CAMPOS_LINEA
+
+
+def _parse_cursor(cursor):
+    """Cursor de búsqueda 'nivel:orden_compra' -> (nivel, oc) o (0, None)."""
+    try:
+        nivel, oc = cursor.split(":", 1)
+        return int(nivel), int(oc)
+    except (AttributeError, ValueError):
+        return 0, None
+
+
+def _grupos_filtro(prov_ids, proy_ids):
+    """
+    Filtros or_ ('proveedor.in.(...),proyecto.in.(...)') de a lo más
+    MAX_IDS_FILTRO ids cada uno, para términos amplios con muchos ids.
+    """
+    ids = [("proveedor", i) for i in prov_ids] + [("proyecto", i) for i in proy_ids]
+    grupos = []
+    for k in range(0, len(ids), MAX_IDS_FILTRO):
+        lote = ids[k:k + MAX_IDS_FILTRO]
+        filtros = []
+        for columna in ("proveedor", "proyecto"):
+            valores = [str(i) for c, i in lote if c == columna]
+            if valores:
+                filtros.append(f"{columna}.in.({','.join(valores)})")
+        grupos.append(",".join(filtros))
+    return grupos
+
+
+def buscar_lineas_por_texto(supabase, buscar, cursor=None, limite=BUSQUEDA_LIMITE):
+    """
+    Búsqueda de OCs por nombre de proveedor o proyecto hecha en la base de datos.
+
+    1. Resuelve el texto contra los catálogos de proveedores y proyectos y
+       agrupa los ids por relevancia (exacto, prefijo, contiene).
+    2. Recorre cada nivel con paginación keyset por orden_compra descendente,
+       trayendo solo las líneas de OCs que coinciden. Si un nivel tiene más
+       de MAX_IDS_FILTRO ids se consulta por lotes y se mezclan: una OC se
+       entrega cuando ningún lote puede traer más líneas suyas.
+
+    Devuelve (líneas, siguiente_cursor). El orden de los resultados es por
+    relevancia y, dentro de cada nivel, de la OC más reciente a la más antigua.
+    """
+    niveles_prov = reference_data.buscar_ids_por_nombre("proveedores", buscar)
+    niveles_proy = reference_data.buscar_ids_por_nombre("proyectos", buscar)
+
+    nivel_inicio, desde_oc = _parse_cursor(cursor)
+    lineas = []
+    ocs_vistas = []
+    prov_previos, proy_previos = set(), set()
+
+    for nivel in range(3):
+        prov_ids = niveles_prov[nivel]
+        proy_ids = niveles_proy[nivel]
+        if nivel < nivel_inicio or (not prov_ids and not proy_ids):
+            prov_previos.update(prov_ids)
+            proy_previos.update(proy_ids)
+            continue
+        if nivel > nivel_inicio:
+            desde_oc = None
+
+        grupos = _grupos_filtro(prov_ids, proy_ids)
+
+        while len(ocs_vistas) < limite:
+            por_oc = defaultdict(dict)  # oc -> {id línea: línea}
+            frontera = None  # las OCs <= frontera pueden venir cortadas
+            for filtro in grupos:
+                query = (
+                    supabase.table("orden_de_compra")
+                    .select(CAMPOS_BUSQUEDA)
+                    .or_(filtro)
+                    .order("orden_compra", desc=True)
+                    .limit(LOTE_LINEAS)
+                )
+                if desde_oc is not None:
+                    query = query.lt("orden_compra", desde_oc)
+                batch = query.execute().data or []
+                for ln in batch:
+                    # Una línea puede coincidir en dos lotes (proveedor y proyecto)
+                    por_oc[ln['orden_compra']][ln.get('id')] = ln
+                if len(batch) >= LOTE_LINEAS:
+                    ultima = batch[-1]['orden_compra']
+                    frontera = ultima if frontera is None else max(frontera, ultima)
+            if not por_oc:
+                break
+
+            completo = frontera is None
+            ocs_batch = sorted(por_oc, reverse=True)
+            if not completo:
+                # Las OCs en la frontera o más antiguas se releen en la próxima vuelta
+                ocs_batch = [oc for oc in ocs_batch if oc > frontera]
+
+            if not ocs_batch:
+                # Una sola OC con más líneas que el lote: leerla completa
+                ocs_batch = [frontera]
+                por_oc[frontera] = {
+                    ln.get('id'): ln for ln in
+                    supabase.table("orden_de_compra").select(CAMPOS_BUSQUEDA).eq(
+                        "orden_compra", frontera).execute().data or []
+                }
+
+            for oc in ocs_batch:
+                lineas_oc = list(por_oc[oc].values())
+                desde_oc = oc
+                # Ya apareció en un nivel más relevante
+                if any(ln.get('proveedor') in prov_previos or ln.get('proyecto') in proy_previos
+                       for ln in lineas_oc):
+                    continue
+                lineas.extend(lineas_oc)
+                ocs_vistas.append(oc)
+                if len(ocs_vistas) >= limite:
+                    return lineas, f"{nivel}:{oc}"
+
+            if completo:
+                break
+
+        prov_previos.update(prov_ids)
+        proy_previos.update(proy_ids)
+
+    return lineas, None
+
+
 @bp.route("/", methods=["GET"])
 @token_required
 def get_lista_ordenes(current_user):
     """
     Obtiene lista de las últimas 500 órdenes de compra.
-    Query param opcional: buscar=<texto> para buscar en órdenes antiguas
+    Query params opcionales:
+      buscar=<texto>  número de OC, o nombre de proveedor/proyecto (busca en todo el historial)
+      cursor=<str>    valor de 'next_cursor' de la página anterior de una búsqueda de texto
+      limite=<int>    OCs por página en búsquedas de texto (máx. 100)
     """
     supabase = current_app.config['SUPABASE']
     buscar = request.args.get('buscar', '').strip()
+    next_cursor = None
     
     try:
         current_app.logger.info(f"📋 Iniciando carga de órdenes (buscar='{buscar}')...")
         
-        # PASO 1: Obtener números de órdenes
-        if buscar:
-            # Si hay búsqueda, traer hasta 100 resultados filtrados
-            current_app.logger.info(f"🔍 Búsqueda activa: {buscar}")
-            ocs_query = supabase.table("orden_de_compra").select("orden_compra")
-            
-            # Buscar por número de OC
-            if buscar.isdigit():
-                ocs_query = ocs_query.eq("orden_compra", int(buscar))
-            else:
-                # Buscar en texto (proveedor o proyecto) - traer más registros
-                ocs_query = ocs_query.order("orden_compra", desc=True).limit(2000)
-            
-            ultimas_ocs_res = ocs_query.execute()
+        # PASO 1 y 2: Obtener las líneas de las órdenes a listar
+        if buscar and not buscar.isdigit():
+            # Búsqueda de texto resuelta en la base de datos
+            limite = min(request.args.get('limite', BUSQUEDA_LIMITE, type=int) or BUSQUEDA_LIMITE, BUSQUEDA_LIMITE)
+            todas_lineas, next_cursor = buscar_lineas_por_texto(
+                supabase, buscar, request.args.get('cursor'), limite
+            )
+            numeros_oc = list(dict.fromkeys(ln['orden_compra'] for ln in todas_lineas))
         else:
-            # Sin búsqueda: traer últimas 500
-            ultimas_ocs_res = supabase.table("orden_de_compra").select(
-                "orden_compra"
-            ).order("orden_compra", desc=True).limit(1000).execute()  # Traer 1000 líneas para cubrir ~500 OCs
-        
-        if not ultimas_ocs_res.data:
-            return jsonify({"success": True, "data": []})
-        
-        # Obtener números únicos y limitar a 500
-        numeros_oc = sorted(list(set([oc['orden_compra'] for oc in ultimas_ocs_res.data])), reverse=True)[:500]
-        
-        current_app.logger.info(f"📦 Procesando {len(numeros_oc)} órdenes únicas")
-        
-        # PASO 2: Obtener TODAS las líneas de esas órdenes
-        todas_lineas = []
-        chunk_size = 100
-        
-        for i in range(0, len(numeros_oc), chunk_size):
-            chunk = numeros_oc[i:i+chunk_size]
-            lineas_res = supabase.table("orden_de_compra").select(
-                "orden_compra, fecha, total, proveedor, proyecto, art_corr, cantidad"
-            ).in_("orden_compra", chunk).execute()
-            
-            if lineas_res.data:
-                todas_lineas.extend(lineas_res.data)
-        
-        current_app.logger.info(f"📄 Total líneas: {len(todas_lineas)}")
-        
-        # PASO 3: Obtener mapas de proveedores y proyectos
-        proveedores_res = supabase.table("proveedores").select("id, nombre").execute()
-        proveedores_map = {str(p['id']): p['nombre'] for p in (proveedores_res.data or [])}
-        
-        proyectos_res = supabase.table("proyectos").select("id, proyecto").execute()
-        proyectos_map = {str(p['id']): p['proyecto'] for p in (proyectos_res.data or [])}
-        
-        # PASO 4: Obtener TODOS los ingresos con paginación
-        current_app.logger.info("📥 Obteniendo ingresos con paginación...")
-        todos_ingresos = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            batch = supabase.table("ingresos").select(
-                "orden_compra, art_corr, recepcion"
-            ).in_("orden_compra", numeros_oc).range(offset, offset + page_size - 1).execute()
+            if buscar:
+                # Buscar por número de OC
+                current_app.logger.info(f"🔍 Búsqueda activa: {buscar}")
+                ultimas_ocs_res = supabase.table("orden_de_compra").select(
+                    "orden_compra"
+                ).eq("orden_compra", int(buscar)).execute()
+            else:
+                # Sin búsqueda: traer últimas 500
+                ultimas_ocs_res = supabase.table("orden_de_compra").select(
+                    "orden_compra"
+                ).order("orden_compra", desc=True).limit(1000).execute()  # Traer 1000 líneas para cubrir ~500 OCs
             
-            if not batch.data:
-                break
+            if not ultimas_ocs_res.data:
+                return jsonify({"success": True, "data": []})
             
-            todos_ingresos.extend(batch.data)
+            # Obtener números únicos y limitar a 500
+            numeros_oc = sorted(list(set([oc['orden_compra'] for oc in ultimas_ocs_res.data])), reverse=True)[:500]
             
-            if len(batch.data) < page_size:
-                break
+            # Obtener TODAS las líneas de esas órdenes
+            todas_lineas = []
+            chunk_size = 100
             
-            offset += page_size
+            for i in range(0, len(numeros_oc), chunk_size):
+                chunk = numeros_oc[i:i+chunk_size]
+                lineas_res = supabase.table("orden_de_compra").select(
+                    CAMPOS_LINEA
+                ).in_("orden_compra", chunk).execute()
+                
+                if lineas_res.data:
+                    todas_lineas.extend(lineas_res.data)
         
-        current_app.logger.info(f"📊 Total ingresos obtenidos: {len(todos_ingresos)}")
+        current_app.logger.info(f"📦 Procesando {len(numeros_oc)} órdenes únicas, {len(todas_lineas)} líneas")
         
-        # Agrupar por (orden_compra, art_corr) - NORMALIZAR A STRING
-        cantidades_recibidas = defaultdict(lambda: defaultdict(int))
-        for ing in todos_ingresos:
-            oc_num = ing['orden_compra']
-            art_corr = str(ing['art_corr'])  # ✅ Convertir a string
-            recepcion = int(ing['recepcion'] or 0)
-            cantidades_recibidas[oc_num][art_corr] += recepcion
+        # PASO 3: Mapas de proveedores y proyectos (catálogos en caché)
+        proveedores_map = reference_data.get_catalogo("proveedores")["by_id"]
+        proyectos_map = reference_data.get_catalogo("proyectos")["by_id"]
+        
+        # PASO 4: Cantidades recibidas desde el libro de recepciones
+        recepciones.sincronizar(supabase)
         
         # PASO 5: Agrupar y calcular
         ordenes_agrupadas = defaultdict(lambda: {'lineas': [], 'total': 0})
@@ -107,11 +208,13 @@ def get_lista_ordenes(current_user):
         for linea in todas_lineas:
             oc_num = linea['orden_compra']
             if 'fecha' not in ordenes_agrupadas[oc_num]:
+                prov = proveedores_map.get(linea.get('proveedor'))
+                proy = proyectos_map.get(linea.get('proyecto'))
                 ordenes_agrupadas[oc_num].update({
                     'orden_compra': oc_num,
                     'fecha': linea['fecha'],
-                    'proveedor': proveedores_map.get(str(linea.get('proveedor', '')), 'N/A'),
-                    'proyecto': proyectos_map.get(str(linea.get('proyecto', '')), 'N/A')
+                    'proveedor': prov['nombre'] if prov else 'N/A',
+                    'proyecto': proy['proyecto'] if proy else 'N/A'
                 })
             
             ordenes_agrupadas[oc_num]['total'] += (linea['total'] or 0)
@@ -120,25 +223,13 @@ def get_lista_ordenes(current_user):
                 'cantidad': linea.get('cantidad', 0)
             })
         
-        # PASO 6: Calcular estados
+        # PASO 6: Calcular estados (en el orden de numeros_oc)
         listado_final = []
-        for oc_num, data in ordenes_agrupadas.items():
-            total_sol = sum(ln['cantidad'] or 0 for ln in data['lineas'])
-            total_rec = sum(cantidades_recibidas[oc_num][ln['art_corr']] for ln in data['lineas'])
-            
-            if total_rec == 0:
-                estado = 'Pendiente'
-            elif total_rec >= total_sol:
-                estado = 'Recibida'
-            else:
-                estado = 'Parcial'
-            
-            # Filtrar por búsqueda de texto si aplica
-            if buscar and not buscar.isdigit():
-                buscar_lower = buscar.lower()
-                if not (buscar_lower in data['proveedor'].lower() or 
-                        buscar_lower in data['proyecto'].lower()):
-                    continue
+        for oc_num in numeros_oc:
+            data = ordenes_agrupadas.get(oc_num)
+            if not data:
+                continue
+            estado = recepciones.calcular_estado(oc_num, data['lineas'])
             
             listado_final.append({
                 'orden_compra': data['orden_compra'],
@@ -149,10 +240,8 @@ def get_lista_ordenes(current_user):
                 'total': data['total']
             })
         
-        listado_final.sort(key=lambda x: x['orden_compra'], reverse=True)
-        
         current_app.logger.info(f"✅ Retornando {len(listado_final)} órdenes")
-        return jsonify({"success": True, "data": listado_final})
+        return jsonify({"success": True, "data": listado_final, "next_cursor": next_cursor})
     
     except Exception as e:
         current_app.logger.error(f"❌ Error: {str(e)}")
@@ -180,49 +269,22 @@ def get_detalle_orden(current_user, oc_numero):
         
         # Obtener datos relacionados
         proveedor_data = {'nombre': 'N/A', 'rut': 'N/A'}
-        if primera.get('proveedor'):
-            prov = supabase.table("proveedores").select("nombre, rut").eq("id", primera['proveedor']).limit(1).execute()
-            if prov.data:
-                proveedor_data = prov.data[0]
+        prov = reference_data.get_por_id("proveedores", primera.get('proveedor'))
+        if prov:
+            proveedor_data = {'nombre': prov.get('nombre'), 'rut': prov.get('rut')}
         
         proyecto_nombre = 'N/A'
-        if primera.get('proyecto'):
-            proy = supabase.table("proyectos").select("proyecto").eq("id", primera['proyecto']).limit(1).execute()
-            if proy.data:
-                proyecto_nombre = proy.data[0]['proyecto']
+        proy = reference_data.get_por_id("proyectos", primera.get('proyecto'))
+        if proy:
+            proyecto_nombre = proy['proyecto']
         
         solicitante_nombre = 'N/A'
-        if primera.get('solicita'):
-            trab = supabase.table("trabajadores").select("nombre").eq("id", primera['solicita']).limit(1).execute()
-            if trab.data:
-                solicitante_nombre = trab.data[0]['nombre']
-        
-        # Ingresos (usando campo 'recepcion' con paginación)
-        current_app.logger.info(f"📥 Obteniendo ingresos para OC {oc_numero}...")
-        todos_ingresos = []
-        page_size = 1000
-        offset = 0
-        
-        while True:
-            batch = supabase.table("ingresos").select(
-                "art_corr, recepcion"
-            ).eq("orden_compra", oc_numero).range(offset, offset + page_size - 1).execute()
-            
-            if not batch.data:
-                break
-            
-            todos_ingresos.extend(batch.data)
-            
-            if len(batch.data) < page_size:
-                break
-            
-            offset += page_size
-        
-        current_app.logger.info(f"📊 Total ingresos: {len(todos_ingresos)}")
+        trab = reference_data.get_por_id("trabajadores", primera.get('solicita'))
+        if trab:
+            solicitante_nombre = trab['nombre']
         
-        cantidades_recibidas = defaultdict(int)
-        for ing in todos_ingresos:
-            cantidades_recibidas[str(ing['art_corr'])] += int(ing['recepcion'] or 0)  # ✅ Convertir a string
+        # Cantidades recibidas por línea desde el libro de recepciones
+        recepciones.sincronizar(supabase)
         
         # Construir respuesta
         orden_data = {
@@ -244,7 +306,7 @@ def get_detalle_orden(current_user, oc_numero):
         
         for linea in detalle_res.data:
             cant_sol = linea.get('cantidad') or 0
-            cant_rec = cantidades_recibidas[str(linea['art_corr'])]  # ✅ Convertir a string
+            cant_rec = recepciones.cantidad_recibida(oc_numero, linea['art_corr'])
             
             total_sol += cant_sol
             total_rec += cant_rec
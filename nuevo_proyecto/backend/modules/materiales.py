@@ -5,6 +5,8 @@ Mantiene compatibilidad con estructura existente
 
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils.reference_data import invalidar_catalogo
+from backend.utils import typeahead
 
 bp = Blueprint("materiales", __name__)
 
@@ -102,10 +104,11 @@ def new_material(current_user):
             
             # Invalidar cache si existe
             try:
-                from backend.utils.cache import clear_cache
-                clear_cache("materiales")
+                from backend.utils.cache import invalidate
+                invalidate("materiales")
             except:
                 pass
+            invalidar_catalogo("materiales")
             
             return jsonify({
                 "success": True,
@@ -177,10 +180,11 @@ def edit_material(id, current_user):
             
             # Invalidar cache si existe
             try:
-                from backend.utils.cache import clear_cache
-                clear_cache("materiales")
+                from backend.utils.cache import invalidate
+                invalidate("materiales")
             except:
                 pass
+            invalidar_catalogo("materiales")
             
             return jsonify({
                 "success": True,
@@ -205,15 +209,7 @@ def api_search(current_user):
         if not term:
             return jsonify({"results": []})
         
-        supabase = current_app.config['SUPABASE']
-        materiales = (
-            supabase.table("materiales")
-            .select("id, cod, material")
-            .or_(f"cod.ilike.%{term}%,material.ilike.%{term}%")
-            .limit(20)
-            .execute()
-            .data or []
-        )
+        materiales = typeahead.buscar("materiales", term, 20, campos=("cod", "material"))
         
         results = [{"id": m["id"], "text": f"{m['cod']} - {m['material']}"} for m in materiales]
         return jsonify({"results": results})
@@ -7,7 +7,10 @@ from flask import Blueprint, request, jsonify, current_app
 # Decorador para proteger rutas, asegurando que solo usuarios logueados accedan.
 from backend.utils.decorators import token_required
 # Decorador para cachear respuestas de la API en Redis y mejorar el rendimiento.
-from backend.utils.cache import cache_result
+from backend.utils.cache import cache_result, invalidate, request_key
+from backend.utils import typeahead
+# Libro compartido de cantidades recibidas por línea de OC.
+from backend.utils import recepciones
 
 bp = Blueprint("ordenes", __name__)
 
@@ -132,6 +135,7 @@ def create_orden(current_user):
 
         # En Supabase v2, el error se encuentra en el objeto `error`
         if res.data:
+             invalidate("ordenes")
              return jsonify({"success": True, "message": f"Orden de Compra {next_oc_num} creada exitosamente con {len(res.data)} líneas.", "orden_compra": next_oc_num})
         else:
             # Manejar el caso de que no haya datos y tampoco error explícito
@@ -146,7 +150,7 @@ def create_orden(current_user):
 
 @bp.route("/", methods=["GET"])
 @token_required
-# @cache_result(ttl_seconds=60) # Cache comentado: causa error de serialización con User
+@cache_result(ttl_seconds=60, key_func=request_key(), tags=["ordenes"])
 def get_listado_ordenes(current_user):
     """
     Devuelve un listado resumido de todas las órdenes de compra.
@@ -162,9 +166,8 @@ def get_listado_ordenes(current_user):
         if not ordenes_res.data:
             return jsonify({"success": True, "data": []})
 
-        # --- 2. Obtener OCs con ingresos para determinar estado ---
-        ingresos_res = supabase.table("ingresos").select("orden_compra").execute()
-        ocs_recibidas = {ingreso['orden_compra'] for ingreso in (ingresos_res.data or [])}
+        # --- 2. OCs con ingresos (libro de recepciones) para determinar estado ---
+        recepciones.sincronizar(supabase)
 
         # --- 3. Agrupar en Python (lógica idéntica a la anterior) ---
         ordenes_agrupadas = defaultdict(lambda: {'total': 0, 'lineas': 0})
@@ -180,9 +183,10 @@ def get_listado_ordenes(current_user):
             ordenes_agrupadas[oc_num]['lineas'] += 1
 
         # --- 4. Determinar estado y convertir a lista ---
+        # Este listado solo distingue 'Recibida' (con algún ingreso) y 'Pendiente'.
         listado_final = []
         for oc_num, data in ordenes_agrupadas.items():
-            data['estado'] = 'Recibida' if oc_num in ocs_recibidas else 'Pendiente'
+            data['estado'] = 'Recibida' if recepciones.oc_tiene_ingresos(oc_num) else 'Pendiente'
             listado_final.append(data)
             
         listado_final = sorted(listado_final, key=lambda x: x['orden_compra'], reverse=True)
@@ -196,7 +200,8 @@ def get_listado_ordenes(current_user):
 
 @bp.route("/<int:oc_numero>", methods=["GET"])
 @token_required
-# @cache_result(ttl_seconds=120) # Cache comentado: causa error de serialización con User
+@cache_result(ttl_seconds=120, key_func=request_key(),
+              tags=lambda args, kwargs: [f"ordenes:oc:{kwargs.get('oc_numero')}"])
 def get_detalle_orden(current_user, oc_numero):
     """
     Devuelve el detalle completo de una OC específica.
@@ -212,11 +217,8 @@ def get_detalle_orden(current_user, oc_numero):
         if not detalle_res.data:
             return jsonify({"success": False, "message": "Orden de Compra no encontrada"}), 404
 
-        # --- 2. Obtener cantidades recibidas desde 'ingresos' ---
-        ingresos_res = supabase.table("ingresos").select("art_corr, cantidad_ingresada").eq("orden_compra", oc_numero).execute()
-        cantidades_recibidas = defaultdict(int)
-        for ingreso in (ingresos_res.data or []):
-            cantidades_recibidas[ingreso['art_corr']] += (ingreso['cantidad_ingresada'] or 0)
+        # --- 2. Obtener cantidades recibidas desde el libro de recepciones ---
+        recepciones.sincronizar(supabase)
 
         # --- 3. Procesar y construir la respuesta JSON ---
         primera_linea = detalle_res.data[0]
@@ -238,7 +240,7 @@ def get_detalle_orden(current_user, oc_numero):
         total_recibido = 0
         for linea in detalle_res.data:
             cantidad_solicitada = linea['cantidad'] or 0
-            cantidad_recibida = cantidades_recibidas[linea['art_corr']]
+            cantidad_recibida = recepciones.cantidad_recibida(oc_numero, linea['art_corr'])
             total_solicitado += cantidad_solicitada
             total_recibido += cantidad_recibida
             
@@ -307,7 +309,6 @@ def get_next_oc_number(current_user):
 
 @bp.route("/helpers/autocomplete/<string:resource>", methods=["GET"])
 @token_required
-# @cache_result(ttl_seconds=600) # Comentado: causa error de serialización con User
 def get_autocomplete_data(current_user, resource):
     """
     Endpoint genérico para autocompletado.
@@ -327,20 +328,17 @@ def get_autocomplete_data(current_user, resource):
     except ValueError:
         limit = 20
 
-    supabase = current_app.config['SUPABASE']
-    
-    # Mapeo para configurar la búsqueda por recurso
+    # Mapeo para configurar la búsqueda por recurso (sobre el índice en memoria)
     config = {
         'proveedores': {
-            'table': 'proveedores', 
-            'search_field': 'nombre', 
+            'catalogo': 'proveedores',
             'value_field': 'id', 
             'label_field': 'nombre',
             'extra_fields': 'rut'  # Agregamos el RUT
         },
-        'proyectos': {'table': 'proyectos', 'search_field': 'proyecto', 'value_field': 'id', 'label_field': 'proyecto', 'filter_active': True},
-        'trabajadores': {'table': 'trabajadores', 'search_field': 'nombre', 'value_field': 'id', 'label_field': 'nombre'},
-        'materiales': {'table': 'materiales', 'search_field': 'material', 'value_field': 'cod', 'label_field': 'material'}
+        'proyectos': {'catalogo': 'proyectos', 'value_field': 'id', 'label_field': 'proyecto', 'filtro': 'activos'},
+        'trabajadores': {'catalogo': 'trabajadores', 'value_field': 'id', 'label_field': 'nombre'},
+        'materiales': {'catalogo': 'materiales', 'value_field': 'cod', 'label_field': 'material'}
     }
 
     if resource not in config:
@@ -348,32 +346,15 @@ def get_autocomplete_data(current_user, resource):
 
     res_config = config[resource]
     try:
-        # Construir la query base - incluir campos extra si existen
-        select_fields = f"{res_config['value_field']}, {res_config['label_field']}"
-        if res_config.get('extra_fields'):
-            select_fields += f", {res_config['extra_fields']}"
-        
-        query = supabase.table(res_config['table']).select(select_fields)
-        
-        # Si hay término de búsqueda, aplicar filtro ilike
+        # Con menos de 2 caracteres se devuelven los primeros en orden alfabético
         if term and len(term) >= 2:
-            query = query.ilike(res_config['search_field'], f"%{term}%")
-        
-        # Aplicar filtros adicionales según el recurso
-        if res_config.get('filter_active'):
-            query = query.eq('activo', True)
-        
-        # Ordenar y limitar resultados
-        query = query.order(res_config['label_field']).limit(limit)
-            
-        response = query.execute()
-
-        if not response.data:
-            return jsonify({"results": []})
+            filas = typeahead.buscar(res_config['catalogo'], term, limit, filtro=res_config.get('filtro'))
+        else:
+            filas = typeahead.primeros(res_config['catalogo'], limit, filtro=res_config.get('filtro'))
 
         # Formatear para react-select: { value, label, ...extras }
         results = []
-        for item in response.data:
+        for item in filas:
             result_item = {
                 "value": item[res_config['value_field']],
                 "label": item[res_config['label_field']]
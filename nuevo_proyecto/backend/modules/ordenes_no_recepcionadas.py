@@ -5,6 +5,9 @@ CORREGIDO: Muestra OCs con al menos una línea pendiente y suma solo montos pend
 
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils import recepciones
+from backend.utils import reference_data
+from backend.utils.cache import invalidate
 from datetime import datetime, date
 from collections import Counter
 
@@ -36,58 +39,13 @@ def normalize_art_corr(value):
 
 
 def get_proveedores_map(supabase):
-    """Obtiene mapeo de proveedores"""
+    """Obtiene mapeo de proveedores (id en texto -> nombre) desde el catálogo en memoria"""
     try:
-        response = supabase.table("proveedores").select("id, nombre").execute()
-        return {str(p['id']): p['nombre'] for p in (response.data or [])}
+        return {str(k): nombre for k, nombre in reference_data.get_mapa("proveedores", "nombre").items()}
     except Exception:
         return {}
 
 
-def get_all_ingresos(supabase):
-    """Obtiene todos los ingresos con paginación (CRÍTICO: sin esto solo trae 1000 registros)"""
-    all_ingresos = []
-    start = 0
-    page_size = 1000
-    
-    try:
-        while True:
-            response = supabase.table("ingresos").select("orden_compra, art_corr").range(
-                start, start + page_size - 1
-            ).execute()
-            rows = response.data or []
-            
-            if not rows:
-                break
-            
-            all_ingresos.extend(rows)
-            
-            # Si recibimos menos registros que el tamaño de página, ya terminamos
-            if len(rows) < page_size:
-                break
-            
-            start += page_size
-        
-        return all_ingresos
-    except Exception as e:
-        current_app.logger.error(f"Error obteniendo ingresos: {e}")
-        return []
-
-
-def create_ingresos_set(ingresos):
-    """Crea set de tuplas (oc, art_corr) para búsqueda rápida"""
-    # Construimos el set usando la tupla (orden_compra, art_corr) para que
-    # la comparación se haga por línea (igual que el sistema original).
-    # art_corr se normaliza para evitar errores de formato/espacios.
-    ingresos_set = set()
-    for ing in ingresos:
-        oc = safe_str(ing.get("orden_compra"))
-        art = normalize_art_corr(ing.get("art_corr"))
-        if oc:
-            ingresos_set.add((oc, art))
-    return ingresos_set
-
-
 @bp.route("/lista", methods=["GET"])
 @token_required
 def lista_ordenes_pendientes(current_user):
@@ -140,10 +98,8 @@ def lista_ordenes_pendientes(current_user):
         # Obtener mapeo de proveedores
         proveedor_map = get_proveedores_map(supabase)
         
-        # Obtener todos los ingresos
-        ingresos = get_all_ingresos(supabase)
-        ingresos_set = create_ingresos_set(ingresos)
-        current_app.logger.info(f"Total ingresos registrados: {len(ingresos)}")
+        # Ingresos registrados, desde el libro de recepciones
+        recepciones.sincronizar(supabase)
         
         # Procesar OCs pendientes línea por línea (igual que sistema antiguo)
         # Una OC se muestra si tiene AL MENOS UNA línea sin ingreso
@@ -159,11 +115,8 @@ def lista_ordenes_pendientes(current_user):
             fecha = ln.get("fecha")
             monto_total = safe_float(ln.get("total"))
             
-            art_corr = normalize_art_corr(ln.get("art_corr"))
-            clave = (oc, art_corr)
-            
             # Si esta línea NO está en ingresos, es pendiente
-            if clave not in ingresos_set:
+            if not recepciones.tiene_ingreso(oc, ln.get("art_corr")):
                 if oc not in oc_pendientes:
                     oc_pendientes[oc] = {
                         "orden_compra": oc,
@@ -232,12 +185,10 @@ def detalle_orden(current_user, oc_numero):
         if isinstance(fecha_val, (datetime, date)):
             fecha_val = fecha_val.isoformat()
 
-        # Obtener ingresos de esta OC
-        ingresos_response = supabase.table("ingresos").select("art_corr").eq("orden_compra", oc_numero).execute()
-        ingresos_oc = ingresos_response.data or []
-        
-        # Verificar si se puede eliminar (no tiene ingresos)
-        puede_eliminar = len(ingresos_oc) == 0
+        # Verificar si se puede eliminar (no tiene ingresos); eliminar_orden
+        # vuelve a comprobarlo contra la tabla antes de borrar
+        recepciones.sincronizar(supabase)
+        puede_eliminar = not recepciones.oc_tiene_ingresos(oc_numero)
         
         # Preparar líneas con formato
         lineas_formateadas = []
@@ -299,6 +250,7 @@ def sacar_del_informe(current_user, oc_numero):
         }).eq("orden_compra", oc_numero).execute()
         
         updated_count = len(result.data) if result.data else 0
+        invalidate("ordenes", f"ordenes:oc:{oc_numero}")
         
         current_app.logger.info(f"OC {oc_numero} sacada del informe. Registros actualizados: {updated_count}")
         
@@ -340,6 +292,8 @@ def eliminar_orden(current_user, oc_numero):
         result = supabase.table("orden_de_compra").delete().eq("orden_compra", oc_numero).execute()
         
         deleted_count = len(result.data) if result.data else 0
+        recepciones.olvidar_oc(oc_numero)
+        invalidate("ordenes", f"ordenes:oc:{oc_numero}")
         
         current_app.logger.info(f"OC {oc_numero} eliminada. Registros eliminados: {deleted_count}")
         
@@ -357,6 +311,21 @@ def eliminar_orden(current_user, oc_numero):
         }), 500
 
 
+@bp.route("/recepciones/reconstruir", methods=["POST"])
+@token_required
+def reconstruir_recepciones(current_user):
+    """
+    Reconstruye desde cero el libro de recepciones de este worker.
+    Solo es necesario si se modificó la tabla ingresos por fuera de la API.
+    """
+    try:
+        recepciones.reconstruir(current_app.config['SUPABASE'])
+        return jsonify({"success": True, "data": recepciones.estadisticas()})
+    except Exception as e:
+        current_app.logger.error(f"Error reconstruyendo libro de recepciones: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
 @bp.route("/diagnostics", methods=["GET"]) 
 @token_required
 def diagnostics(current_user):
@@ -373,7 +342,8 @@ def diagnostics(current_user):
             "orden_compra, total, art_corr, elimina_oc, proyecto"
         ).order("orden_compra", desc=True).execute().data or []
 
-        ingresos_rows = supabase.table("ingresos").select("orden_compra, art_corr").execute().data or []
+        recepciones.sincronizar(supabase)
+        ingresos_set = recepciones.claves_ingresos()
 
         # Filtrar no eliminadas usando la bandera configurada
         oc_rows_no_elim = [ln for ln in oc_rows if safe_str(ln.get("elimina_oc")) != ELIMINA_OC_FLAG]
@@ -382,7 +352,7 @@ def diagnostics(current_user):
         distinct_oc_set = {safe_str(ln.get("orden_compra")) for ln in oc_rows_no_elim if ln.get("orden_compra") is not None}
         total_distinct_oc = len(distinct_oc_set)
 
-        distinct_ing_oc_set = {safe_str(i.get("orden_compra")) for i in ingresos_rows if i.get("orden_compra")}
+        distinct_ing_oc_set = recepciones.ocs_con_ingresos()
         total_distinct_ing_oc = len(distinct_ing_oc_set)
 
         # Intersección
@@ -405,8 +375,6 @@ def diagnostics(current_user):
             top_ocs.append({"orden_compra": oc, "lineas": cnt, "suma_total": oc_total.get(oc, 0)})
 
         # OCs pendientes según la lógica actual (replicar lista)
-        ingresos_set = create_ingresos_set(ingresos_rows)
-
         oc_pendientes = {}
         for ln in oc_rows_no_elim:
             oc = safe_str(ln.get("orden_compra"))
@@ -433,7 +401,7 @@ def diagnostics(current_user):
             "success": True,
             "total_rows_no_eliminadas": total_rows,
             "total_distinct_oc": total_distinct_oc,
-            "total_ingresos_rows": len(ingresos_rows),
+            "total_ingresos_rows": recepciones.estadisticas()["filas"],
             "total_distinct_ing_oc": total_distinct_ing_oc,
             "intersect_oc_with_ingresos": inters_count,
             "top_ocs_by_lines": top_ocs,
@@ -474,9 +442,9 @@ def diagnostics_detailed(current_user):
             elimina_oc_values[key]["ocs"] = list(elimina_oc_values[key]["ocs"])
             elimina_oc_values[key]["total_ocs"] = len(elimina_oc_values[key]["ocs"])
 
-        # 3. Obtener ingresos
-        ingresos = supabase.table("ingresos").select("orden_compra, art_corr").execute().data or []
-        ingresos_set = create_ingresos_set(ingresos)
+        # 3. Claves de ingresos desde el libro de recepciones
+        recepciones.sincronizar(supabase)
+        ingresos_set = recepciones.claves_ingresos()
 
         # 4. Filtrar con diferentes criterios
         filters_comparison = {}
@@ -526,7 +494,7 @@ def diagnostics_detailed(current_user):
             "success": True,
             "elimina_oc_values_found": elimina_oc_values,
             "filters_comparison": filters_comparison,
-            "total_ingresos": len(ingresos),
+            "total_ingresos": recepciones.estadisticas()["filas"],
             "recommendation": "Usa el filtro que te da 31 OCs pendientes"
         })
 
@@ -554,9 +522,9 @@ def diagnostics_lines(current_user):
 
         oc_rows = [ln for ln in oc_rows if safe_str(ln.get("elimina_oc")) != ELIMINA_OC_FLAG]
 
-        # Obtener ingresos
-        ingresos = supabase.table("ingresos").select("orden_compra, art_corr, id").execute().data or []
-        ingresos_set = create_ingresos_set(ingresos)
+        # Claves de ingresos desde el libro de recepciones
+        recepciones.sincronizar(supabase)
+        ingresos_set = recepciones.claves_ingresos()
 
         # Crear set de tuplas de líneas para comparación
         order_line_tuples = set()
@@ -605,17 +573,14 @@ def diagnostics_lines(current_user):
                 })
             sample_details[oc] = detalle
 
-        # Ingresos sin match con ninguna línea (posibles orfanos)
+        # Claves de ingresos sin match con ninguna línea (posibles orfanos)
         ingresos_sin_match = []
-        for ing in ingresos:
-            oc = safe_str(ing.get("orden_compra"))
-            art = normalize_art_corr(ing.get("art_corr"))
+        for oc, art in ingresos_set:
             if (oc, art) not in order_line_tuples:
                 ingresos_sin_match.append({
-                    "id": ing.get("id"),
                     "orden_compra": oc,
-                    "art_corr_raw": ing.get("art_corr"),
-                    "art_corr_norm": art
+                    "art_corr_norm": art,
+                    "cantidad_recibida": recepciones.cantidad_recibida(oc, art)
                 })
 
         return jsonify({
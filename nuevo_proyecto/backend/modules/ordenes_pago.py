@@ -7,6 +7,14 @@ from io import BytesIO
 # ========= Importaciones de Utilidades =========
 from backend.utils.decorators import token_required
 from backend.utils.cache import cache_result
+from backend.utils import reference_data
+from backend.pdf import cache_pdf
+from backend.pdf.estilos import ESTILOS_OP_RESUMEN, TABLAS_OP_RESUMEN
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+from backend.utils.resumen_financiero import invalidar_resumenes
+from backend.modules.documentos_pendientes import completar_documentos, _es_lista_de_ids
 
 bp = Blueprint("ordenes_pago", __name__)
 
@@ -72,18 +80,12 @@ def get_documentos_pendientes(current_user):
             return jsonify({"success": True, "data": response_data})
         
         # 2. Obtener datos del proveedor
-        prov = (
-            supabase.table("proveedores")
-            .select("id, nombre, rut, paguese_a, cuenta, banco, correo")
-            .eq("id", proveedor_id)
-            .limit(1)
-            .execute().data or []
-        )
+        prov = reference_data.get_por_id("proveedores", proveedor_id, recargar_si_falta=True)
         
         if not prov:
             return jsonify({"success": False, "message": "Proveedor no encontrado"}), 404
         
-        response_data["proveedor_seleccionado"] = prov[0]
+        response_data["proveedor_seleccionado"] = dict(prov)
         
         # 3. Obtener todos los ingresos del proveedor
         ingresos = (
@@ -182,20 +184,7 @@ def get_detalle_documento(current_user):
         
         pagados_ids = {op["ingreso_id"] for op in ordenes_pago if op.get("ingreso_id")}
         
-        # 3. Obtener nombres de materiales
-        mat_ids = {i["material"] for i in ingresos if i.get("material")}
-        mat_map = {}
-        
-        if mat_ids:
-            mats = (
-                supabase.table("materiales")
-                .select("id, material")
-                .in_("id", list(mat_ids))
-                .execute().data or []
-            )
-            mat_map = {m["id"]: m["material"] for m in mats}
-        
-        # 4. Obtener fac_sin_iva de orden_de_compra por art_corr
+        # 3. Obtener fac_sin_iva de orden_de_compra por art_corr
         oc_sin_iva_map = {}
         art_corrs = {(ing.get("orden_compra"), ing.get("art_corr")) for ing in ingresos if ing.get("art_corr")}
         
@@ -216,13 +205,14 @@ def get_detalle_documento(current_user):
                 except Exception as e:
                     current_app.logger.error(f"Error obteniendo fac_sin_iva para OC {oc_num} art {art_corr}: {e}")
         
-        # 5. Construir resultado
+        # 4. Construir resultado (nombres de material desde el catálogo en memoria)
         result = []
         for ing in ingresos:
             if ing["id"] in pagados_ids:
                 continue
             
-            material_nombre = mat_map.get(ing["material"], f"Material ID: {ing['material']}")
+            material = reference_data.get_por_id("materiales", ing["material"])
+            material_nombre = material.get("material") if material else f"Material ID: {ing['material']}"
             key = (ing.get("orden_compra"), ing.get("art_corr"))
             fac_sin_iva = oc_sin_iva_map.get(key, 0)
             
@@ -333,16 +323,10 @@ def create_orden_pago(current_user):
             fac_sin_iva = oc.get("fac_sin_iva", 0)
             
             # Obtener tipo e item del material
-            mat_data = (
-                supabase.table("materiales")
-                .select("tipo, item")
-                .eq("id", material_id)
-                .limit(1)
-                .execute().data or []
-            )
+            mat_data = reference_data.get_por_id("materiales", material_id, recargar_si_falta=True)
             
-            tipo_val = mat_data[0].get("tipo") if mat_data else None
-            item_val = mat_data[0].get("item") if mat_data else None
+            tipo_val = mat_data.get("tipo") if mat_data else None
+            item_val = mat_data.get("item") if mat_data else None
             
             # Calcular totales
             neto_total = cantidad * neto_unitario
@@ -391,6 +375,7 @@ def create_orden_pago(current_user):
             return jsonify({"success": False, "message": "No se generaron registros válidos"}), 400
         
         result = supabase.table("orden_de_pago").insert(registros).execute()
+        invalidar_resumenes()
         
         if result.data:
             return jsonify({
@@ -611,15 +596,10 @@ def completar_documento_pendiente(current_user, id):
     
     try:
         # Actualizar registro
-        result = (
-            supabase.table("orden_de_pago")
-            .update({"factura": factura, "estado_documento": "completado"})
-            .eq("id", id)
-            .execute()
-        )
+        filas = completar_documentos(supabase, [id], factura)
         
-        if result.data:
-            return jsonify({"success": True, "message": "Documento actualizado correctamente"})
+        if filas:
+            return jsonify({"success": True, "message": "Documento actualizado correctamente", "filas_actualizadas": filas})
         else:
             return jsonify({"success": False, "message": "No se pudo actualizar"}), 500
         
@@ -628,6 +608,43 @@ def completar_documento_pendiente(current_user, id):
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
 
 
+@bp.route("/pendientes", methods=["PUT"])
+@token_required
+def completar_documentos_pendientes(current_user):
+    """
+    Completa en bloque el documento de varias líneas de orden de pago.
+    Body: {"ids": [...], "factura": "..."}
+    """
+    data = request.get_json() or {}
+    supabase = current_app.config['SUPABASE']
+    factura = (data.get("factura") or "").strip()
+    ids = data.get("ids") or []
+    
+    if not factura:
+        return jsonify({"success": False, "message": "Número de documento requerido"}), 400
+    
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"success": False, "message": "Debe especificar 'ids'"}), 400
+    if not _es_lista_de_ids(ids):
+        return jsonify({"success": False, "message": "'ids' debe ser una lista de enteros"}), 400
+    
+    try:
+        filas = completar_documentos(supabase, ids, factura)
+        
+        if filas:
+            return jsonify({
+                "success": True,
+                "message": f"{filas} documento(s) actualizado(s)",
+                "filas_actualizadas": filas
+            })
+        else:
+            return jsonify({"success": False, "message": "No se encontraron documentos para actualizar"}), 404
+        
+    except Exception as e:
+        current_app.logger.error(f"Error al completar documentos {ids}: {str(e)}")
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+
 # ================================================================
 # ENDPOINTS AUXILIARES
 # ================================================================
@@ -662,6 +679,99 @@ def check_iva_oc(current_user, oc_numero):
 # ENDPOINT GENERAR PDF
 # ================================================================
 
+VERSION_PLANTILLA_RESUMEN = 1  # subir al cambiar el diseño del PDF resumen (invalida la caché de PDFs)
+
+
+def _renderizar_pdf_orden(orden_numero, lineas, sin_iva):
+    """Renderiza el PDF resumen de una orden de pago y devuelve sus bytes."""
+    # Datos del encabezado
+    primera = lineas[0]
+    
+    # Crear PDF en memoria
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    story = []
+    # Estilos del registro compartido (ver backend/pdf/estilos.py)
+    title_style = ESTILOS_OP_RESUMEN['CustomTitle']
+    
+    # Título
+    story.append(Paragraph(f"<b>Orden de Pago #{orden_numero}</b>", title_style))
+    story.append(Spacer(1, 0.3*inch))
+    
+    # Información de la empresa (encabezado)
+    empresa_data = [
+        ["SOMYL S.A."],
+        ["RUT: 76.002.581-K"],
+        ["TELECOMUNICACIONES"],
+        ["PUERTA ORIENTE 361 OF 311 B TORRE B COLINA"],
+        ["Tel: 232642974"]
+    ]
+    
+    empresa_table = Table(empresa_data, colWidths=[6*inch])
+    empresa_table.setStyle(TABLAS_OP_RESUMEN["empresa"])
+    story.append(empresa_table)
+    story.append(Spacer(1, 0.2*inch))
+    
+    # Información del proveedor y detalles
+    info_data = [
+        ["<b>Páguese a:</b>", primera.get("proveedor_nombre", "")],
+        ["<b>Autorizado por:</b>", primera.get("autoriza_nombre", "")],
+        ["<b>Fecha Factura:</b>", primera.get("fecha_factura", "")],
+        ["<b>Vencimiento:</b>", primera.get("vencimiento", "")],
+        ["<b>Estado de Pago:</b>", primera.get("estado_pago", "")],
+        ["<b>Detalle:</b>", primera.get("detalle_compra", "")],
+    ]
+    
+    info_table = Table(info_data, colWidths=[2*inch, 4*inch])
+    info_table.setStyle(TABLAS_OP_RESUMEN["info"])
+    story.append(info_table)
+    story.append(Spacer(1, 0.3*inch))
+    
+    # Tabla de materiales
+    material_data = [["Descripción", "Cantidad", "Neto Unit.", "Total Neto"]]
+    
+    total_neto = 0
+    total_iva = 0
+    
+    for linea in lineas:
+        desc = linea.get("material_nombre", "")
+        cant = linea.get("cantidad", 0)
+        neto_u = linea.get("neto_unitario", 0)
+        neto_t = linea.get("neto_total_recibido", 0)
+        
+        material_data.append([
+            desc,
+            str(cant),
+            f"${neto_u:,.0f}",
+            f"${neto_t:,.0f}"
+        ])
+        
+        total_neto += neto_t
+    
+    total_iva = 0 if sin_iva else total_neto * 0.19
+    total_final = total_neto + total_iva
+    
+    material_table = Table(material_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
+    material_table.setStyle(TABLAS_OP_RESUMEN["materiales"])
+    story.append(material_table)
+    story.append(Spacer(1, 0.3*inch))
+    
+    # Totales
+    totales_data = [
+        ["<b>Total Neto:</b>", f"${total_neto:,.0f}"],
+        [f"<b>IVA (19%){'- EXENTO' if sin_iva else ''}:</b>", f"${total_iva:,.0f}"],
+        ["<b>Total a Pagar:</b>", f"<b>${total_final:,.0f}</b>"]
+    ]
+    
+    totales_table = Table(totales_data, colWidths=[4*inch, 2*inch])
+    totales_table.setStyle(TABLAS_OP_RESUMEN["totales"])
+    story.append(totales_table)
+    
+    # Generar PDF
+    doc.build(story)
+    return buffer.getvalue()
+
+
 @bp.route("/pdf/<int:orden_numero>", methods=["GET"])
 @token_required
 def generar_pdf_orden(current_user, orden_numero):
@@ -671,13 +781,6 @@ def generar_pdf_orden(current_user, orden_numero):
     supabase = current_app.config['SUPABASE']
     
     try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-        
         # Obtener datos de la orden
         lineas = (
             supabase.table("orden_de_pago")
@@ -689,90 +792,6 @@ def generar_pdf_orden(current_user, orden_numero):
         if not lineas:
             return jsonify({"success": False, "message": "Orden no encontrada"}), 404
         
-        # Datos del encabezado
-        primera = lineas[0]
-        
-        # Crear PDF en memoria
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # Estilo personalizado para título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#2c5aa0'),
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        
-        # Título
-        story.append(Paragraph(f"<b>Orden de Pago #{orden_numero}</b>", title_style))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Información de la empresa (encabezado)
-        empresa_data = [
-            ["SOMYL S.A."],
-            ["RUT: 76.002.581-K"],
-            ["TELECOMUNICACIONES"],
-            ["PUERTA ORIENTE 361 OF 311 B TORRE B COLINA"],
-            ["Tel: 232642974"]
-        ]
-        
-        empresa_table = Table(empresa_data, colWidths=[6*inch])
-        empresa_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.grey),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ]))
-        story.append(empresa_table)
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Información del proveedor y detalles
-        info_data = [
-            ["<b>Páguese a:</b>", primera.get("proveedor_nombre", "")],
-            ["<b>Autorizado por:</b>", primera.get("autoriza_nombre", "")],
-            ["<b>Fecha Factura:</b>", primera.get("fecha_factura", "")],
-            ["<b>Vencimiento:</b>", primera.get("vencimiento", "")],
-            ["<b>Estado de Pago:</b>", primera.get("estado_pago", "")],
-            ["<b>Detalle:</b>", primera.get("detalle_compra", "")],
-        ]
-        
-        info_table = Table(info_data, colWidths=[2*inch, 4*inch])
-        info_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
-        ]))
-        story.append(info_table)
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Tabla de materiales
-        material_data = [["Descripción", "Cantidad", "Neto Unit.", "Total Neto"]]
-        
-        total_neto = 0
-        total_iva = 0
-        
-        for linea in lineas:
-            desc = linea.get("material_nombre", "")
-            cant = linea.get("cantidad", 0)
-            neto_u = linea.get("neto_unitario", 0)
-            neto_t = linea.get("neto_total_recibido", 0)
-            
-            material_data.append([
-                desc,
-                str(cant),
-                f"${neto_u:,.0f}",
-                f"${neto_t:,.0f}"
-            ])
-            
-            total_neto += neto_t
-        
         # Verificar si es sin IVA
         oc_numero_check = lineas[0].get("orden_compra")
         sin_iva = False
@@ -786,56 +805,20 @@ def generar_pdf_orden(current_user, orden_numero):
             )
             sin_iva = bool(oc_check[0].get("fac_sin_iva", 0)) if oc_check else False
         
-        total_iva = 0 if sin_iva else total_neto * 0.19
-        total_final = total_neto + total_iva
-        
-        material_table = Table(material_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-        material_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ]))
-        story.append(material_table)
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Totales
-        totales_data = [
-            ["<b>Total Neto:</b>", f"${total_neto:,.0f}"],
-            [f"<b>IVA (19%){'- EXENTO' if sin_iva else ''}:</b>", f"${total_iva:,.0f}"],
-            ["<b>Total a Pagar:</b>", f"<b>${total_final:,.0f}</b>"]
-        ]
-        
-        totales_table = Table(totales_data, colWidths=[4*inch, 2*inch])
-        totales_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
-        ]))
-        story.append(totales_table)
-        
-        # Generar PDF
-        doc.build(story)
-        buffer.seek(0)
+        pdf_bytes = cache_pdf.obtener(
+            "OP_RESUMEN",
+            {"orden_numero": orden_numero, "lineas": lineas, "sin_iva": sin_iva},
+            lambda: _renderizar_pdf_orden(orden_numero, lineas, sin_iva),
+            version=VERSION_PLANTILLA_RESUMEN,
+        )
         
         return send_file(
-            buffer,
+            BytesIO(pdf_bytes),
             mimetype='application/pdf',
             as_attachment=True,
             download_name=f'orden_pago_{orden_numero}.pdf'
         )
         
-    except ImportError:
-        return jsonify({
-            "success": False,
-            "message": "ReportLab no está instalado. Ejecute: pip install reportlab"
-        }), 500
     except Exception as e:
         current_app.logger.error(f"Error al generar PDF: {str(e)}")
         return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
\ No newline at end of file
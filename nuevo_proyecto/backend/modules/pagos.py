@@ -3,6 +3,9 @@
 from flask import Blueprint, request, jsonify, current_app, send_file
 from datetime import date, datetime, timedelta
 from backend.utils.decorators import token_required
+from backend.utils.cache import registrar_cache_local
+from backend.utils import reference_data
+from backend.utils.resumen_financiero import invalidar_resumenes
 import logging
 import io
 import openpyxl
@@ -19,7 +22,10 @@ logger = logging.getLogger(__name__)
 _pagos_cache = {
     "data": None,
     "timestamp": 0,
-    "ttl": 60  # 60 segundos de vida útil
+    "ttl": 60,  # 60 segundos de vida útil
+    "hits": 0,
+    "misses": 0,
+    "segundos_recalculo": 0.0,
 }
 
 def invalidar_cache_pagos():
@@ -27,26 +33,49 @@ def invalidar_cache_pagos():
     _pagos_cache["data"] = None
     _pagos_cache["timestamp"] = 0
 
+
+def _estadisticas_cache_pagos():
+    consultas = _pagos_cache["hits"] + _pagos_cache["misses"]
+    return {
+        "ttl": _pagos_cache["ttl"],
+        "entradas": 1 if _pagos_cache["data"] is not None else 0,
+        "filas": len(_pagos_cache["data"] or []),
+        "edad_segundos": int(time.time() - _pagos_cache["timestamp"]) if _pagos_cache["data"] is not None else None,
+        "hits": _pagos_cache["hits"],
+        "misses": _pagos_cache["misses"],
+        "hit_rate": round(_pagos_cache["hits"] / consultas, 3) if consultas else None,
+        "recalculo_promedio_ms": round(_pagos_cache["segundos_recalculo"] / _pagos_cache["misses"] * 1000, 1) if _pagos_cache["misses"] else None,
+    }
+
+
+def _precalentar_cache_pagos():
+    """Carga el caché para la consulta sin filtros de BD (la más común)."""
+    start_time = time.time()
+    _pagos_cache["data"] = obtener_todos_pagos_procesados(current_app.config['SUPABASE'], {})
+    _pagos_cache["cache_key"] = str(sorted({}.items()))
+    _pagos_cache["timestamp"] = time.time()
+    _pagos_cache["segundos_recalculo"] += time.time() - start_time
+    _pagos_cache["misses"] += 1
+
+
+registrar_cache_local("pagos", _estadisticas_cache_pagos, invalidar_cache_pagos, _precalentar_cache_pagos)
+
 # ================================================================
 # FUNCIONES AUXILIARES
 # ================================================================
 
 def get_cached_proveedores():
-    """Obtener proveedores desde Supabase"""
-    supabase = current_app.config['SUPABASE']
+    """Proveedores desde el catálogo de referencia en memoria"""
     try:
-        result = supabase.table("proveedores").select("id, nombre, rut, cuenta").execute()
-        return result.data or []
+        return reference_data.get_rows("proveedores")
     except Exception as e:
         logger.error(f"Error obteniendo proveedores: {e}")
         return []
 
 def get_cached_proyectos():
-    """Obtener proyectos desde Supabase"""
-    supabase = current_app.config['SUPABASE']
+    """Proyectos desde el catálogo de referencia en memoria"""
     try:
-        result = supabase.table("proyectos").select("id, proyecto").execute()
-        return result.data or []
+        return reference_data.get_rows("proyectos")
     except Exception as e:
         logger.error(f"Error obteniendo proyectos: {e}")
         return []
@@ -312,6 +341,7 @@ def list_pagos(current_user):
                 
                 logger.info(f"✅ Usando caché de pagos (edad: {int(current_time - _pagos_cache['timestamp'])}s)")
                 pagos_list = _pagos_cache["data"]
+                _pagos_cache["hits"] += 1
             else:
                 # Obtener y procesar todos los pagos
                 logger.info(f"🔄 Recargando caché de pagos...")
@@ -319,6 +349,8 @@ def list_pagos(current_user):
                 pagos_list = obtener_todos_pagos_procesados(supabase, filtros_bd)
                 elapsed = time.time() - start_time
                 logger.info(f"✅ Caché recargado en {elapsed:.2f}s - {len(pagos_list)} órdenes procesadas")
+                _pagos_cache["misses"] += 1
+                _pagos_cache["segundos_recalculo"] += elapsed
                 
                 # Guardar en caché
                 _pagos_cache["data"] = pagos_list
@@ -1020,6 +1052,7 @@ def create_abono(current_user):
         
         # Invalidar caché
         invalidar_cache_pagos()
+        invalidar_resumenes()
         
         return jsonify({
             "success": True,
@@ -1112,6 +1145,7 @@ def update_abono(current_user, abono_id):
         
         # Invalidar caché
         invalidar_cache_pagos()
+        invalidar_resumenes()
         
         return jsonify({
             "success": True,
@@ -1179,6 +1213,7 @@ def delete_abono(current_user, abono_id):
         
         # Invalidar caché
         invalidar_cache_pagos()
+        invalidar_resumenes()
         
         return jsonify({
             "success": True,
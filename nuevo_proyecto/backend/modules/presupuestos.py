@@ -4,6 +4,7 @@ Maneja CRUD de presupuestos por proyecto
 """
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils.resumen_financiero import invalidar_resumenes
 from datetime import datetime
 
 bp = Blueprint("presupuestos", __name__)
@@ -101,6 +102,7 @@ def create_presupuesto(current_user):
         
         # Insertar TODOS los registros en Supabase de una vez
         result = supabase.table("presupuesto").insert(registros_a_insertar).execute()
+        invalidar_resumenes()
         
         if result.data:
             current_app.logger.info(f"✓ {len(result.data)} presupuesto(s) creado(s) para {proyecto_nombre}")
@@ -242,6 +244,7 @@ def delete_presupuesto(current_user, presupuesto_id):
     
     try:
         result = supabase.table("presupuesto").delete().eq("id", presupuesto_id).execute()
+        invalidar_resumenes()
         
         if result.data:
             return jsonify({
@@ -291,6 +294,7 @@ def update_presupuesto(current_user, presupuesto_id):
         
         # Actualizar en Supabase
         result = supabase.table("presupuesto").update(update_data).eq("id", presupuesto_id).execute()
+        invalidar_resumenes()
         
         if result.data:
             return jsonify({
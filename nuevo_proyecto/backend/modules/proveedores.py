@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app, render_template
 from collections import defaultdict
 from backend.utils.decorators import token_required
-from backend.utils.cache import clear_cache
+from backend.utils.cache import invalidate
+from backend.utils.reference_data import invalidar_catalogo
+from backend.utils import typeahead
 import re
 
 """
@@ -120,12 +122,12 @@ def registrar_log_actividad(user_id: int, accion: str, detalle: dict):
 
 def invalidate_select2_cache(name: str):
     """Invalidar cache relacionado a select2/autocomplete.
-    Llama a clear_cache con prefijos conocidos.
+    Sube la versión de las etiquetas '<name>' (incluye el autocompletado de ese
+    recurso) y 'select2:<name>' en una sola operación.
     """
     try:
-        # Intentamos limpiar claves con prefijo 'select2:<name>' y '<name>' también
-        clear_cache(f"select2:{name}")
-        clear_cache(name)
+        invalidate(name, f"select2:{name}")
+        invalidar_catalogo(name)
     except Exception:
         current_app.logger.info(f"No se pudo invalidar cache para {name}")
 
@@ -261,13 +263,11 @@ def api_search():
     if limit > 50:
         limit = 50
 
-    supabase = current_app.config['SUPABASE']
     try:
-        query = supabase.table('proveedores').select('id, nombre, rut')
         if term and len(term) >= 2:
-            query = query.ilike('nombre', f"%{term}%")
-        res = query.order('nombre').limit(limit).execute()
-        items = res.data or []
+            items = typeahead.buscar('proveedores', term, limit)
+        else:
+            items = typeahead.primeros('proveedores', limit)
         # Select2 expects { id, text }
         results = [{'id': p.get('id'), 'text': f"{p.get('nombre')} ({p.get('rut')})"} for p in items]
         return jsonify({'results': results})
@@ -315,14 +315,12 @@ def api_buscar(current_user):
     if limit > 50:
         limit = 50
 
-    supabase = current_app.config['SUPABASE']
     try:
-        query = supabase.table('proveedores').select('id, nombre, rut')
         if term and len(term) >= 1:
             # Buscar por nombre o rut
-            query = query.or_(f"nombre.ilike.%{term}%", f"rut.ilike.%{term}%")
-        res = query.order('nombre').limit(limit).execute()
-        items = res.data or []
+            items = typeahead.buscar('proveedores', term, limit, campos=('nombre', 'rut'))
+        else:
+            items = typeahead.primeros('proveedores', limit)
         results = [{'value': p.get('id'), 'label': f"{p.get('nombre')} ({p.get('rut')})"} for p in items]
         return jsonify({'results': results})
     except Exception as e:
@@ -5,6 +5,9 @@ Mantiene compatibilidad con estructura existente
 
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils.cache import invalidate
+from backend.utils.reference_data import invalidar_catalogo
+from backend.utils import typeahead
 
 bp = Blueprint("proyectos", __name__)
 
@@ -113,6 +116,8 @@ def new_proyecto(current_user):
         
         if result.data:
             current_app.logger.info(f"Proyecto creado: {proyecto_val}")
+            invalidate("proyectos")
+            invalidar_catalogo("proyectos")
             return jsonify({
                 "success": True,
                 "data": result.data[0] if isinstance(result.data, list) else result.data,
@@ -180,6 +185,8 @@ def edit_proyecto(current_user, id):
         
         if result.data:
             current_app.logger.info(f"Proyecto actualizado: {proyecto_val} (ID: {id})")
+            invalidate("proyectos")
+            invalidar_catalogo("proyectos")
             return jsonify({
                 "success": True,
                 "data": result.data[0] if isinstance(result.data, list) else result.data,
@@ -203,15 +210,7 @@ def api_search(current_user):
         if not term:
             return jsonify({"results": []})
         
-        supabase = current_app.config['SUPABASE']
-        proyectos = (
-            supabase.table("proyectos")
-            .select("id, proyecto")
-            .ilike("proyecto", f"%{term}%")
-            .limit(20)
-            .execute()
-            .data or []
-        )
+        proyectos = typeahead.buscar("proyectos", term, 20)
         
         results = [{"id": p["id"], "text": p["proyecto"]} for p in proyectos]
         return jsonify({"results": results})
@@ -5,6 +5,9 @@ Mantiene compatibilidad con estructura existente
 
 from flask import Blueprint, request, jsonify, current_app
 from backend.utils.decorators import token_required
+from backend.utils.cache import invalidate
+from backend.utils.reference_data import invalidar_catalogo
+from backend.utils import typeahead
 import re
 
 bp = Blueprint("trabajadores", __name__)
@@ -119,6 +122,9 @@ def new_trabajador(current_user):
         result = supabase.table("trabajadores").insert(payload).execute()
         
         if result.data:
+            invalidate("trabajadores")
+            invalidar_catalogo("trabajadores")
+            
             response_data = {
                 "success": True,
                 "message": "Trabajador creado exitosamente",
@@ -199,6 +205,9 @@ def edit_trabajador(current_user, id):
         result = supabase.table("trabajadores").update(payload).eq("id", id).execute()
         
         if result.data:
+            invalidate("trabajadores")
+            invalidar_catalogo("trabajadores")
+            
             response_data = {
                 "success": True,
                 "message": "Trabajador actualizado exitosamente",
@@ -230,16 +239,8 @@ def api_search_trabajadores(current_user):
         if not term:
             return jsonify({"success": True, "data": []})
         
-        supabase = current_app.config['SUPABASE']
-        
         # Buscar por nombre o correo
-        trabajadores = supabase.table("trabajadores") \
-            .select("*") \
-            .or_(f"nombre.ilike.%{term}%,correo.ilike.%{term}%") \
-            .order("nombre") \
-            .limit(20) \
-            .execute() \
-            .data or []
+        trabajadores = typeahead.buscar("trabajadores", term, 20, campos=("nombre", "correo"))
         
         return jsonify({"success": True, "data": trabajadores})
         
@@ -6,6 +6,7 @@ Incluye CRUD completo, gestión de permisos, bloqueo/desbloqueo y reset de contr
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from backend.utils.decorators import token_required
+from backend.utils.permisos import modulos_por_usuario, modulos_de_usuario, invalidar_permisos, olvidar_email
 from datetime import datetime
 import secrets
 import string
@@ -36,13 +37,9 @@ def generar_password_temporal():
 
 
 def obtener_modulos_usuario(supabase, usuario_id):
-    """Obtiene los módulos asignados a un usuario"""
+    """Obtiene los módulos asignados a un usuario (desde la caché de permisos)"""
     try:
-        modulos_rel = supabase.table('usuario_modulo').select(
-            'modulo_id, modulos(id, nombre_modulo)'
-        ).eq('usuario_id', usuario_id).execute().data or []
-        
-        return [m['modulos']['nombre_modulo'] for m in modulos_rel if m.get('modulos')]
+        return sorted(modulos_de_usuario(supabase, usuario_id))
     except Exception as e:
         current_app.logger.error(f"Error obteniendo módulos del usuario {usuario_id}: {e}")
         return []
@@ -105,9 +102,14 @@ def api_get_usuarios(current_user):
                 if buscar_lower in u.get('nombre', '').lower() or buscar_lower in u.get('email', '').lower()
             ]
         
-        # Obtener módulos de cada usuario
+        # Obtener módulos de todos los usuarios en una sola consulta
+        try:
+            modulos_map = modulos_por_usuario(supabase, [u['id'] for u in all_usuarios])
+        except Exception as e:
+            current_app.logger.error(f"Error obteniendo módulos de usuarios: {e}")
+            modulos_map = {}
         for usuario in all_usuarios:
-            usuario['modulos'] = obtener_modulos_usuario(supabase, usuario['id'])
+            usuario['modulos'] = sorted(modulos_map.get(usuario['id'], ()))
         
         # Calcular estadísticas
         stats = {
@@ -242,6 +244,7 @@ def new_usuario(current_user):
             }), 500
         
         usuario_id = res.data[0]['id']
+        olvidar_email(email, motivo="new_usuario")
         
         # Insertar módulos seleccionados
         modulos_insertados = 0
@@ -254,6 +257,7 @@ def new_usuario(current_user):
                 modulos_insertados += 1
             except Exception as e:
                 current_app.logger.error(f"Error insertando módulo {modulo_id} para usuario {usuario_id}: {e}")
+        invalidar_permisos(int(usuario_id), motivo="new_usuario")
         
         return jsonify({
             "success": True,
@@ -322,6 +326,9 @@ def edit_usuario(current_user, id):
             'nombre': nombre,
             'email': email
         }).eq('id', id).execute()
+        invalidar_permisos(id, motivo="edit_usuario")
+        if email != usuario_actual['email']:
+            olvidar_email(email, motivo="edit_usuario")
         
         return jsonify({
             "success": True,
@@ -443,6 +450,7 @@ def toggle_modulo_permiso(current_user, id):
                     'usuario_id': id,
                     'modulo_id': modulo_id
                 }).execute()
+                invalidar_permisos(id, motivo="toggle_modulo_permiso")
                 return jsonify({"success": True, "message": "Permiso otorgado"})
             else:
                 return jsonify({"success": True, "message": "El permiso ya existía"})
@@ -452,6 +460,7 @@ def toggle_modulo_permiso(current_user, id):
                 supabase.table('usuario_modulo').delete().eq(
                     'usuario_id', id
                 ).eq('modulo_id', modulo_id).execute()
+                invalidar_permisos(id, motivo="toggle_modulo_permiso")
                 return jsonify({"success": True, "message": "Permiso revocado"})
             else:
                 return jsonify({"success": True, "message": "El permiso ya estaba revocado"})
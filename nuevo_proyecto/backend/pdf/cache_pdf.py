@@ -0,0 +1,236 @@
+"""
+Caché de PDFs direccionada por contenido.
+
+La clave de un documento es el tipo, la versión de la plantilla y un hash
+estable de los datos normalizados que recibe el renderizador: el mismo
+documento no se vuelve a renderizar y los archivos no se duplican.
+
+- Memoria: LRU acotada por bytes (MEM_MAX_BYTES), por proceso.
+- Disco: pdfs_generados/cache/<clave>.pdf, compartido por los workers del
+  servidor. Al superar DISK_MAX_BYTES se borran los menos usados (mtime, que
+  se renueva en cada acierto) hasta bajar a DISK_OBJETIVO. Cada proceso solo
+  ve sus propias escrituras, así que la decisión de podar se toma sobre el
+  directorio: se vuelve a medir al acercarse al límite (DISK_REVISAR) o cada
+  DISK_REESCANEO segundos.
+
+Al cambiar una plantilla hay que subir su `version` para no servir PDFs
+renderizados con la anterior.
+"""
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from backend.utils.cache import stable_hash, registrar_cache_local
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR") or os.path.join(
+    os.path.dirname(__file__), '..', 'pdfs_generados', 'cache')
+MEM_MAX_BYTES = 32 * 1024 * 1024
+DISK_MAX_BYTES = 256 * 1024 * 1024
+DISK_OBJETIVO = 0.8  # fracción de DISK_MAX_BYTES que queda tras podar
+DISK_REVISAR = 0.9   # fracción de DISK_MAX_BYTES (estimada) a la que se mide el directorio
+DISK_REESCANEO = 60  # segundos máximos entre mediciones del directorio
+
+_memoria = OrderedDict()  # clave -> bytes del PDF
+_estado = {"bytes_memoria": 0, "bytes_disco": None, "medido_disco": 0.0}
+_stats = {
+    "hits_memoria": 0, "hits_disco": 0, "renders": 0, "segundos_render": 0.0,
+    "desalojos_memoria": 0, "borrados_disco": 0,
+}
+_lock = threading.Lock()
+
+
+def clave_documento(tipo, datos, version=1):
+    """Clave de contenido: tipo, versión de plantilla y hash de los datos."""
+    return f"{tipo}-v{version}-{stable_hash(datos)}"
+
+
+def _ruta(clave):
+    return os.path.join(PDF_CACHE_DIR, f"{clave}.pdf")
+
+
+def _guardar_memoria(clave, pdf):
+    """Debe llamarse con el lock tomado."""
+    if len(pdf) > MEM_MAX_BYTES:
+        return
+    anterior = _memoria.pop(clave, None)
+    if anterior is not None:
+        _estado["bytes_memoria"] -= len(anterior)
+    _memoria[clave] = pdf
+    _estado["bytes_memoria"] += len(pdf)
+    while _estado["bytes_memoria"] > MEM_MAX_BYTES:
+        _, viejo = _memoria.popitem(last=False)
+        _estado["bytes_memoria"] -= len(viejo)
+        _stats["desalojos_memoria"] += 1
+
+
+def _leer_disco(clave):
+    ruta = _ruta(clave)
+    try:
+        with open(ruta, 'rb') as f:
+            pdf = f.read()
+        os.utime(ruta)  # marca de uso para la poda
+        return pdf
+    except OSError:
+        return None
+
+
+def _archivos_disco():
+    """[(mtime, tamaño, ruta)] de los PDFs en la caché de disco."""
+    archivos = []
+    try:
+        with os.scandir(PDF_CACHE_DIR) as it:
+            for e in it:
+                if e.is_file() and e.name.endswith('.pdf'):
+                    st = e.stat()
+                    archivos.append((st.st_mtime, st.st_size, e.path))
+    except FileNotFoundError:
+        pass
+    return archivos
+
+
+def _podar_disco():
+    """Borra los PDFs menos usados hasta bajar de DISK_OBJETIVO."""
+    archivos = sorted(_archivos_disco())
+    total = sum(a[1] for a in archivos)
+    objetivo = DISK_MAX_BYTES * DISK_OBJETIVO
+    for _, tamano, ruta in archivos:
+        if total <= objetivo:
+            break
+        try:
+            os.remove(ruta)
+            total -= tamano
+            _stats["borrados_disco"] += 1
+        except OSError:
+            pass
+    _estado["bytes_disco"] = total
+    _estado["medido_disco"] = time.time()
+
+
+def _escribir_disco(clave, pdf):
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    ruta = _ruta(clave)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        anterior = os.path.getsize(ruta)  # al reescribir una clave no se suma dos veces
+    except OSError:
+        anterior = 0
+    with open(temporal, 'wb') as f:
+        f.write(pdf)
+    os.replace(temporal, ruta)  # atómico: otro worker nunca ve un PDF a medias
+
+    with _lock:
+        estimado = (_estado["bytes_disco"] or 0) + len(pdf) - anterior
+        if (_estado["bytes_disco"] is None or estimado > DISK_MAX_BYTES * DISK_REVISAR
+                or time.time() - _estado["medido_disco"] > DISK_REESCANEO):
+            # Medir el directorio: incluye lo que escribieron los otros procesos
+            _estado["bytes_disco"] = sum(a[1] for a in _archivos_disco())
+            _estado["medido_disco"] = time.time()
+        else:
+            _estado["bytes_disco"] = estimado
+        if _estado["bytes_disco"] > DISK_MAX_BYTES:
+            _podar_disco()
+    return ruta
+
+
+def leer(clave):
+    """Bytes del PDF con esa clave (memoria o disco), o None."""
+    with _lock:
+        pdf = _memoria.get(clave)
+        if pdf is not None:
+            _memoria.move_to_end(clave)
+            _stats["hits_memoria"] += 1
+            return pdf
+
+    pdf = _leer_disco(clave)
+    if pdf is not None:
+        with _lock:
+            _stats["hits_disco"] += 1
+            _guardar_memoria(clave, pdf)
+    return pdf
+
+
+def guardar(clave, pdf, segundos_render=0.0):
+    """Guarda un PDF recién renderizado en memoria y en disco."""
+    try:
+        _escribir_disco(clave, pdf)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el PDF {clave} en disco: {e}")
+    with _lock:
+        _stats["renders"] += 1
+        _stats["segundos_render"] += segundos_render
+        _guardar_memoria(clave, pdf)
+
+
+def existe(clave):
+    """True si el PDF está en la caché (sin leerlo)."""
+    return clave in _memoria or os.path.exists(_ruta(clave))
+
+
+def obtener(tipo, datos, renderizar, version=1):
+    """
+    Bytes del PDF para `datos`. renderizar() solo se llama si el documento no
+    está en memoria ni en disco.
+    """
+    clave = clave_documento(tipo, datos, version)
+    pdf = leer(clave)
+    if pdf is not None:
+        return pdf
+
+    inicio = time.time()
+    pdf = renderizar()
+    guardar(clave, pdf, time.time() - inicio)
+    return pdf
+
+
+def obtener_ruta(tipo, datos, renderizar, version=1):
+    """Como obtener(), pero devuelve la ruta del PDF en la caché de disco."""
+    clave = clave_documento(tipo, datos, version)
+    ruta = _ruta(clave)
+    if os.path.exists(ruta):
+        os.utime(ruta)
+        with _lock:
+            _stats["hits_disco"] += 1
+        return ruta
+    pdf = obtener(tipo, datos, renderizar, version)
+    if not os.path.exists(ruta):
+        _escribir_disco(clave, pdf)
+    return ruta
+
+
+def estadisticas():
+    with _lock:
+        s = dict(_stats)
+        consultas = s["hits_memoria"] + s["hits_disco"] + s["renders"]
+        return {
+            "entradas": len(_memoria),
+            "bytes_memoria": _estado["bytes_memoria"],
+            "max_bytes_memoria": MEM_MAX_BYTES,
+            "bytes_disco": _estado["bytes_disco"],
+            "max_bytes_disco": DISK_MAX_BYTES,
+            "hits_memoria": s["hits_memoria"],
+            "hits_disco": s["hits_disco"],
+            "renders": s["renders"],
+            "hit_rate": round((consultas - s["renders"]) / consultas, 3) if consultas else None,
+            "render_promedio_ms": round(s["segundos_render"] / s["renders"] * 1000, 1) if s["renders"] else None,
+            "desalojos_memoria": s["desalojos_memoria"],
+            "borrados_disco": s["borrados_disco"],
+        }
+
+
+def _descartar():
+    """Vacía la memoria y borra la caché de disco."""
+    with _lock:
+        _memoria.clear()
+        _estado["bytes_memoria"] = 0
+        for _, _, ruta in _archivos_disco():
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        _estado["bytes_disco"] = 0
+
+
+registrar_cache_local("pdf", estadisticas, _descartar)
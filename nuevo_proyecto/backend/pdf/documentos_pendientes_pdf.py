@@ -4,14 +4,19 @@ Generador de PDF para Documentos Pendientes usando ReportLab.
 
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_LEFT
 from reportlab.pdfgen import canvas
+from backend.pdf.tablas import tablas_por_grupo
+from backend.pdf.estilos import (
+    ESTILOS_DOCUMENTOS_PENDIENTES, TABLAS_DOCUMENTOS_PENDIENTES, COLORES_DOCUMENTOS_PENDIENTES,
+)
 from datetime import datetime
 import os
 
+VERSION_PLANTILLA = 2  # subir al cambiar el diseño (invalida la caché de PDFs)
+
 
 def fmt_money(value):
     """Formatea un valor como moneda chilena."""
@@ -25,53 +30,129 @@ def fmt_money(value):
 
 
 class NumberedCanvas(canvas.Canvas):
-    """Canvas personalizado para agregar número de página y encabezado en cada página."""
+    """
+    Canvas que agrega encabezado y "Página X de Y" a cada página.
+
+    El total Y aún no se conoce al cerrar cada página, así que se dibuja como
+    un form de PDF que todas las páginas referencian y que se define una sola
+    vez en save(). No se guarda el estado de cada página ni se renderiza dos
+    veces: la memoria no crece con el número de páginas.
+    """
+    FORM_TOTAL = "totalPaginas"
+    FUENTE_PIE = ("Helvetica", 9)
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, titulo='Documentos Pendientes', **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
-        self._saved_page_states = []
-        self.titulo = kwargs.get('titulo', 'Documentos Pendientes')
+        self.titulo = titulo
         self.fecha_generacion = datetime.now().strftime('%d/%m/%Y %H:%M')
+        # Espacio reservado para el total (hasta 4 dígitos)
+        self._ancho_total = self.stringWidth("0000", *self.FUENTE_PIE)
         
     def showPage(self):
-        self._saved_page_states.append(dict(self.__dict__))
-        self._startPage()
+        self.draw_header()
+        self.draw_page_number()
+        canvas.Canvas.showPage(self)
         
     def save(self):
-        """Agrega el número de página y encabezado a cada página."""
-        num_pages = len(self._saved_page_states)
-        for state in self._saved_page_states:
-            self.__dict__.update(state)
-            self.draw_page_number(num_pages)
-            self.draw_header()
-            canvas.Canvas.showPage(self)
+        """Define el total de páginas y cierra el documento."""
+        self.beginForm(self.FORM_TOTAL)
+        self.setFont(*self.FUENTE_PIE)
+        self.drawString(0, 0, str(self._pageNumber - 1))
+        self.endForm()
         canvas.Canvas.save(self)
         
-    def draw_page_number(self, page_count):
-        """Dibuja el número de página."""
-        self.setFont("Helvetica", 9)
-        page_num = f"Página {self._pageNumber} de {page_count}"
-        self.drawRightString(A4[1] - 15*mm, 10*mm, page_num)
+    def draw_page_number(self):
+        """Dibuja "Página X de " y, a continuación, el form con el total."""
+        ancho_pagina = self._pagesize[0]
+        x_total = ancho_pagina - 15*mm - self._ancho_total
+        self.setFont(*self.FUENTE_PIE)
+        self.drawRightString(x_total, 10*mm, f"Página {self._pageNumber} de ")
+        self.saveState()
+        self.translate(x_total, 10*mm)
+        self.doForm(self.FORM_TOTAL)
+        self.restoreState()
         
     def draw_header(self):
         """Dibuja el encabezado en cada página."""
+        ancho_pagina, alto_pagina = self._pagesize
         self.setFont("Helvetica-Bold", 10)
-        self.drawString(15*mm, A4[0] - 15*mm, self.titulo)
+        self.drawString(15*mm, alto_pagina - 15*mm, self.titulo)
         self.setFont("Helvetica", 8)
-        self.drawRightString(A4[1] - 15*mm, A4[0] - 15*mm, f"Generado: {self.fecha_generacion}")
+        self.drawRightString(ancho_pagina - 15*mm, alto_pagina - 15*mm, f"Generado: {self.fecha_generacion}")
+
+
+HEADERS = [
+    'OP #',
+    'Fecha OP',
+    'Fecha Venc.',
+    'Proveedor',
+    'Proyecto',
+    'Factura',
+    'Monto Total',
+    'Abonado',
+    'Saldo',
+    'Días\nAtraso',
+    'Estado'
+]
+# Anchos fijos (suman el ancho útil de A4 horizontal) para que los bloques calcen
+COL_WIDTHS = [14*mm, 20*mm, 20*mm, 50*mm, 40*mm, 20*mm, 25*mm, 25*mm, 25*mm, 12*mm, 16*mm]
+
+# Estilos del registro compartido (ver estilos.py)
+TITLE_STYLE = ESTILOS_DOCUMENTOS_PENDIENTES['CustomTitle']
+SUBTITLE_STYLE = ESTILOS_DOCUMENTOS_PENDIENTES['CustomSubtitle']
+GRUPO_STYLE = ESTILOS_DOCUMENTOS_PENDIENTES['GrupoProyecto']
+TABLE_STYLE = TABLAS_DOCUMENTOS_PENDIENTES['documentos']
+SUBTOTAL_STYLE = TABLAS_DOCUMENTOS_PENDIENTES['subtotal']
+TOTAL_STYLE = TABLAS_DOCUMENTOS_PENDIENTES['total']
+FONDO_VENCIDO_30 = COLORES_DOCUMENTOS_PENDIENTES['vencido_30']
+FONDO_VENCIDO = COLORES_DOCUMENTOS_PENDIENTES['vencido']
+
+
+def _fila_documento(documento):
+    dias_atraso = documento.get('dias_atraso', 0)
+    if dias_atraso > 0:
+        estado = f"VENCIDO\n({dias_atraso} días)"
+    else:
+        estado = "Al día"
+    
+    return [
+        str(documento.get('orden_numero', '')),
+        documento.get('fecha_op', '---'),
+        documento.get('fecha_vencimiento', '---'),
+        documento.get('proveedor', '')[:25],  # Limitar largo
+        documento.get('proyecto', '')[:20],
+        documento.get('factura', '---'),
+        fmt_money(documento.get('monto_total', 0)),
+        fmt_money(documento.get('total_abonado', 0)),
+        fmt_money(documento.get('saldo', 0)),
+        str(dias_atraso) if dias_atraso > 0 else '-',
+        estado
+    ]
+
+
+def _fondo_documento(documento):
+    dias_atraso = documento.get('dias_atraso', 0)
+    if dias_atraso > 30:
+        return FONDO_VENCIDO_30
+    if dias_atraso > 0:
+        return FONDO_VENCIDO
+    return None
+
+
+def _fila_total(etiqueta, monto, abonado, saldo):
+    return ['', '', '', '', '', etiqueta, fmt_money(monto), fmt_money(abonado), fmt_money(saldo), '', '']
 
 
 def generar_pdf_documentos_pendientes(documentos, stats, filename):
     """
-    Genera un PDF con la lista de documentos pendientes.
+    Genera un PDF con la lista de documentos pendientes, agrupados por
+    proyecto con su subtotal y un total general al final.
     
     Args:
         documentos: Lista de documentos pendientes
         stats: Estadísticas (total, pendientes, con_abonos, vencidos)
-        filename: Ruta donde guardar el PDF
+        filename: Ruta (o buffer) donde guardar el PDF
     """
-    from reportlab.platypus import PageBreak
-    
     # Crear documento en orientación horizontal (landscape)
     doc = SimpleDocTemplate(
         filename,
@@ -82,169 +163,131 @@ def generar_pdf_documentos_pendientes(documentos, stats, filename):
         bottomMargin=20*mm
     )
     
-    # Estilos
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.HexColor('#1a365d'),
-        spaceAfter=12,
-        alignment=TA_CENTER
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor('#4a5568'),
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
-    
-    # Contenido
     story = []
-    
-    # Título
-    titulo = Paragraph("DOCUMENTOS PENDIENTES DE PAGO", title_style)
-    story.append(titulo)
+    story.append(Paragraph("DOCUMENTOS PENDIENTES DE PAGO", TITLE_STYLE))
     
     # Subtítulo con estadísticas
     fecha_actual = datetime.now().strftime('%d/%m/%Y')
-    subtitulo = Paragraph(
+    story.append(Paragraph(
         f"Fecha: {fecha_actual} | Total: {stats['total']} documentos "
         f"({stats['pendientes']} pendientes + {stats['con_abonos']} con abonos) | "
         f"Vencidos: {stats['vencidos']}",
-        subtitle_style
-    )
-    story.append(subtitulo)
+        SUBTITLE_STYLE
+    ))
     story.append(Spacer(1, 10*mm))
     
-    # Preparar datos de la tabla
-    # Encabezados
-    headers = [
-        'OP #',
-        'Fecha OP',
-        'Fecha Venc.',
-        'Proveedor',
-        'Proyecto',
-        'Factura',
-        'Monto Total',
-        'Abonado',
-        'Saldo',
-        'Días\nAtraso',
-        'Estado'
-    ]
-    
-    data = [headers]
-    
-    # Datos
-    total_monto = 0
-    total_abonado = 0
-    total_saldo = 0
-    
+    # Agrupar por proyecto conservando el orden recibido dentro de cada uno
+    por_proyecto = {}
     for documento in documentos:
-        monto = float(documento.get('monto_total', 0))
-        abonado = float(documento.get('total_abonado', 0))
-        saldo = float(documento.get('saldo', 0))
-        
+        por_proyecto.setdefault(documento.get('proyecto') or '---', []).append(documento)
+    
+    grupos = []
+    total_monto = total_abonado = total_saldo = 0
+    for proyecto in sorted(por_proyecto, key=str):
+        docs = por_proyecto[proyecto]
+        monto = sum(float(d.get('monto_total', 0)) for d in docs)
+        abonado = sum(float(d.get('total_abonado', 0)) for d in docs)
+        saldo = sum(float(d.get('saldo', 0)) for d in docs)
         total_monto += monto
         total_abonado += abonado
         total_saldo += saldo
-        
-        # Estado visual
-        dias_atraso = documento.get('dias_atraso', 0)
-        if dias_atraso > 0:
-            estado = f"VENCIDO\n({dias_atraso} días)"
-        else:
-            estado = "Al día"
-        
-        row = [
-            str(documento.get('orden_numero', '')),
-            documento.get('fecha_op', '---'),
-            documento.get('fecha_vencimiento', '---'),
-            documento.get('proveedor', '')[:25],  # Limitar largo
-            documento.get('proyecto', '')[:20],
-            documento.get('factura', '---'),
-            fmt_money(monto),
-            fmt_money(abonado),
-            fmt_money(saldo),
-            str(dias_atraso) if dias_atraso > 0 else '-',
-            estado
-        ]
-        data.append(row)
+        grupos.append((
+            f"{proyecto} ({len(docs)} documentos)",
+            [_fila_documento(d) for d in docs],
+            _fila_total('SUBTOTAL:', monto, abonado, saldo),
+            [_fondo_documento(d) for d in docs],
+        ))
     
-    # Fila de totales
-    totales = [
-        '',
-        '',
-        '',
-        '',
-        '',
-        'TOTAL:',
-        fmt_money(total_monto),
-        fmt_money(total_abonado),
-        fmt_money(total_saldo),
-        '',
-        ''
-    ]
-    data.append(totales)
+    story.extend(tablas_por_grupo(
+        grupos, HEADERS, TABLE_STYLE, GRUPO_STYLE,
+        col_widths=COL_WIDTHS, estilo_total=SUBTOTAL_STYLE,
+    ))
     
-    # Crear tabla
-    table = Table(data, repeatRows=1)  # repeatRows=1 repite el encabezado en cada página
+    # Total general
+    story.append(Table([_fila_total('TOTAL:', total_monto, total_abonado, total_saldo)],
+                       colWidths=COL_WIDTHS, style=TOTAL_STYLE))
     
-    # Estilo de la tabla
-    table_style = TableStyle([
-        # Encabezado
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        
-        # Cuerpo
-        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -2), 7),
-        ('ALIGN', (0, 1), (0, -2), 'CENTER'),  # OP #
-        ('ALIGN', (1, 1), (2, -2), 'CENTER'),  # Fechas
-        ('ALIGN', (6, 1), (8, -2), 'RIGHT'),   # Montos
-        ('ALIGN', (9, 1), (9, -2), 'CENTER'),  # Días atraso
-        ('ALIGN', (10, 1), (10, -2), 'CENTER'), # Estado
-        
-        # Bordes
-        ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),
-        ('BOX', (0, 0), (-1, -2), 1, colors.black),
-        
-        # Fila de totales
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#edf2f7')),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 8),
-        ('ALIGN', (6, -1), (8, -1), 'RIGHT'),
-        ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
-        
-        # Padding
-        ('TOPPADDING', (0, 1), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-    ])
+    doc.build(story, canvasmaker=NumberedCanvas)
     
-    # Aplicar colores a filas según días de atraso
-    for i, documento in enumerate(documentos, start=1):
-        dias_atraso = documento.get('dias_atraso', 0)
-        if dias_atraso > 30:
-            # Rojo para más de 30 días
-            table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#fee'))
-        elif dias_atraso > 0:
-            # Amarillo para vencidos
-            table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#fffbeb'))
+    return filename
+
+
+def benchmark_filas(filas=(1000, 5000, 20000), proyectos=40):
+    """
+    Tiempo de render del reporte completo con N documentos repartidos en
+    `proyectos` proyectos (para comprobar que crece linealmente).
     
-    table.setStyle(table_style)
-    story.append(table)
+        python -m backend.pdf.documentos_pendientes_pdf filas
+    """
+    import time
+    from io import BytesIO
     
-    # Construir PDF simple (sin NumberedCanvas por ahora)
-    doc.build(story)
+    resultados = []
+    for n in filas:
+        documentos = [{
+            'orden_numero': i, 'fecha_op': '01/01/2026', 'fecha_vencimiento': '01/02/2026',
+            'proveedor': f"Proveedor {i % 97}", 'proyecto': f"Proyecto {i % proyectos}",
+            'factura': str(10000 + i), 'monto_total': 1000 * i, 'total_abonado': 0,
+            'saldo': 1000 * i, 'dias_atraso': i % 45,
+        } for i in range(n)]
+        stats = {'total': n, 'pendientes': n, 'con_abonos': 0, 'vencidos': 0}
+        inicio = time.perf_counter()
+        generar_pdf_documentos_pendientes(documentos, stats, BytesIO())
+        segundos = time.perf_counter() - inicio
+        resultados.append({
+            "filas": n,
+            "segundos": round(segundos, 3),
+            "ms_por_fila": round(segundos / n * 1000, 3),
+        })
+    return resultados
+
+
+def benchmark_paginas(paginas=(10, 100, 1000), filas_por_pagina=25):
+    """
+    Tiempo de render y memoria máxima (tracemalloc) de reportes de N páginas
+    con NumberedCanvas. Cada página lleva una tabla de `filas_por_pagina`.
+
+        python -m backend.pdf.documentos_pendientes_pdf
+    """
+    import time
+    import tracemalloc
+    from io import BytesIO
     
-    return filename
+    estilo = TableStyle([
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ])
+    resultados = []
+    for n in paginas:
+        story = []
+        for p in range(n):
+            filas = [[f"{p}-{i}", "Proveedor de prueba", "Proyecto", fmt_money(i * 1000)]
+                     for i in range(filas_por_pagina)]
+            story.append(Table(filas, style=estilo))
+            story.append(PageBreak())
+        
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=25*mm, bottomMargin=20*mm)
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        doc.build(story, canvasmaker=NumberedCanvas)
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados.append({
+            "paginas": n,
+            "segundos": round(segundos, 3),
+            "pico_mb": round(pico / 1024 / 1024, 2),
+            "bytes_pdf": len(buffer.getvalue()),
+        })
+    return resultados
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["filas"]:
+        for r in benchmark_filas():
+            print(f"{r['filas']:>6} filas: {r['segundos']:>7.3f}s  {r['ms_por_fila']:.3f} ms/fila")
+    else:
+        for r in benchmark_paginas():
+            print(f"{r['paginas']:>5} páginas: {r['segundos']:>7.3f}s  pico {r['pico_mb']:>7.2f} MB  PDF {r['bytes_pdf']:,} bytes")
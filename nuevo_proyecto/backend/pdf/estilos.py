@@ -0,0 +1,484 @@
+"""
+Estilos de los PDFs, construidos una vez por proceso.
+
+Cada renderizador armaba en cada llamada la hoja de estilos de ReportLab
+(getSampleStyleSheet), sus ParagraphStyle, sus TableStyle y sus colores.
+Aquí se construyen al importar el módulo (una vez por worker y por proceso
+del pool de render) y los renderizadores solo los consultan:
+
+  ESTILOS_<DOC>  nombre -> ParagraphStyle
+  TABLAS_<DOC>   nombre -> TableStyle (los que no dependen del ancho de página)
+  COLORES_<DOC>  nombre -> color
+
+Los estilos compartidos no deben modificarse en el render: un cambio aquí es
+un cambio de diseño y hay que subir la VERSION_PLANTILLA del documento.
+
+benchmark_setup() compara el costo de armar los estilos en cada documento
+con el de tomarlos de aquí:
+
+    python -m backend.pdf.estilos
+"""
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_JUSTIFY
+from reportlab.platypus import TableStyle
+
+
+def _por_nombre(*estilos):
+    return {e.name: e for e in estilos}
+
+
+# ================================================================
+# ORDEN DE COMPRA (pdf_orden_compra.py)
+# ================================================================
+
+COLORES_OC = {
+    "primary": colors.HexColor('#2C3E50'),
+    "secondary": colors.HexColor('#34495E'),
+    "accent": colors.HexColor('#3498DB'),
+    "header_bg": colors.HexColor('#ECF0F1'),
+}
+
+
+def _estilos_oc(base):
+    c = COLORES_OC
+    return _por_nombre(
+        ParagraphStyle(
+            name='RightSmall',
+            parent=base['Normal'],
+            alignment=TA_RIGHT,
+            fontSize=9,
+            textColor=c["secondary"]
+        ),
+        ParagraphStyle(
+            name='Small',
+            parent=base['Normal'],
+            fontSize=9,
+            textColor=c["secondary"],
+            leading=12
+        ),
+        ParagraphStyle(
+            name='CompanyName',
+            parent=base['Heading1'],
+            fontSize=14,
+            textColor=c["primary"],
+            spaceAfter=2,
+            fontName='Helvetica-Bold'
+        ),
+        ParagraphStyle(
+            name='HeaderTitle',
+            parent=base['Heading1'],
+            alignment=TA_CENTER,
+            fontSize=13,
+            textColor=c["primary"],
+            fontName='Helvetica-Bold'
+        ),
+        # Texto legal JUSTIFICADO
+        ParagraphStyle(
+            name='Legal',
+            parent=base['Normal'],
+            fontSize=7,
+            alignment=TA_JUSTIFY,
+            leading=8.5,
+            textColor=colors.HexColor('#555555'),
+            leftIndent=0,
+            rightIndent=0
+        ),
+        ParagraphStyle(
+            name='SectionLabel',
+            parent=base['Normal'],
+            fontSize=9,
+            textColor=c["primary"],
+            fontName='Helvetica-Bold'
+        ),
+    )
+
+
+def _tablas_oc():
+    c = COLORES_OC
+    return {
+        "cabecera_derecha": TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), c["header_bg"]),
+            ('BOX', (0,0), (-1,-1), 1.5, c["primary"]),
+            ('TOPPADDING', (0,0), (-1,0), 8),
+            ('BOTTOMPADDING', (0,0), (-1,0), 8),
+            ('LEFTPADDING', (0,0), (-1,-1), 10),
+            ('RIGHTPADDING', (0,0), (-1,-1), 10),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE')
+        ]),
+        "cabecera": TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT')
+        ]),
+        "proveedor": TableStyle([
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('ALIGN', (0,0), (0,-1), 'LEFT'),
+            ('ALIGN', (1,0), (1,-1), 'LEFT'),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 3),
+            ('TOPPADDING', (0,0), (-1,-1), 3),
+            ('LINEBELOW', (0,-1), (-1,-1), 0.5, colors.HexColor('#CCCCCC'))
+        ]),
+        "productos": TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), c["primary"]),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 9),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#DDDDDD')),
+            ('LINEBELOW', (0,0), (-1,0), 1.5, c["primary"]),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('ALIGN', (2,0), (2,-1), 'CENTER'),
+            ('ALIGN', (3,0), (4,-1), 'RIGHT'),
+            ('ALIGN', (0,0), (1,-1), 'LEFT'),
+            ('TOPPADDING', (0,1), (-1,-1), 6),
+            ('BOTTOMPADDING', (0,1), (-1,-1), 6),
+            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#F9F9F9')])
+        ]),
+        "totales": TableStyle([
+            ('ALIGN', (2,0), (-1,-1), 'RIGHT'),
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('TOPPADDING', (0,0), (-1,-1), 4),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+            ('LINEABOVE', (2,2), (-1,2), 1, c["primary"]),
+            ('BACKGROUND', (2,2), (-1,2), c["header_bg"])
+        ]),
+        "firmas": TableStyle([
+            ('ALIGN', (0,0), (-1,0), 'CENTER'),
+            ('FONTSIZE', (0,0), (-1,0), 9),
+            ('LINEABOVE', (0,1), (-1,1), 1, c["secondary"]),  # Línea arriba de la fila vacía
+            ('TOPPADDING', (0,1), (-1,1), 0),  # Sin padding para que línea esté más abajo
+            ('VALIGN', (0,0), (-1,0), 'TOP')  # Nombres arriba
+        ]),
+    }
+
+
+# ================================================================
+# ORDEN DE PAGO (ordenes_pago_pdf.py)
+# ================================================================
+
+COLORES_OP = {
+    "border": colors.HexColor('#444444'),
+    "header_bg": colors.HexColor('#f0f0f0'),
+    "text": colors.black,
+    "gray": colors.HexColor('#555555'),
+}
+
+
+def _estilos_op(base):
+    c = COLORES_OP
+    return _por_nombre(
+        ParagraphStyle(
+            name='RightSmall',
+            parent=base['Normal'],
+            alignment=TA_RIGHT,
+            fontSize=10,
+            textColor=c["text"],
+            leading=12
+        ),
+        ParagraphStyle(
+            name='Small',
+            parent=base['Normal'],
+            fontSize=10,
+            textColor=c["text"],
+            leading=12
+        ),
+        ParagraphStyle(
+            name='Tiny',
+            parent=base['Normal'],
+            fontSize=9,
+            textColor=c["gray"],
+            leading=11,
+            alignment=TA_CENTER
+        ),
+        ParagraphStyle(
+            name='CompanyName',
+            parent=base['Heading1'],
+            fontSize=16,
+            textColor=c["text"],
+            spaceAfter=3,
+            fontName='Helvetica-Bold',
+            alignment=TA_CENTER
+        ),
+        ParagraphStyle(
+            name='SectionTitle',
+            parent=base['Normal'],
+            fontSize=11,
+            textColor=c["text"],
+            fontName='Helvetica-Bold',
+            spaceAfter=4
+        ),
+        ParagraphStyle(
+            name='SectionLabel',
+            parent=base['Normal'],
+            fontSize=10,
+            textColor=c["text"],
+            fontName='Helvetica-Bold'
+        ),
+        ParagraphStyle(
+            name='DetailText',
+            parent=base['Normal'],
+            fontSize=10,
+            textColor=c["text"],
+            leading=13
+        ),
+    )
+
+
+def _tablas_op():
+    c = COLORES_OP
+    return {
+        "columna": TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('TOPPADDING', (0,0), (-1,-1), 3),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 3)
+        ]),
+        "superior": TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('LEFTPADDING', (0,0), (-1,-1), 0),
+            ('RIGHTPADDING', (0,0), (-1,-1), 0)
+        ]),
+        "lineas": TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), c["header_bg"]),
+            ('TEXTCOLOR', (0,0), (-1,-1), c["text"]),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 10),
+            ('GRID', (0,0), (-1,-1), 1, c["border"]),
+            ('LINEBELOW', (0,0), (-1,0), 1, c["border"]),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (0,1), (1,-1), 'LEFT'),
+            ('ALIGN', (2,1), (2,-1), 'LEFT'),
+            ('TOPPADDING', (0,0), (-1,-1), 5),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 5),
+            ('LEFTPADDING', (0,0), (-1,-1), 5),
+            ('RIGHTPADDING', (0,0), (-1,-1), 5)
+        ]),
+        "totales_contenedor": TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT'),
+            ('LEFTPADDING', (0,0), (-1,-1), 0),
+            ('RIGHTPADDING', (0,0), (-1,-1), 0),
+            ('TOPPADDING', (0,0), (-1,-1), 0),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 0)
+        ]),
+        "totales": TableStyle([
+            ('GRID', (0,0), (-1,-1), 1, c["border"]),
+            ('ALIGN', (0,0), (0,-1), 'RIGHT'),
+            ('ALIGN', (1,0), (1,-1), 'RIGHT'),
+            ('FONTSIZE', (0,0), (-1,-1), 10),
+            ('TOPPADDING', (0,0), (-1,-1), 5),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 5),
+            ('LEFTPADDING', (0,0), (-1,-1), 5),
+            ('RIGHTPADDING', (0,0), (-1,-1), 5),
+            ('BACKGROUND', (0,0), (-1,-1), colors.white)
+        ]),
+    }
+
+
+# ================================================================
+# RESUMEN DE ORDEN DE PAGO (modules/ordenes_pago.py)
+# ================================================================
+
+COLORES_OP_RESUMEN = {
+    "primary": colors.HexColor('#2c5aa0'),
+}
+
+
+def _estilos_op_resumen(base):
+    return _por_nombre(
+        ParagraphStyle(
+            'CustomTitle',
+            parent=base['Heading1'],
+            fontSize=18,
+            textColor=COLORES_OP_RESUMEN["primary"],
+            spaceAfter=20,
+            alignment=TA_CENTER
+        ),
+    )
+
+
+def _tablas_op_resumen():
+    return {
+        "empresa": TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.grey),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]),
+        "info": TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+        ]),
+        "materiales": TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLORES_OP_RESUMEN["primary"]),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ]),
+        "totales": TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+            ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
+        ]),
+    }
+
+
+# ================================================================
+# DOCUMENTOS PENDIENTES (documentos_pendientes_pdf.py)
+# ================================================================
+
+COLORES_DOCUMENTOS_PENDIENTES = {
+    "titulo": colors.HexColor('#1a365d'),
+    "subtitulo": colors.HexColor('#4a5568'),
+    "encabezado": colors.HexColor('#2d3748'),
+    "subtotal": colors.HexColor('#edf2f7'),
+    "vencido_30": colors.HexColor('#fee'),     # más de 30 días
+    "vencido": colors.HexColor('#fffbeb'),
+}
+
+
+def _estilos_documentos_pendientes(base):
+    c = COLORES_DOCUMENTOS_PENDIENTES
+    return _por_nombre(
+        ParagraphStyle(
+            'CustomTitle',
+            parent=base['Heading1'],
+            fontSize=16,
+            textColor=c["titulo"],
+            spaceAfter=12,
+            alignment=TA_CENTER
+        ),
+        ParagraphStyle(
+            'CustomSubtitle',
+            parent=base['Normal'],
+            fontSize=10,
+            textColor=c["subtitulo"],
+            spaceAfter=20,
+            alignment=TA_CENTER
+        ),
+        ParagraphStyle(
+            'GrupoProyecto',
+            parent=base['Heading3'],
+            fontSize=10,
+            textColor=c["titulo"],
+            spaceBefore=4,
+            spaceAfter=4,
+            keepWithNext=1
+        ),
+    )
+
+
+def _tablas_documentos_pendientes():
+    c = COLORES_DOCUMENTOS_PENDIENTES
+    return {
+        "documentos": TableStyle([
+            # Encabezado
+            ('BACKGROUND', (0, 0), (-1, 0), c["encabezado"]),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('TOPPADDING', (0, 0), (-1, 0), 8),
+
+            # Cuerpo
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 7),
+            ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # OP #
+            ('ALIGN', (1, 1), (2, -1), 'CENTER'),  # Fechas
+            ('ALIGN', (6, 1), (8, -1), 'RIGHT'),   # Montos
+            ('ALIGN', (9, 1), (9, -1), 'CENTER'),  # Días atraso
+            ('ALIGN', (10, 1), (10, -1), 'CENTER'), # Estado
+
+            # Bordes
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BOX', (0, 0), (-1, -1), 1, colors.black),
+
+            # Padding
+            ('TOPPADDING', (0, 1), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+            ('LEFTPADDING', (0, 0), (-1, -1), 3),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ]),
+        # Fila de subtotal (última fila del último bloque de cada proyecto)
+        "subtotal": TableStyle([
+            ('BACKGROUND', (0, -1), (-1, -1), c["subtotal"]),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 8),
+            ('LINEABOVE', (0, -1), (-1, -1), 1.5, colors.black),
+        ]),
+        "total": TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), c["encabezado"]),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (6, 0), (8, 0), 'RIGHT'),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('LEFTPADDING', (0, 0), (-1, -1), 3),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ]),
+    }
+
+
+# ================================================================
+# REGISTRO (se construye al importar)
+# ================================================================
+
+_CONSTRUCTORES = {
+    "OC": (_estilos_oc, _tablas_oc),
+    "OP": (_estilos_op, _tablas_op),
+    "OP_RESUMEN": (_estilos_op_resumen, _tablas_op_resumen),
+    "DOCUMENTOS_PENDIENTES": (_estilos_documentos_pendientes, _tablas_documentos_pendientes),
+}
+
+_base = getSampleStyleSheet()
+ESTILOS_OC, TABLAS_OC = _estilos_oc(_base), _tablas_oc()
+ESTILOS_OP, TABLAS_OP = _estilos_op(_base), _tablas_op()
+ESTILOS_OP_RESUMEN, TABLAS_OP_RESUMEN = _estilos_op_resumen(_base), _tablas_op_resumen()
+ESTILOS_DOCUMENTOS_PENDIENTES = _estilos_documentos_pendientes(_base)
+TABLAS_DOCUMENTOS_PENDIENTES = _tablas_documentos_pendientes()
+
+
+def benchmark_setup(repeticiones=500):
+    """
+    Microsegundos por documento para tener sus estilos listos:
+      antes:   getSampleStyleSheet() + ParagraphStyle + TableStyle en cada render
+      despues: consulta al registro ya construido
+    """
+    import time
+
+    resultados = []
+    for tipo, (estilos, tablas) in _CONSTRUCTORES.items():
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            estilos(getSampleStyleSheet())
+            tablas()
+        antes = (time.perf_counter() - inicio) / repeticiones
+
+        registro = globals()
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            registro[f"ESTILOS_{tipo}"]
+            registro[f"TABLAS_{tipo}"]
+        despues = (time.perf_counter() - inicio) / repeticiones
+
+        resultados.append({
+            "documento": tipo,
+            "antes_us": round(antes * 1e6, 1),
+            "despues_us": round(despues * 1e6, 2),
+        })
+    return resultados
+
+
+if __name__ == "__main__":
+    for r in benchmark_setup():
+        print(f"{r['documento']:<22} antes {r['antes_us']:>8.1f} µs   después {r['despues_us']:>6.2f} µs")
@@ -5,13 +5,16 @@ Similar a pdf_orden_compra.py pero adaptado para órdenes de pago.
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_LEFT, TA_JUSTIFY
 from flask import current_app
 from datetime import datetime
-import os
+from io import BytesIO
+from backend.pdf import cache_pdf
+from backend.pdf.estilos import ESTILOS_OP, TABLAS_OP
+
+VERSION_PLANTILLA = 1  # subir al cambiar el diseño (invalida la caché de PDFs)
 
 
 def safe_float(value, default=0.0):
@@ -109,6 +112,30 @@ def generar_pdf_from_form(form):
     Returns:
         tuple: (pdf_bytes, filename)
     """
+    datos_orden = preparar_datos_orden_pago(form)
+    
+    # Generar el PDF (o tomarlo de la caché si ya se renderizó con estos datos)
+    pdf_bytes = cache_pdf.obtener(
+        "OP", datos_orden, lambda: renderizar_pdf_orden_pago(datos_orden),
+        version=VERSION_PLANTILLA)
+    
+    return pdf_bytes, nombre_archivo(datos_orden)
+
+
+def _filas(tabla, clave, contexto, consultar):
+    """Filas precargadas en `contexto` (ver contexto_lote) o, si no hay, consultar()."""
+    if contexto is None:
+        return consultar()
+    fila = contexto[tabla].get(clave)
+    return [fila] if fila else []
+
+
+def preparar_datos_orden_pago(form, contexto=None):
+    """
+    Arma los datos del documento (proveedor, proyecto, líneas y totales) a
+    partir del formulario. Es la parte que consulta la BD; el render es
+    renderizar_pdf_orden_pago. Con `contexto` (de contexto_lote) no consulta.
+    """
     supabase = current_app.config.get("SUPABASE")
     
     # DEBUG: Mostrar datos recibidos
@@ -166,14 +193,14 @@ def generar_pdf_from_form(form):
     
     if supabase and nombre_proveedor:
         try:
-            prov_rows = (
+            prov_rows = _filas("proveedores", nombre_proveedor, contexto, lambda: (
                 supabase.table("proveedores")
                 .select("paguese_a, rut, cuenta, banco, correo")
                 .eq("nombre", nombre_proveedor)
                 .limit(1)
                 .execute()
                 .data or []
-            )
+            ))
             if prov_rows:
                 prov = prov_rows[0]
                 proveedor_data.update({
@@ -189,28 +216,28 @@ def generar_pdf_from_form(form):
     # Si tenemos OC, intentar obtener datos adicionales
     if supabase and oc_principal and oc_principal != "---":
         try:
-            oc_data = (
+            oc_data = _filas("ocs", str(oc_principal), contexto, lambda: (
                 supabase.table("orden_de_compra")
                 .select("proyecto, condicion_de_pago")
                 .eq("orden_compra", oc_principal)
                 .limit(1)
                 .execute()
                 .data or []
-            )
+            ))
             if oc_data:
                 proyecto_id = oc_data[0].get("proyecto")
                 
                 # Obtener nombre del proyecto si tenemos ID
                 if proyecto_id:
                     try:
-                        proy_data = (
+                        proy_data = _filas("proyectos", str(proyecto_id), contexto, lambda: (
                             supabase.table("proyectos")
                             .select("proyecto")
                             .eq("id", proyecto_id)
                             .limit(1)
                             .execute()
                             .data or []
-                        )
+                        ))
                         if proy_data:
                             proyecto = str(proy_data[0].get("proyecto", "---"))
                         else:
@@ -260,19 +287,19 @@ def generar_pdf_from_form(form):
         "total_pagar": total_pagar
     }
     
-    # Generar el PDF
-    filepath = _generar_pdf_orden_pago(datos_orden)
-    
-    # Leer el archivo generado
-    with open(filepath, 'rb') as f:
-        pdf_bytes = f.read()
-    
-    filename = os.path.basename(filepath)
-    
-    return pdf_bytes, filename
+    return datos_orden
 
 
-def _generar_pdf_orden_pago(datos_orden):
+def nombre_archivo(datos_orden):
+    """Nombre del archivo con número de OP y nombre del proveedor."""
+    numero_op = str(datos_orden.get('numero_op', 'SIN_NUMERO'))
+    proveedor_nombre = str(datos_orden.get('proveedor', {}).get('nombre', 'SIN_PROVEEDOR'))
+    # Limpiar nombre del proveedor para nombre de archivo (quitar espacios y caracteres especiales)
+    proveedor_clean = proveedor_nombre.replace(' ', '_').replace('.', '').replace(',', '').upper()
+    return f"orden_pago_{numero_op}_{proveedor_clean}.pdf"
+
+
+def renderizar_pdf_orden_pago(datos_orden):
     """
     Genera el PDF de Orden de Pago usando ReportLab.
     Similar a generar_pdf_orden_compra pero adaptado para órdenes de pago.
@@ -281,23 +308,14 @@ def _generar_pdf_orden_pago(datos_orden):
         datos_orden: Dict con los datos de la orden
     
     Returns:
-        str: Ruta del archivo PDF generado
+        bytes: Contenido del PDF
     """
-    # Crear directorio para PDFs
-    pdf_dir = os.path.join(os.path.dirname(__file__), '..', 'pdfs_generados', 'ordenes_pago')
-    os.makedirs(pdf_dir, exist_ok=True)
-    
-    # Nombre del archivo con número de OP y nombre del proveedor
+    buffer = BytesIO()
     numero_op = str(datos_orden.get('numero_op', 'SIN_NUMERO'))
-    proveedor_nombre = str(datos_orden.get('proveedor', {}).get('nombre', 'SIN_PROVEEDOR'))
-    # Limpiar nombre del proveedor para nombre de archivo (quitar espacios y caracteres especiales)
-    proveedor_clean = proveedor_nombre.replace(' ', '_').replace('.', '').replace(',', '').upper()
-    filename = f"orden_pago_{numero_op}_{proveedor_clean}.pdf"
-    filepath = os.path.join(pdf_dir, filename)
     
     # Configurar documento
     doc = SimpleDocTemplate(
-        filepath,
+        buffer,
         pagesize=A4,
         leftMargin=20*mm,
         rightMargin=20*mm,
@@ -307,75 +325,8 @@ def _generar_pdf_orden_pago(datos_orden):
     
     elements = []
     
-    # --- ESTILOS ---
-    styles = getSampleStyleSheet()
-    
-    # Colores más sutiles (estilo del HTML template)
-    COLOR_BORDER = colors.HexColor('#444444')
-    COLOR_HEADER_BG = colors.HexColor('#f0f0f0')
-    COLOR_TEXT = colors.black
-    COLOR_GRAY = colors.HexColor('#555555')
-    
-    styles.add(ParagraphStyle(
-        name='RightSmall',
-        parent=styles['Normal'],
-        alignment=TA_RIGHT,
-        fontSize=10,
-        textColor=COLOR_TEXT,
-        leading=12
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='Small',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=COLOR_TEXT,
-        leading=12
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='Tiny',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=COLOR_GRAY,
-        leading=11,
-        alignment=TA_CENTER
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='CompanyName',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=COLOR_TEXT,
-        spaceAfter=3,
-        fontName='Helvetica-Bold',
-        alignment=TA_CENTER
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='SectionTitle',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=COLOR_TEXT,
-        fontName='Helvetica-Bold',
-        spaceAfter=4
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='SectionLabel',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=COLOR_TEXT,
-        fontName='Helvetica-Bold'
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='DetailText',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=COLOR_TEXT,
-        leading=13
-    ))
+    # --- ESTILOS (registro compartido, ver estilos.py) ---
+    styles = ESTILOS_OP
     
     # --- TÍTULO PRINCIPAL (centrado como el HTML) ---
     empresa = datos_orden.get('empresa', {})
@@ -414,11 +365,7 @@ def _generar_pdf_orden_pago(datos_orden):
     ]
     
     tabla_col1 = Table(datos_col1, colWidths=[doc.width*0.48])
-    tabla_col1.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('TOPPADDING', (0,0), (-1,-1), 3),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 3)
-    ]))
+    tabla_col1.setStyle(TABLAS_OP["columna"])
     
     # Columna 2: Detalles de Compra
     datos_col2 = [
@@ -432,22 +379,14 @@ def _generar_pdf_orden_pago(datos_orden):
     ]
     
     tabla_col2 = Table(datos_col2, colWidths=[doc.width*0.48])
-    tabla_col2.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('TOPPADDING', (0,0), (-1,-1), 3),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 3)
-    ]))
+    tabla_col2.setStyle(TABLAS_OP["columna"])
     
     # Combinar las 2 columnas
     tabla_superior = Table(
         [[tabla_col1, tabla_col2]], 
         colWidths=[doc.width*0.50, doc.width*0.50]
     )
-    tabla_superior.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 0)
-    ]))
+    tabla_superior.setStyle(TABLAS_OP["superior"])
     elements.append(tabla_superior)
     elements.append(Spacer(1, 6*mm))
     
@@ -472,21 +411,7 @@ def _generar_pdf_orden_pago(datos_orden):
     # Anchos de columna (como en el HTML: 80px, 60px, resto)
     col_widths = [30*mm, 25*mm, doc.width - 55*mm]
     tabla_lineas = Table(datos_lineas, colWidths=col_widths, repeatRows=1)
-    tabla_lineas.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), COLOR_HEADER_BG),
-        ('TEXTCOLOR', (0,0), (-1,-1), COLOR_TEXT),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('GRID', (0,0), (-1,-1), 1, COLOR_BORDER),
-        ('LINEBELOW', (0,0), (-1,0), 1, COLOR_BORDER),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (0,1), (1,-1), 'LEFT'),
-        ('ALIGN', (2,1), (2,-1), 'LEFT'),
-        ('TOPPADDING', (0,0), (-1,-1), 5),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 5),
-        ('LEFTPADDING', (0,0), (-1,-1), 5),
-        ('RIGHTPADDING', (0,0), (-1,-1), 5)
-    ]))
+    tabla_lineas.setStyle(TABLAS_OP["lineas"])
     
     elements.append(Paragraph('<b>Detalle de Material</b>', styles['SectionTitle']))
     elements.append(Spacer(1, 3*mm))
@@ -513,28 +438,11 @@ def _generar_pdf_orden_pago(datos_orden):
         [['', Table(datos_totales, colWidths=[35*mm, 35*mm])]],
         colWidths=[doc.width*0.6, doc.width*0.4]
     )
-    tabla_totales_container.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (1,0), (1,0), 'RIGHT'),
-        ('LEFTPADDING', (0,0), (-1,-1), 0),
-        ('RIGHTPADDING', (0,0), (-1,-1), 0),
-        ('TOPPADDING', (0,0), (-1,-1), 0),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 0)
-    ]))
+    tabla_totales_container.setStyle(TABLAS_OP["totales_contenedor"])
     
     # Aplicar estilo a la tabla interna de totales
     tabla_totales_interna = tabla_totales_container._cellvalues[0][1]
-    tabla_totales_interna.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, COLOR_BORDER),
-        ('ALIGN', (0,0), (0,-1), 'RIGHT'),
-        ('ALIGN', (1,0), (1,-1), 'RIGHT'),
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('TOPPADDING', (0,0), (-1,-1), 5),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 5),
-        ('LEFTPADDING', (0,0), (-1,-1), 5),
-        ('RIGHTPADDING', (0,0), (-1,-1), 5),
-        ('BACKGROUND', (0,0), (-1,-1), colors.white)
-    ]))
+    tabla_totales_interna.setStyle(TABLAS_OP["totales"])
     
     elements.append(tabla_totales_container)
     elements.append(Spacer(1, 3*mm))
@@ -562,7 +470,7 @@ def _generar_pdf_orden_pago(datos_orden):
     # Construir PDF
     doc.build(elements)
     
-    return filepath
+    return buffer.getvalue()
 
 
 def generar_pdf_por_numero(orden_numero):
@@ -575,6 +483,14 @@ def generar_pdf_por_numero(orden_numero):
     Returns:
         tuple: (pdf_bytes, filename)
     """
+    return generar_pdf_from_form(form_por_numero(orden_numero))
+
+
+def form_por_numero(orden_numero):
+    """
+    Lee las líneas de la orden y las lleva al formato de formulario que
+    recibe generar_pdf_from_form / preparar_datos_orden_pago.
+    """
     supabase = current_app.config.get("SUPABASE")
     if not supabase:
         raise RuntimeError("Supabase client not configured")
@@ -595,6 +511,11 @@ def generar_pdf_por_numero(orden_numero):
     if not lineas:
         raise ValueError(f"Orden {orden_numero} no encontrada")
     
+    return _form_desde_lineas(orden_numero, lineas)
+
+
+def _form_desde_lineas(orden_numero, lineas):
+    """Form-like de una orden a partir de sus líneas de orden_de_pago."""
     # Extraer datos de las líneas
     ocs = [str(l.get("orden_compra") or "") for l in lineas]
     guias = [str(l.get("doc_recep") or "") for l in lineas]
@@ -640,4 +561,78 @@ def generar_pdf_por_numero(orden_numero):
         "total_pagar": total_pagar
     }
     
-    return generar_pdf_from_form(form_like)
+    return form_like
+
+
+LOTE_NUMEROS = 200  # números por consulta in_ (largo de la URL)
+PAGE_SIZE = 1000
+
+
+def _en_lotes(supabase, tabla, campos, columna, valores):
+    """Filas de `tabla` con `columna` en `valores`: consultas in_ por lotes, paginadas."""
+    filas = []
+    valores = list(valores)
+    for i in range(0, len(valores), LOTE_NUMEROS):
+        lote = valores[i:i + LOTE_NUMEROS]
+        offset = 0
+        while True:
+            batch = (
+                supabase.table(tabla)
+                .select(campos)
+                .in_(columna, lote)
+                .order("id")
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+                .data or []
+            )
+            filas.extend(batch)
+            if len(batch) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+    return filas
+
+
+def forms_por_numeros(numeros):
+    """
+    orden_numero -> form-like para varias órdenes, leyendo todas sus líneas
+    juntas. Las órdenes sin líneas no aparecen en el resultado.
+    """
+    supabase = current_app.config.get("SUPABASE")
+    if not supabase:
+        raise RuntimeError("Supabase client not configured")
+    
+    por_orden = {}
+    for linea in _en_lotes(supabase, "orden_de_pago", "*", "orden_numero", numeros):
+        por_orden.setdefault(safe_int(linea.get("orden_numero")), []).append(linea)
+    
+    return {
+        numero: _form_desde_lineas(numero, por_orden[numero])
+        for numero in numeros if numero in por_orden
+    }
+
+
+def contexto_lote(forms):
+    """
+    Precarga en tres consultas los proveedores, OCs y proyectos que
+    preparar_datos_orden_pago consultaría una vez por orden.
+    """
+    supabase = current_app.config.get("SUPABASE")
+    nombres = {str(f.get("nombre_proveedor", "")) for f in forms} - {""}
+    ocs = set()
+    for f in forms:
+        lista = _getlist_from_form(f, "orden_compra[]")
+        if lista and lista[0] and lista[0] != "---":
+            ocs.add(str(lista[0]))
+    
+    contexto = {"proveedores": {}, "ocs": {}, "proyectos": {}}
+    if not supabase:
+        return contexto
+    
+    for p in _en_lotes(supabase, "proveedores", "id, nombre, paguese_a, rut, cuenta, banco, correo", "nombre", nombres):
+        contexto["proveedores"].setdefault(p.get("nombre"), p)
+    for oc in _en_lotes(supabase, "orden_de_compra", "id, orden_compra, proyecto, condicion_de_pago", "orden_compra", ocs):
+        contexto["ocs"].setdefault(str(oc.get("orden_compra")), oc)
+    proyecto_ids = {oc.get("proyecto") for oc in contexto["ocs"].values()} - {None, ""}
+    for p in _en_lotes(supabase, "proyectos", "id, proyecto", "id", proyecto_ids):
+        contexto["proyectos"][str(p.get("id"))] = p
+    return contexto
@@ -10,12 +10,16 @@ Mejoras implementadas:
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Frame
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak, Frame
 from reportlab.lib.units import mm, inch
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_LEFT, TA_JUSTIFY
 from datetime import datetime
-import os
+from io import BytesIO
+from backend.pdf import cache_pdf
+from backend.pdf.estilos import ESTILOS_OC, TABLAS_OC, COLORES_OC
+
+VERSION_PLANTILLA = 1  # subir al cambiar el diseño (invalida la caché de PDFs)
+
 
 def generar_pdf_orden_compra(datos_orden):
     """
@@ -25,22 +29,33 @@ def generar_pdf_orden_compra(datos_orden):
         datos_orden: Dict con los datos de la orden
     
     Returns:
-        str: Ruta del archivo PDF generado
+        str: Ruta del archivo PDF generado (en la caché de PDFs: un documento
+        con los mismos datos no se vuelve a renderizar)
     """
-    # Crear directorio para PDFs
-    pdf_dir = os.path.join(os.path.dirname(__file__), '..', 'pdfs_generados')
-    os.makedirs(pdf_dir, exist_ok=True)
+    datos_orden = preparar_datos_orden_compra(datos_orden)
+    return cache_pdf.obtener_ruta(
+        "OC", datos_orden, lambda: renderizar_pdf_orden_compra(datos_orden),
+        version=VERSION_PLANTILLA)
+
+
+def preparar_datos_orden_compra(datos_orden):
+    """Completa la fecha por defecto: es parte del contenido (y de la clave de caché)."""
+    if 'fecha' not in datos_orden:
+        datos_orden = {**datos_orden, 'fecha': datetime.now().strftime('%d-%m-%Y')}
+    return datos_orden
+
+
+def renderizar_pdf_orden_compra(datos_orden):
+    """Renderiza el PDF de Orden de Compra y devuelve sus bytes."""
+    buffer = BytesIO()
     
     # IMPORTANTE: Convertir a string para evitar errores
     numero_oc = str(datos_orden.get('numero_oc', 'SIN_NUMERO'))
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"OC_{numero_oc}_{timestamp}.pdf"
-    filepath = os.path.join(pdf_dir, filename)
     
     # AJUSTE: Margen inferior más grande para el texto legal
     bottom_margin = 70 * mm
     doc = SimpleDocTemplate(
-        filepath,
+        buffer,
         pagesize=A4,
         leftMargin=20*mm,
         rightMargin=20*mm,
@@ -50,68 +65,9 @@ def generar_pdf_orden_compra(datos_orden):
 
     elements = []
     
-    # --- ESTILOS MEJORADOS ---
-    styles = getSampleStyleSheet()
-    
-    # Colores corporativos profesionales
-    COLOR_PRIMARY = colors.HexColor('#2C3E50')
-    COLOR_SECONDARY = colors.HexColor('#34495E')
-    COLOR_ACCENT = colors.HexColor('#3498DB')
-    COLOR_HEADER_BG = colors.HexColor('#ECF0F1')
-    
-    styles.add(ParagraphStyle(
-        name='RightSmall',
-        parent=styles['Normal'],
-        alignment=TA_RIGHT,
-        fontSize=9,
-        textColor=COLOR_SECONDARY
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='Small',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=COLOR_SECONDARY,
-        leading=12
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='CompanyName',
-        parent=styles['Heading1'],
-        fontSize=14,
-        textColor=COLOR_PRIMARY,
-        spaceAfter=2,
-        fontName='Helvetica-Bold'
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='HeaderTitle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=13,
-        textColor=COLOR_PRIMARY,
-        fontName='Helvetica-Bold'
-    ))
-    
-    # AJUSTE: Texto legal JUSTIFICADO
-    styles.add(ParagraphStyle(
-        name='Legal',
-        parent=styles['Normal'],
-        fontSize=7,
-        alignment=TA_JUSTIFY,  # ✅ TEXTO JUSTIFICADO (cuadrado)
-        leading=8.5,
-        textColor=colors.HexColor('#555555'),
-        leftIndent=0,
-        rightIndent=0
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='SectionLabel',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=COLOR_PRIMARY,
-        fontName='Helvetica-Bold'
-    ))
+    # --- ESTILOS (registro compartido, ver estilos.py) ---
+    styles = ESTILOS_OC
+    COLOR_SECONDARY = COLORES_OC["secondary"]
 
     def fmt_money(value):
         try:
@@ -162,21 +118,10 @@ def generar_pdf_orden_compra(datos_orden):
     ]
     
     right_header = Table(right_header_data, colWidths=[65*mm])
-    right_header.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), COLOR_HEADER_BG),
-        ('BOX', (0,0), (-1,-1), 1.5, COLOR_PRIMARY),
-        ('TOPPADDING', (0,0), (-1,0), 8),
-        ('BOTTOMPADDING', (0,0), (-1,0), 8),
-        ('LEFTPADDING', (0,0), (-1,-1), 10),
-        ('RIGHTPADDING', (0,0), (-1,-1), 10),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE')
-    ]))
+    right_header.setStyle(TABLAS_OC["cabecera_derecha"])
 
     header_table = Table([[left_header, right_header]], colWidths=[doc.width*0.55, doc.width*0.45])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (1,0), (1,0), 'RIGHT')
-    ]))
+    header_table.setStyle(TABLAS_OC["cabecera"])
     elements.append(header_table)
     elements.append(Spacer(1, 8*mm))
 
@@ -198,15 +143,7 @@ def generar_pdf_orden_compra(datos_orden):
     ]
 
     tabla_proveedor = Table(proveedor_data, colWidths=[40*mm, doc.width-40*mm])
-    tabla_proveedor.setStyle(TableStyle([
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('ALIGN', (0,0), (0,-1), 'LEFT'),
-        ('ALIGN', (1,0), (1,-1), 'LEFT'),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 3),
-        ('LINEBELOW', (0,-1), (-1,-1), 0.5, colors.HexColor('#CCCCCC'))
-    ]))
+    tabla_proveedor.setStyle(TABLAS_OC["proveedor"])
     elements.append(tabla_proveedor)
     elements.append(Spacer(1, 5*mm))
 
@@ -244,21 +181,7 @@ def generar_pdf_orden_compra(datos_orden):
 
     col_widths = [25*mm, doc.width - (25*mm + 25*mm + 32*mm + 32*mm), 25*mm, 32*mm, 32*mm]
     tabla_productos = Table(datos_productos, colWidths=col_widths, repeatRows=1)
-    tabla_productos.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), COLOR_PRIMARY),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 9),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#DDDDDD')),
-        ('LINEBELOW', (0,0), (-1,0), 1.5, COLOR_PRIMARY),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('ALIGN', (2,0), (2,-1), 'CENTER'),
-        ('ALIGN', (3,0), (4,-1), 'RIGHT'),
-        ('ALIGN', (0,0), (1,-1), 'LEFT'),
-        ('TOPPADDING', (0,1), (-1,-1), 6),
-        ('BOTTOMPADDING', (0,1), (-1,-1), 6),
-        ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#F9F9F9')])
-    ]))
+    tabla_productos.setStyle(TABLAS_OC["productos"])
     elements.append(tabla_productos)
     elements.append(Spacer(1, 5*mm))
 
@@ -283,14 +206,7 @@ def generar_pdf_orden_compra(datos_orden):
     ]
 
     tabla_totales = Table(datos_totales, colWidths=[doc.width*0.45, 15*mm, 35*mm, 35*mm])
-    tabla_totales.setStyle(TableStyle([
-        ('ALIGN', (2,0), (-1,-1), 'RIGHT'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('TOPPADDING', (0,0), (-1,-1), 4),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-        ('LINEABOVE', (2,2), (-1,2), 1, COLOR_PRIMARY),
-        ('BACKGROUND', (2,2), (-1,2), COLOR_HEADER_BG)
-    ]))
+    tabla_totales.setStyle(TABLAS_OC["totales"])
     elements.append(tabla_totales)
     elements.append(Spacer(1, 15*mm))
 
@@ -306,13 +222,7 @@ def generar_pdf_orden_compra(datos_orden):
         colWidths=[doc.width*0.5-6*mm, doc.width*0.5-6*mm],
         rowHeights=[None, 20*mm]  # ✅ Más espacio entre nombres y línea
     )
-    firma_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,0), 'CENTER'),
-        ('FONTSIZE', (0,0), (-1,0), 9),
-        ('LINEABOVE', (0,1), (-1,1), 1, COLOR_SECONDARY),  # Línea arriba de la fila vacía
-        ('TOPPADDING', (0,1), (-1,1), 0),  # Sin padding para que línea esté más abajo
-        ('VALIGN', (0,0), (-1,0), 'TOP')  # Nombres arriba
-    ]))
+    firma_table.setStyle(TABLAS_OC["firmas"])
     elements.append(firma_table)
 
     # Texto legal
@@ -356,4 +266,4 @@ def generar_pdf_orden_compra(datos_orden):
     # Construir PDF
     doc.build(elements, onFirstPage=draw_footer, onLaterPages=draw_footer)
 
-    return filepath
\ No newline at end of file
+    return buffer.getvalue()
\ No newline at end of file
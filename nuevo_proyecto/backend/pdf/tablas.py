@@ -0,0 +1,147 @@
+"""
+Tablas grandes paginadas para los reportes PDF.
+
+Una sola Table de ReportLab con miles de filas es lenta: al partirla entre
+páginas vuelve a medir todas las filas restantes en cada corte. Aquí la tabla
+se arma por página: TablaPorPaginas mide solo las filas que caben en el
+espacio disponible (en ventanas de FILAS_POR_BLOQUE filas, que se agrandan si
+la página admite más), corta ahí y deja el resto para la página siguiente.
+Así el costo de cada corte es acotado, el render crece linealmente con las
+filas y el encabezado aparece solo al inicio de cada página, como en una
+tabla continua.
+
+Los TableStyle se pasan ya construidos y se reutilizan en todas las páginas.
+"""
+from reportlab.platypus import Flowable, Table, TableStyle, Paragraph, Spacer
+
+FILAS_POR_BLOQUE = 25
+MAX_FILAS_VENTANA = 200  # tope de filas medidas de una vez (más de las que caben en una página)
+
+
+class TablaPorPaginas(Flowable):
+    """
+    Flowable que se parte por páginas: en cada una es una Table con el
+    encabezado y las filas que caben desde `inicio`.
+    """
+
+    def __init__(self, encabezado, filas, estilo, col_widths=None, total=None, estilo_total=None,
+                 fondos=None, filas_por_bloque=FILAS_POR_BLOQUE, inicio=0, alto_fila=None):
+        Flowable.__init__(self)
+        self.encabezado = encabezado
+        self.filas = filas
+        self.estilo = estilo
+        self.col_widths = col_widths
+        self.total = total
+        self.estilo_total = estilo_total
+        self.fondos = fondos
+        self.filas_por_bloque = max(1, filas_por_bloque)
+        self.inicio = inicio
+        self.alto_fila = alto_fila  # alto medio de fila ya medido, para estimar la ventana
+        self.hAlign = 'CENTER'  # igual que Table
+        self._tabla = None
+        self._medida = None  # (ancho, alto disponibles) del último wrap
+
+    def _armar(self, n):
+        """Table con el encabezado y hasta n filas desde `inicio` (más el total si es el final)."""
+        fin = min(self.inicio + n, len(self.filas))
+        ultimo = fin >= len(self.filas)
+        data = [self.encabezado] + self.filas[self.inicio:fin]
+        if ultimo and self.total is not None:
+            data.append(self.total)
+
+        tabla = Table(data, colWidths=self.col_widths, repeatRows=1)
+        tabla.setStyle(self.estilo)
+        if self.fondos:
+            extra = [('BACKGROUND', (0, i), (-1, i), color)
+                     for i, color in enumerate(self.fondos[self.inicio:fin], start=1) if color]
+            if extra:
+                tabla.setStyle(TableStyle(extra))
+        if ultimo and self.total is not None and self.estilo_total is not None:
+            tabla.setStyle(self.estilo_total)
+        return tabla, ultimo
+
+    def wrap(self, availWidth, availHeight):
+        if self._medida == (availWidth, availHeight):
+            return self.width, self.height
+        # Ventana de filas estimada por el alto medio: se agranda hasta que no
+        # quepa, llegue al final o alcance MAX_FILAS_VENTANA
+        def estimar(n):
+            if not self.alto_fila:
+                return n
+            return min(MAX_FILAS_VENTANA, max(n, int(availHeight / self.alto_fila) + 2))
+
+        n = estimar(1) if self.alto_fila else self.filas_por_bloque
+        while True:
+            tabla, ultimo = self._armar(n)
+            ancho, alto = tabla.wrap(availWidth, availHeight)
+            self.alto_fila = alto / len(tabla._cellvalues)
+            if ultimo or alto > availHeight or n >= MAX_FILAS_VENTANA:
+                break
+            n = estimar(n + 1)
+        self._tabla = tabla
+        self._medida = (availWidth, availHeight)
+        self.width = ancho
+        # Si quedan filas fuera de la ventana, no "cabe": el frame la parte
+        self.height = alto if ultimo else max(alto, availHeight + 1)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        self.wrap(availWidth, availHeight)
+        if self._tabla._height <= availHeight:
+            primera = self._tabla  # la ventana cabe entera (llegó a MAX_FILAS_VENTANA)
+        else:
+            partes = self._tabla.split(availWidth, availHeight)
+            if not partes:
+                return []
+            primera = partes[0]
+        cabe = len(primera._cellvalues) - 1  # filas de datos (sin el encabezado)
+        if cabe <= 0:
+            return []
+        resto = TablaPorPaginas(
+            self.encabezado, self.filas, self.estilo, col_widths=self.col_widths, total=self.total,
+            estilo_total=self.estilo_total, fondos=self.fondos, filas_por_bloque=self.filas_por_bloque,
+            inicio=self.inicio + min(cabe, len(self.filas) - self.inicio), alto_fila=self.alto_fila,
+        )
+        return [primera, resto]
+
+    def draw(self):
+        self._tabla.drawOn(self.canv, 0, 0)
+
+
+def tabla_en_bloques(encabezado, filas, estilo, col_widths=None, total=None, estilo_total=None,
+                     fondos=None, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Flowables de una tabla con `filas` que se parte por páginas (ver TablaPorPaginas).
+
+    Args:
+        encabezado: fila de encabezado, repetida al inicio de cada página
+        filas: filas de datos
+        estilo: TableStyle común a todas las páginas (fila 0 = encabezado)
+        col_widths: anchos fijos (recomendado, para que las páginas calcen)
+        total: fila opcional que cierra la tabla (total o subtotal)
+        estilo_total: TableStyle que se aplica además a la última página si hay total
+        fondos: color de fondo por fila (o None), paralelo a `filas`
+        filas_por_bloque: filas que se miden de una vez al buscar el corte de página
+    """
+    return [TablaPorPaginas(encabezado, filas, estilo, col_widths=col_widths, total=total,
+                            estilo_total=estilo_total, fondos=fondos, filas_por_bloque=filas_por_bloque)]
+
+
+def tablas_por_grupo(grupos, encabezado, estilo, estilo_titulo, col_widths=None,
+                     estilo_total=None, separacion=6, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Flowables de varias tablas paginadas, cada una con su título.
+
+    Args:
+        grupos: [(titulo, filas, fila_subtotal, fondos)]; fila_subtotal y fondos pueden ser None
+        estilo_titulo: ParagraphStyle del título de cada grupo
+    """
+    story = []
+    for titulo, filas, subtotal, fondos in grupos:
+        story.append(Paragraph(titulo, estilo_titulo))
+        story.extend(tabla_en_bloques(
+            encabezado, filas, estilo, col_widths=col_widths, total=subtotal,
+            estilo_total=estilo_total, fondos=fondos, filas_por_bloque=filas_por_bloque,
+        ))
+        story.append(Spacer(1, separacion))
+    return story
@@ -0,0 +1,295 @@
+"""
+Render de PDFs en segundo plano con un pool de procesos.
+
+El request solo arma los datos del documento (consultas a la BD) y encola el
+render, que es CPU puro (ReportLab), en un ProcessPoolExecutor: así una ráfaga
+de PDFs no bloquea a los workers de gunicorn ni choca con su timeout.
+
+- PDF_WORKERS procesos por worker de gunicorn; como máximo MAX_PENDIENTES
+  trabajos en curso (si no, ColaPdfLlena).
+- El resultado va a la caché de PDFs (cache_pdf), cuyo disco comparten los
+  workers; si el documento ya estaba en caché el trabajo nace terminado.
+- El estado de cada trabajo se guarda en Redis (si hay) para que cualquier
+  worker pueda responder a la consulta de estado y a la descarga.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import logging
+import multiprocessing
+import zipfile
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from backend.utils.cache import redis_client
+from backend.pdf import cache_pdf
+from backend.pdf.pdf_orden_compra import renderizar_pdf_orden_compra
+from backend.pdf.pdf_orden_compra import VERSION_PLANTILLA as VERSION_OC
+from backend.pdf.ordenes_pago_pdf import renderizar_pdf_orden_pago
+from backend.pdf.ordenes_pago_pdf import VERSION_PLANTILLA as VERSION_OP
+from backend.pdf.documentos_pendientes_pdf import generar_pdf_documentos_pendientes
+from backend.pdf.documentos_pendientes_pdf import VERSION_PLANTILLA as VERSION_DOCUMENTOS_PENDIENTES
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "2"))
+MAX_PENDIENTES = int(os.environ.get("PDF_MAX_PENDIENTES", "50"))
+TRABAJO_TTL = 3600  # segundos que se recuerda un trabajo terminado
+TRABAJO_PREFIX = "pdfjob:"
+
+ESTADOS_ACTIVOS = ("procesando",)
+
+
+class ColaPdfLlena(Exception):
+    """Hay MAX_PENDIENTES trabajos en curso en este worker."""
+
+
+def _render_documentos_pendientes(datos):
+    buffer = BytesIO()
+    generar_pdf_documentos_pendientes(datos["documentos"], datos["stats"], buffer)
+    return buffer.getvalue()
+
+
+# tipo -> (función de render, versión de plantilla). Las funciones deben ser
+# de nivel de módulo para poder enviarse al pool de procesos.
+RENDERIZADORES = {
+    "OC": (renderizar_pdf_orden_compra, VERSION_OC),
+    "OP": (renderizar_pdf_orden_pago, VERSION_OP),
+    "DOCUMENTOS_PENDIENTES": (_render_documentos_pendientes, VERSION_DOCUMENTOS_PENDIENTES),
+}
+
+
+def _renderizar(tipo, datos):
+    """Cuerpo del trabajo (corre en un proceso del pool)."""
+    inicio = time.time()
+    pdf = RENDERIZADORES[tipo][0](datos)
+    return pdf, time.time() - inicio
+
+
+_pool_estado = {"pool": None}
+_trabajos = {}  # id -> trabajo (los de este worker)
+_stats = {"enviados": 0, "desde_cache": 0, "terminados": 0, "errores": 0, "segundos_render": 0.0}
+_lock = threading.Lock()
+
+
+def _get_pool():
+    if _pool_estado["pool"] is None:
+        with _lock:
+            if _pool_estado["pool"] is None:
+                # spawn: los hijos no heredan hilos ni conexiones del worker
+                _pool_estado["pool"] = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool_estado["pool"]
+
+
+def _guardar(trabajo):
+    with _lock:
+        _trabajos[trabajo["id"]] = trabajo
+        # Olvidar los terminados hace más de TRABAJO_TTL
+        limite = time.time() - TRABAJO_TTL
+        for tid in [t for t, v in _trabajos.items()
+                    if v["estado"] not in ESTADOS_ACTIVOS and (v.get("terminado") or 0) < limite]:
+            del _trabajos[tid]
+    if redis_client is not None:
+        try:
+            redis_client.setex(TRABAJO_PREFIX + trabajo["id"], TRABAJO_TTL, json.dumps(trabajo))
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el trabajo PDF {trabajo['id']} en Redis: {e}")
+
+
+def obtener_trabajo(trabajo_id):
+    """Estado del trabajo (de este worker o, vía Redis, de otro); None si no existe."""
+    with _lock:
+        trabajo = _trabajos.get(trabajo_id)
+    if trabajo is not None:
+        return dict(trabajo)
+    if redis_client is not None:
+        try:
+            data = redis_client.get(TRABAJO_PREFIX + trabajo_id)
+            if data:
+                return json.loads(data)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el trabajo PDF {trabajo_id} de Redis: {e}")
+    return None
+
+
+def _en_curso():
+    with _lock:
+        return sum(1 for t in _trabajos.values() if t["estado"] in ESTADOS_ACTIVOS)
+
+
+def _al_terminar(trabajo, future):
+    try:
+        pdf, segundos = future.result()
+        cache_pdf.guardar(trabajo["clave"], pdf, segundos)
+        trabajo.update(estado="listo", bytes=len(pdf), segundos_render=round(segundos, 3))
+        with _lock:
+            _stats["terminados"] += 1
+            _stats["segundos_render"] += segundos
+    except Exception as e:
+        logger.exception(f"Error renderizando PDF {trabajo['id']} ({trabajo['tipo']}): {e}")
+        trabajo.update(estado="error", error=str(e))
+        with _lock:
+            _stats["errores"] += 1
+        if isinstance(e, BrokenProcessPool):
+            _pool_estado["pool"] = None  # se recrea en el próximo envío
+    trabajo["terminado"] = time.time()
+    _guardar(trabajo)
+
+
+def enviar(tipo, datos, nombre_archivo):
+    """
+    Encola el render de un documento. `datos` es lo que recibe el renderizador
+    del tipo (ver RENDERIZADORES). Devuelve el trabajo (dict).
+    """
+    if tipo not in RENDERIZADORES:
+        raise ValueError(f"Tipo de PDF desconocido: {tipo}")
+    clave = cache_pdf.clave_documento(tipo, datos, RENDERIZADORES[tipo][1])
+    trabajo = {
+        "id": uuid.uuid4().hex,
+        "tipo": tipo,
+        "clave": clave,
+        "nombre_archivo": nombre_archivo,
+        "estado": "procesando",
+        "creado": time.time(),
+        "terminado": None,
+        "error": None,
+    }
+
+    if cache_pdf.existe(clave):
+        trabajo.update(estado="listo", terminado=time.time())
+        with _lock:
+            _stats["desde_cache"] += 1
+        _guardar(trabajo)
+        return trabajo
+
+    if _en_curso() >= MAX_PENDIENTES:
+        raise ColaPdfLlena(f"Hay {MAX_PENDIENTES} PDFs en proceso; intenta en unos segundos")
+
+    _guardar(trabajo)
+    try:
+        try:
+            future = _get_pool().submit(_renderizar, tipo, datos)
+        except BrokenProcessPool:
+            _pool_estado["pool"] = None
+            future = _get_pool().submit(_renderizar, tipo, datos)
+    except Exception as e:
+        # Sin esto el trabajo quedaría 'procesando' para siempre, ocupando un cupo
+        trabajo.update(estado="error", error=str(e), terminado=time.time())
+        with _lock:
+            _stats["errores"] += 1
+        _guardar(trabajo)
+        raise
+    with _lock:
+        _stats["enviados"] += 1
+    respuesta = dict(trabajo)
+    future.add_done_callback(lambda f: _al_terminar(trabajo, f))
+    return respuesta
+
+
+def descargar(trabajo_id):
+    """(bytes, nombre_archivo) de un trabajo listo; None si no está listo o se perdió de la caché."""
+    trabajo = obtener_trabajo(trabajo_id)
+    if trabajo is None or trabajo["estado"] != "listo":
+        return None
+    pdf = cache_pdf.leer(trabajo["clave"])
+    if pdf is None:
+        return None
+    return pdf, trabajo["nombre_archivo"]
+
+
+def renderizar_lote(tipo, documentos):
+    """
+    Genera (nombre_archivo, bytes) de varios documentos [(datos, nombre)] a
+    medida que están listos: primero los que ya están en la caché y luego los
+    que se renderizan en paralelo en el pool. Un documento que falla se
+    informa como (nombre, None) sin cortar el lote.
+    """
+    version = RENDERIZADORES[tipo][1]
+    pendientes = {}
+    for datos, nombre in documentos:
+        clave = cache_pdf.clave_documento(tipo, datos, version)
+        pdf = cache_pdf.leer(clave)
+        if pdf is not None:
+            with _lock:
+                _stats["desde_cache"] += 1
+            yield nombre, pdf
+        else:
+            pendientes[_get_pool().submit(_renderizar, tipo, datos)] = (clave, nombre)
+
+    with _lock:
+        _stats["enviados"] += len(pendientes)
+    for future in as_completed(pendientes):
+        clave, nombre = pendientes[future]
+        try:
+            pdf, segundos = future.result()
+        except Exception as e:
+            logger.exception(f"Error renderizando {nombre} en lote: {e}")
+            with _lock:
+                _stats["errores"] += 1
+            if isinstance(e, BrokenProcessPool):
+                _pool_estado["pool"] = None
+            yield nombre, None
+            continue
+        cache_pdf.guardar(clave, pdf, segundos)
+        with _lock:
+            _stats["terminados"] += 1
+            _stats["segundos_render"] += segundos
+        yield nombre, pdf
+
+
+class _SalidaZip:
+    """Destino no buscable para ZipFile: acumula lo escrito hasta que se retira."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b"".join(self.partes)
+        self.partes = []
+        return datos
+
+
+def zip_en_stream(archivos):
+    """
+    Genera los bytes de un ZIP con los (nombre, bytes) de `archivos`, entrada
+    por entrada, para enviarlo mientras se siguen renderizando los demás.
+    Los PDFs ya vienen comprimidos: se guardan sin recomprimir.
+    """
+    salida = _SalidaZip()
+    errores = []
+    with zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for nombre, pdf in archivos:
+            if pdf is None:
+                errores.append(nombre)
+                continue
+            zf.writestr(nombre, pdf)
+            yield salida.retirar()
+        if errores:
+            zf.writestr("ERRORES.txt", "No se pudieron generar:\n" + "\n".join(errores))
+    yield salida.retirar()
+
+
+def estadisticas():
+    with _lock:
+        s = dict(_stats)
+        en_curso = sum(1 for t in _trabajos.values() if t["estado"] in ESTADOS_ACTIVOS)
+    return {
+        "workers": PDF_WORKERS,
+        "max_pendientes": MAX_PENDIENTES,
+        "en_curso": en_curso,
+        "enviados": s["enviados"],
+        "desde_cache": s["desde_cache"],
+        "terminados": s["terminados"],
+        "errores": s["errores"],
+        "render_promedio_ms": round(s["segundos_render"] / s["terminados"] * 1000, 1) if s["terminados"] else None,
+    }
@@ -0,0 +1,158 @@
+"""
+Rutas para generar PDFs en segundo plano (ver backend/pdf/trabajos.py).
+
+POST /api/pdf/trabajos                  -> encola el render y devuelve el trabajo
+GET  /api/pdf/trabajos/<id>             -> estado del trabajo
+GET  /api/pdf/trabajos/<id>/descarga    -> PDF, cuando el estado es 'listo'
+POST /api/pdf/ordenes-pago/zip          -> ZIP con los PDFs de varias órdenes de pago
+"""
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app, make_response, Response, stream_with_context
+from backend.utils.decorators import token_required
+from backend.pdf import trabajos
+from backend.pdf.pdf_orden_compra import preparar_datos_orden_compra
+from backend.pdf.ordenes_pago_pdf import (
+    preparar_datos_orden_pago, form_por_numero, nombre_archivo, forms_por_numeros, contexto_lote,
+)
+
+pdf_trabajos_bp = Blueprint('pdf_trabajos', __name__)
+
+MAX_ORDENES_ZIP = 500
+
+
+def _datos_trabajo(tipo, body):
+    """(datos para el renderizador, nombre de archivo) según el tipo de documento."""
+    if tipo == "OC":
+        datos = body.get("datos")
+        if not datos:
+            raise ValueError("Faltan los datos de la orden de compra")
+        datos = preparar_datos_orden_compra(datos)
+        return datos, f"OrdenCompra_{datos.get('numero_oc', 'SIN_NUMERO')}.pdf"
+
+    if tipo == "OP":
+        if body.get("orden_numero") is not None:
+            form = form_por_numero(int(body["orden_numero"]))
+        elif body.get("datos"):
+            form = body["datos"]
+        else:
+            raise ValueError("Indica 'orden_numero' o los 'datos' de la orden de pago")
+        datos = preparar_datos_orden_pago(form)
+        return datos, nombre_archivo(datos)
+
+    if tipo == "DOCUMENTOS_PENDIENTES":
+        from backend.modules.dashboard import obtener_documentos_pendientes_pdf
+        documentos, stats = obtener_documentos_pendientes_pdf()
+        ahora = datetime.now()
+        # La fecha de generación impresa en el PDF es parte del contenido
+        datos = {"documentos": documentos, "stats": stats, "generado": ahora.strftime('%d/%m/%Y %H:%M')}
+        return datos, f"documentos_pendientes_{ahora.strftime('%Y%m%d_%H%M%S')}.pdf"
+
+    raise ValueError(f"Tipo de PDF desconocido: {tipo}")
+
+
+@pdf_trabajos_bp.route('/trabajos', methods=['POST'])
+@token_required
+def crear_trabajo(current_user):
+    """
+    Body: {"tipo": "OC", "datos": {...}}
+          {"tipo": "OP", "orden_numero": 3274} o {"tipo": "OP", "datos": {...}}
+          {"tipo": "DOCUMENTOS_PENDIENTES"}
+    """
+    body = request.get_json(silent=True) or {}
+    tipo = str(body.get("tipo") or "").upper()
+    try:
+        datos, archivo = _datos_trabajo(tipo, body)
+        trabajo = trabajos.enviar(tipo, datos, archivo)
+    except ValueError as ve:
+        return jsonify({"success": False, "message": str(ve)}), 400
+    except trabajos.ColaPdfLlena as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+    except Exception as e:
+        current_app.logger.exception(f"Error creando trabajo PDF: {e}")
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+    return jsonify({"success": True, "trabajo": trabajo}), 202
+
+
+@pdf_trabajos_bp.route('/trabajos/<trabajo_id>', methods=['GET'])
+@token_required
+def estado_trabajo(current_user, trabajo_id):
+    trabajo = trabajos.obtener_trabajo(trabajo_id)
+    if trabajo is None:
+        return jsonify({"success": False, "message": "Trabajo no encontrado"}), 404
+    return jsonify({"success": True, "trabajo": trabajo})
+
+
+@pdf_trabajos_bp.route('/trabajos/<trabajo_id>/descarga', methods=['GET'])
+@token_required
+def descargar_trabajo(current_user, trabajo_id):
+    trabajo = trabajos.obtener_trabajo(trabajo_id)
+    if trabajo is None:
+        return jsonify({"success": False, "message": "Trabajo no encontrado"}), 404
+    if trabajo["estado"] != "listo":
+        return jsonify({"success": False, "message": f"El PDF aún no está listo ({trabajo['estado']})",
+                        "trabajo": trabajo}), 409
+
+    resultado = trabajos.descargar(trabajo_id)
+    if resultado is None:
+        # Se desalojó de la caché: hay que volver a pedirlo
+        return jsonify({"success": False, "message": "El PDF ya no está disponible; genera uno nuevo"}), 410
+
+    pdf_bytes, filename = resultado
+    response = make_response(pdf_bytes)
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@pdf_trabajos_bp.route('/trabajos', methods=['GET'])
+@token_required
+def estadisticas_trabajos(current_user):
+    return jsonify({"success": True, "data": trabajos.estadisticas()})
+
+
+@pdf_trabajos_bp.route('/ordenes-pago/zip', methods=['POST'])
+@token_required
+def zip_ordenes_pago(current_user):
+    """
+    Body: {"ordenes": [3274, 3275, ...]} o {"desde": 3270, "hasta": 3300}
+    Lee las líneas de todas las órdenes juntas, renderiza en paralelo (o toma
+    de la caché) y envía el ZIP a medida que los PDFs están listos.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        if body.get("ordenes"):
+            numeros = list(dict.fromkeys(int(n) for n in body["ordenes"]))
+        elif body.get("desde") is not None and body.get("hasta") is not None:
+            numeros = list(range(int(body["desde"]), int(body["hasta"]) + 1))
+        else:
+            return jsonify({"success": False, "message": "Indica 'ordenes' o 'desde' y 'hasta'"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Números de orden inválidos"}), 400
+
+    if not numeros:
+        return jsonify({"success": False, "message": "No hay órdenes para exportar"}), 400
+    if len(numeros) > MAX_ORDENES_ZIP:
+        return jsonify({"success": False, "message": f"Máximo {MAX_ORDENES_ZIP} órdenes por ZIP"}), 400
+
+    try:
+        forms = forms_por_numeros(numeros)
+        if not forms:
+            return jsonify({"success": False, "message": "No se encontraron las órdenes indicadas"}), 404
+        contexto = contexto_lote(list(forms.values()))
+        documentos = []
+        for form in forms.values():
+            datos = preparar_datos_orden_pago(form, contexto)
+            documentos.append((datos, nombre_archivo(datos)))
+    except Exception as e:
+        current_app.logger.exception(f"Error preparando ZIP de órdenes de pago: {e}")
+        return jsonify({"success": False, "message": f"Error: {str(e)}"}), 500
+
+    faltantes = [n for n in numeros if n not in forms]
+    stream = trabajos.zip_en_stream(trabajos.renderizar_lote("OP", documentos))
+    filename = f"ordenes_pago_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    response = Response(stream_with_context(stream), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if faltantes:
+        response.headers['X-Ordenes-No-Encontradas'] = ",".join(str(n) for n in faltantes[:100])
+    return response
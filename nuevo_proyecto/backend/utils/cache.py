@@ -2,8 +2,26 @@
 import redis
 import json
 import os
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+import sys
+import zlib
+import copy
+import logging
+from collections import OrderedDict
 from functools import wraps
-from flask import current_app
+from flask import current_app, request, Response
+
+try:
+    import orjson  # serializador rápido (opcional)
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 # Conexión a Redis (opcional - si no está disponible, el caché no se usará)
 REDIS_URL = os.environ.get('REDIS_URL')
@@ -20,54 +38,746 @@ if REDIS_URL:
 else:
     print("⚠ REDIS_URL no configurado - caché deshabilitado")
 
-def cache_result(ttl_seconds=300):
+
+# ================================================================
+# CONSTRUCCIÓN DE CLAVES
+# ================================================================
+
+def _valor_estable(valor):
+    """
+    Representación determinista de un valor para usar en una clave.
+    Los valores que no son JSON (p.ej. objetos) se reducen a su clase y
+    atributos; si aun así no se pueden serializar, se usa su repr.
+    """
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+    if isinstance(valor, dict):
+        return {str(k): _valor_estable(v) for k, v in sorted(valor.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        items = [_valor_estable(v) for v in valor]
+        return sorted(items, key=repr) if isinstance(valor, (set, frozenset)) else items
+    if hasattr(valor, "__dict__"):
+        return {"__clase__": type(valor).__name__, **_valor_estable(vars(valor))}
+    return repr(valor)
+
+
+def stable_hash(valor):
+    """Hash corto y estable (entre procesos) de cualquier valor."""
+    texto = json.dumps(_valor_estable(valor), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _serializar_parte(valor):
+    """JSON si es posible (clave legible), hash estable si no."""
+    try:
+        return json.dumps(valor, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return f"h:{stable_hash(valor)}"
+
+
+def default_key(func, args, kwargs):
+    """Clave por defecto: nombre de la función y todos sus argumentos."""
+    return f"{func.__name__}:{_serializar_parte(list(args))}:{_serializar_parte(kwargs)}"
+
+
+def _usuario_id(current_user):
+    """Id del usuario del token (local usa 'user_id', SSO puede traer 'sub' o 'email')."""
+    if not isinstance(current_user, dict):
+        return None
+    return current_user.get("user_id") or current_user.get("sub") or current_user.get("email")
+
+
+def _usuario_rol(current_user):
+    if not isinstance(current_user, dict):
+        return None
+    return current_user.get("role") or current_user.get("rol")
+
+
+def request_key(query_args=None, path_params=True, scope=None):
+    """
+    Constructor de claves para endpoints protegidos con @token_required.
+
+    - Ignora `current_user` (primer argumento posicional).
+    - query_args: nombres de request.args que forman parte de la clave
+      (None = ninguno, "*" = todos).
+    - path_params: incluye los parámetros de la ruta (kwargs de Flask).
+    - scope: None (compartido), "user" (una entrada por usuario) o "role".
+    """
+    def builder(func, args, kwargs):
+        partes = {}
+        if path_params:
+            partes["path"] = kwargs
+        if query_args == "*":
+            partes["query"] = {k: request.args.getlist(k) for k in sorted(request.args.keys())}
+        elif query_args:
+            partes["query"] = {k: request.args.get(k) for k in query_args}
+
+        current_user = args[0] if args else None
+        if scope == "user":
+            partes["user"] = _usuario_id(current_user)
+        elif scope == "role":
+            partes["role"] = _usuario_rol(current_user)
+
+        return f"{func.__name__}:{_serializar_parte(partes)}"
+    return builder
+
+
+# ================================================================
+# SERIALIZACIÓN DE RESULTADOS
+# ================================================================
+# Cada entrada guarda, junto al resultado, metadatos para la recomputación
+# anticipada: "t" = momento en que vence lógicamente y "d" = segundos que
+# tardó en calcularse.
+#
+# En Redis se guarda un byte de formato seguido del contenido: JSON plano o
+# JSON comprimido con zlib si supera COMPRESS_THRESHOLD. Se usa orjson si está
+# instalado. Las entradas antiguas (JSON sin prefijo) se siguen leyendo.
+
+COMPRESS_THRESHOLD = 1024  # bytes
+_FORMATO_PLANO = b"\x01"
+_FORMATO_ZLIB = b"\x02"
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _codificar(data):
+    raw = _dumps(data)
+    if len(raw) > COMPRESS_THRESHOLD:
+        return _FORMATO_ZLIB + zlib.compress(raw, 1)
+    return _FORMATO_PLANO + raw
+
+
+def _decodificar(payload):
+    formato = payload[:1]
+    if formato == _FORMATO_ZLIB:
+        return _loads(zlib.decompress(payload[1:]))
+    if formato == _FORMATO_PLANO:
+        return _loads(payload[1:])
+    return json.loads(payload)  # formato anterior
+
+
+def _empaquetar(result, delta=0.0, ttl_seconds=0):
+    """
+    Convierte el resultado en algo guardable. Las respuestas Flask solo se
+    guardan si son JSON con status 200; en otro caso devuelve None (no cachear).
     """
-    Decorador para cachear el resultado de una función en Redis.
+    meta = {"t": time.time() + ttl_seconds, "d": round(delta, 4)}
+    if isinstance(result, Response):
+        if result.status_code != 200 or result.mimetype != "application/json":
+            return None
+        return {"__response__": result.get_data(as_text=True), "__meta__": meta}
+    if isinstance(result, tuple):
+        return None  # (respuesta, status) de error
+    return {"__value__": result, "__meta__": meta}
+
+
+def _desempaquetar(data):
+    """Devuelve (resultado, metadatos) a partir de una entrada decodificada."""
+    if isinstance(data, dict) and "__response__" in data:
+        respuesta = current_app.response_class(data["__response__"], status=200, mimetype="application/json")
+        return respuesta, data.get("__meta__") or {}
+    if isinstance(data, dict) and "__value__" in data:
+        # Copia: la entrada puede estar compartida en L1
+        return copy.deepcopy(data["__value__"]), data.get("__meta__") or {}
+    return data, {}  # formato anterior (valor directo)
+
+
+# ================================================================
+# L1: LRU EN MEMORIA DEL PROCESO
+# ================================================================
+# Delante de Redis (L2) cada worker guarda las entradas más usadas ya
+# decodificadas, por poco tiempo. También guarda las versiones de las
+# etiquetas, de modo que un acierto en L1 no toca Redis. Al invalidar se
+# publica un aviso en CANAL_INVALIDACION y cada worker descarta lo afectado;
+# si un aviso se pierde, L1_TTL acota cuánto puede durar un dato viejo.
+
+L1_MAX_ENTRIES = 512
+L1_TTL = 5  # segundos
+CANAL_INVALIDACION = "cache:invalidaciones"
+
+# Identifica a este proceso en los avisos (los pid se repiten entre
+# contenedores). Se regenera en cada fork por si la app se precarga.
+_proceso = {"id": uuid.uuid4().hex}
+os.register_at_fork(after_in_child=lambda: _proceso.update(id=uuid.uuid4().hex))
+
+_l1 = OrderedDict()          # cache_key -> (entrada, tags, vence)
+_versiones_locales = {}      # tag -> (versión, vence)
+_l1_lock = threading.Lock()
+
+
+def _l1_get(cache_key):
+    with _l1_lock:
+        item = _l1.get(cache_key)
+        if item is None:
+            return None
+        if item[2] < time.time():
+            del _l1[cache_key]
+            return None
+        _l1.move_to_end(cache_key)
+        return item[0]
+
+
+def _l1_set(cache_key, entrada, tags):
+    with _l1_lock:
+        _l1[cache_key] = (entrada, tuple(tags), time.time() + L1_TTL)
+        _l1.move_to_end(cache_key)
+        while len(_l1) > L1_MAX_ENTRIES:
+            _l1.popitem(last=False)
+
+
+def _l1_descartar_tags(tags):
+    """Quita de L1 las versiones y entradas de las etiquetas dadas."""
+    tags = set(tags)
+    with _l1_lock:
+        for tag in tags:
+            _versiones_locales.pop(tag, None)
+        for key in [k for k, item in _l1.items() if tags.intersection(item[1])]:
+            del _l1[key]
+
+
+# ================================================================
+# MÉTRICAS
+# ================================================================
+
+# Cada worker cuenta en memoria y cada METRICAS_FLUSH segundos suma sus
+# deltas en Redis (hash STATS_PREFIX + función), para poder ver el total de
+# todos los workers sin agregar idas a Redis por acierto.
+
+METRICAS_FLUSH = 10  # segundos
+STATS_PREFIX = "cachestats:"
+
+_metricas = {}  # nombre de función -> contadores
+_metricas_publicadas = {}  # nombre de función -> contadores ya sumados en Redis
+_metricas_estado = {"ultimo_flush": 0}
+_metricas_lock = threading.Lock()
+
+
+def _registrar(nombre, campo, valor=1):
+    with _metricas_lock:
+        m = _metricas.get(nombre)
+        if m is None:
+            m = _metricas[nombre] = {"l1_hits": 0, "l2_hits": 0, "misses": 0,
+                                     "stale": 0, "recalculos": 0, "segundos_recalculo": 0.0}
+        m[campo] += valor
+    if time.time() - _metricas_estado["ultimo_flush"] >= METRICAS_FLUSH:
+        _publicar_metricas()
+
+
+def _publicar_metricas():
+    """Suma en Redis lo contado por este worker desde el último flush."""
+    with _metricas_lock:
+        _metricas_estado["ultimo_flush"] = time.time()
+        deltas = {}
+        for nombre, m in _metricas.items():
+            previo = _metricas_publicadas.get(nombre, {})
+            d = {k: v - previo.get(k, 0) for k, v in m.items() if v - previo.get(k, 0)}
+            if d:
+                deltas[nombre] = d
+            _metricas_publicadas[nombre] = dict(m)
+    if not deltas or redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for nombre, d in deltas.items():
+            for campo, valor in d.items():
+                pipe.hincrbyfloat(f"{STATS_PREFIX}{nombre}", campo, valor)
+        pipe.execute()
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def cache_stats():
+    """Contadores por función y tasa de aciertos por nivel (de este worker)."""
+    with _metricas_lock:
+        resultado = {}
+        for nombre, m in _metricas.items():
+            total = m["l1_hits"] + m["l2_hits"] + m["misses"]
+            resultado[nombre] = {
+                **m,
+                "l1_hit_rate": round(m["l1_hits"] / total, 3) if total else None,
+                "l2_hit_rate": round(m["l2_hits"] / total, 3) if total else None,
+                "hit_rate": round((m["l1_hits"] + m["l2_hits"]) / total, 3) if total else None,
+            }
+    with _l1_lock:
+        l1 = {"entradas": len(_l1), "max": L1_MAX_ENTRIES, "ttl": L1_TTL}
+    return {"funciones": resultado, "l1": l1}
+
+
+# ================================================================
+# PROTECCIÓN CONTRA ESTAMPIDAS
+# ================================================================
+# Cuando una clave popular vence, solo quien obtiene el lease la recalcula:
+#   - lock local por clave (hilos del mismo worker)
+#   - SET NX con expiración en Redis (entre workers)
+# Los demás sirven el valor vencido (se conserva STALE_GRACE segundos más
+# allá de su TTL) o, si no hay ninguno, esperan hasta WAIT_SECONDS a que
+# aparezca. Además, con XFetch una clave se recalcula antes de vencer con una
+# probabilidad que crece al acercarse el vencimiento y con el costo de
+# calcularla, así las claves calientes casi nunca llegan a vencer.
+
+STALE_GRACE = 60      # segundos que un valor vencido sigue disponible
+LEASE_SECONDS = 10    # duración máxima del lease de recomputación
+WAIT_SECONDS = 2.0    # espera máxima de quien no obtiene el lease y no tiene valor
+WAIT_STEP = 0.05
+XFETCH_BETA = 1.0     # >1 adelanta más la recomputación
+
+LEASE_PREFIX = "cachelease:"
+
+# Libera el lease solo si sigue siendo nuestro (pudo vencer y tomarlo otro)
+_LUA_SOLTAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_locks_locales = {}
+_locks_guard = threading.Lock()
+
+
+def _debe_recalcular(meta, ahora=None):
+    """XFetch: True si la entrada venció o si 'toca' recalcularla antes."""
+    expira = meta.get("t")
+    if expira is None:
+        return False
+    ahora = ahora if ahora is not None else time.time()
+    delta = meta.get("d") or 0
+    # -log(U) con U en (0, 1] es >= 0: adelanto aleatorio proporcional a delta
+    adelanto = -delta * XFETCH_BETA * math.log(random.random() or 1e-12)
+    return ahora + adelanto >= expira
+
+
+def _tomar_lease(cache_key):
+    """Intenta obtener el derecho a recalcular la clave. None si otro lo tiene."""
+    with _locks_guard:
+        lock = _locks_locales.setdefault(cache_key, threading.Lock())
+    if not lock.acquire(blocking=False):
+        return None
+    token = uuid.uuid4().hex
+    try:
+        if redis_client.set(f"{LEASE_PREFIX}{cache_key}", token, nx=True, ex=LEASE_SECONDS):
+            return lock, token
+    except redis.exceptions.ConnectionError:
+        return lock, None  # sin Redis basta el lock local
+    lock.release()
+    return None
+
+
+def _soltar_lease(cache_key, lease):
+    lock, token = lease
+    try:
+        if token:
+            redis_client.eval(_LUA_SOLTAR, 1, f"{LEASE_PREFIX}{cache_key}", token)
+    except redis.exceptions.ConnectionError:
+        pass
+    finally:
+        lock.release()
+        with _locks_guard:
+            if not lock.locked():
+                _locks_locales.pop(cache_key, None)
+
+
+def _esperar_valor(cache_key):
+    """Espera a que quien tiene el lease publique el valor. None si no llega."""
+    limite = time.time() + WAIT_SECONDS
+    while time.time() < limite:
+        time.sleep(WAIT_STEP)
+        try:
+            cached_data = redis_client.get(cache_key)
+        except redis.exceptions.ConnectionError:
+            return None
+        if cached_data:
+            return cached_data
+    return None
+
+
+def _recalcular(func, args, kwargs, cache_key, ttl_seconds, entry_tags):
+    """Ejecuta la función y guarda el resultado (L2 y L1) con sus metadatos."""
+    inicio = time.time()
+    result = func(*args, **kwargs)
+    delta = time.time() - inicio
+    _registrar(func.__name__, "recalculos")
+    _registrar(func.__name__, "segundos_recalculo", delta)
+    try:
+        entrada = _empaquetar(result, delta, ttl_seconds)
+        if entrada is not None:
+            # Se conserva STALE_GRACE más para poder servirlo vencido
+            redis_client.setex(cache_key, ttl_seconds + STALE_GRACE, _codificar(entrada))
+            _l1_set(cache_key, entrada, entry_tags)
+    except (redis.exceptions.ConnectionError, TypeError, ValueError):
+        # No hacer nada si Redis falla al guardar o el resultado no es serializable
+        pass
+    return result
+
+
+# ================================================================
+# INVALIDACIÓN POR ETIQUETAS (VERSIONES POR NAMESPACE)
+# ================================================================
+# Cada entrada se asocia a una o más etiquetas (namespaces): siempre el nombre
+# de la función y opcionalmente otras como 'proveedores' u 'ordenes:oc:3529'.
+# La clave incluye la versión actual de cada etiqueta, guardada en Redis como
+# un contador. Invalidar es un INCR por etiqueta: O(1) sin importar cuántas
+# entradas haya; las entradas viejas quedan huérfanas y expiran por su TTL.
+
+VERSION_PREFIX = "cachever:"
+INVALIDACIONES_KEY = "cacheinval"  # hash etiqueta -> última invalidación
+
+_suscripcion = {"thread": None}
+
+
+def _resolver_tags(func, tags, args, kwargs):
+    """Etiquetas de una llamada: nombre de función + estáticas + dinámicas."""
+    resueltas = [func.__name__]
+    if callable(tags):
+        resueltas.extend(t for t in (tags(args, kwargs) or []) if t)
+    elif tags:
+        resueltas.extend(tags)
+    return sorted(set(resueltas))
+
+
+def _versiones(tags):
+    """
+    Versión actual de cada etiqueta (0 si nunca se invalidó). Usa las copias
+    locales vigentes y consulta a Redis (un MGET) solo las que faltan.
+    """
+    ahora = time.time()
+    versiones = {}
+    faltantes = []
+    with _l1_lock:
+        for tag in tags:
+            local = _versiones_locales.get(tag)
+            if local and local[1] > ahora:
+                versiones[tag] = local[0]
+            else:
+                faltantes.append(tag)
+    if faltantes:
+        valores = redis_client.mget([f"{VERSION_PREFIX}{t}" for t in faltantes])
+        with _l1_lock:
+            for tag, v in zip(faltantes, valores):
+                versiones[tag] = int(v) if v else 0
+                _versiones_locales[tag] = (versiones[tag], ahora + L1_TTL)
+    return [versiones[t] for t in tags]
+
+
+def _escuchar_invalidaciones():
+    """Hilo que aplica en L1 las invalidaciones hechas por otros workers."""
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CANAL_INVALIDACION)
+            for mensaje in pubsub.listen():
+                try:
+                    aviso = json.loads(mensaje["data"])
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(aviso, dict) and aviso.get("local"):
+                    if aviso.get("origen") == _proceso["id"]:
+                        continue  # ya aplicado al publicarlo
+                    _vaciar_local(aviso["local"], aviso.get("motivo"), aviso.get("clave"))
+                elif isinstance(aviso, list):
+                    _l1_descartar_tags(aviso)
+        except Exception as e:
+            logger.warning(f"Suscripción a invalidaciones caída: {e}")
+            # Sin avisos, L1_TTL sigue acotando los datos viejos
+            with _l1_lock:
+                _versiones_locales.clear()
+                _l1.clear()
+            time.sleep(5)
+
+
+def asegurar_suscripcion():
+    """Arranca (una vez por worker) el hilo que escucha las invalidaciones."""
+    if _suscripcion["thread"] is not None or redis_client is None:
+        return
+    with _l1_lock:
+        if _suscripcion["thread"] is not None:
+            return
+        hilo = threading.Thread(target=_escuchar_invalidaciones, name="cache-invalidaciones", daemon=True)
+        _suscripcion["thread"] = hilo
+    hilo.start()
+
+
+def invalidate(*tags, motivo=None):
+    """
+    Invalida todas las entradas asociadas a las etiquetas dadas incrementando
+    su versión y avisa al resto de los workers. Una sola ida a Redis.
+    motivo se guarda como última invalidación de cada etiqueta (por defecto,
+    la función que invalidó).
+    """
+    if not tags:
+        return
+    if motivo is None:
+        motivo = sys._getframe(1).f_code.co_name
+        if motivo == "clear_cache":
+            motivo = sys._getframe(2).f_code.co_name
+    _l1_descartar_tags(tags)
+    if redis_client is None:
+        return
+    registro = json.dumps({"motivo": motivo, "timestamp": time.time()})
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"{VERSION_PREFIX}{tag}")
+            pipe.hset(INVALIDACIONES_KEY, tag, registro)
+        pipe.publish(CANAL_INVALIDACION, json.dumps(list(tags)))
+        pipe.execute()
+    except redis.exceptions.ConnectionError:
+        pass
+
+
+def cache_result(ttl_seconds=300, key_func=None, tags=None):
+    """
+    Decorador para cachear el resultado de una función en Redis, con una
+    copia de corta duración en memoria del proceso (L1).
     Si Redis no está disponible, simplemente ejecuta la función sin caché.
+
+    key_func(func, args, kwargs) -> str permite elegir qué forma la clave;
+    ver request_key() para endpoints con @token_required.
+    tags: lista de etiquetas o función (args, kwargs) -> lista, para poder
+    invalidar con invalidate('etiqueta'). El nombre de la función siempre
+    es una etiqueta.
     """
+    build_key = key_func or default_key
+
     def decorator(func):
+        nombre = func.__name__
+        _funciones[nombre] = {"ttl": ttl_seconds,
+                              "tags": "dinámicas" if callable(tags) else list(tags or [])}
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Si Redis no está disponible, ejecutar la función directamente
             if redis_client is None:
                 return func(*args, **kwargs)
-            
+            asegurar_suscripcion()
+
             # Crear una clave de caché única basada en el nombre de la función y sus argumentos
-            cache_key = f"{func.__name__}:{json.dumps(args)}:{json.dumps(kwargs, sort_keys=True)}"
-            
+            cache_key = build_key(func, args, kwargs)
+            entry_tags = _resolver_tags(func, tags, args, kwargs)
+
             try:
-                # 1. Intentar obtener el resultado de la caché
+                # La versión de cada etiqueta forma parte de la clave
+                versiones = _versiones(entry_tags)
+                cache_key = f"{cache_key}|v:{'.'.join(map(str, versiones))}"
+
+                # 1. L1 (memoria del proceso)
+                entrada = _l1_get(cache_key)
+                if entrada is not None:
+                    result, meta = _desempaquetar(entrada)
+                    if not _debe_recalcular(meta):
+                        _registrar(nombre, "l1_hits")
+                        return result
+
+                # 2. L2 (Redis)
                 cached_data = redis_client.get(cache_key)
-                if cached_data:
-                    return json.loads(cached_data)
             except redis.exceptions.ConnectionError:
                 # Si Redis no está disponible, simplemente ejecuta la función
                 return func(*args, **kwargs)
 
-            # 2. Si no está en caché, ejecutar la función original
-            result = func(*args, **kwargs)
-            
-            # 3. Guardar el resultado en caché con un tiempo de expiración (TTL)
+            if cached_data:
+                entrada = _decodificar(cached_data)
+                result, meta = _desempaquetar(entrada)
+                if not _debe_recalcular(meta):
+                    _registrar(nombre, "l2_hits")
+                    _l1_set(cache_key, entrada, entry_tags)
+                    return result
+                # Vencida o elegida para recomputación anticipada: solo un
+                # llamador recalcula, el resto sigue con el valor que hay
+                lease = _tomar_lease(cache_key)
+                if lease is None:
+                    _registrar(nombre, "stale")
+                    _registrar(nombre, "l2_hits")
+                    return result
+                _registrar(nombre, "misses")
+                try:
+                    return _recalcular(func, args, kwargs, cache_key, ttl_seconds, entry_tags)
+                finally:
+                    _soltar_lease(cache_key, lease)
+
+            # 3. No está en caché: calcular solo si obtenemos el lease
+            _registrar(nombre, "misses")
+            lease = _tomar_lease(cache_key)
+            if lease is None:
+                cached_data = _esperar_valor(cache_key)
+                if cached_data:
+                    return _desempaquetar(_decodificar(cached_data))[0]
+                # Quien tenía el lease no terminó a tiempo: calcular igual
+                return _recalcular(func, args, kwargs, cache_key, ttl_seconds, entry_tags)
             try:
-                redis_client.setex(cache_key, ttl_seconds, json.dumps(result))
-            except redis.exceptions.ConnectionError:
-                # No hacer nada si Redis falla al guardar
-                pass
-                
-            return result
+                return _recalcular(func, args, kwargs, cache_key, ttl_seconds, entry_tags)
+            finally:
+                _soltar_lease(cache_key, lease)
         return wrapper
     return decorator
 
-def clear_cache(prefix: str):
+# ================================================================
+# ADMINISTRACIÓN
+# ================================================================
+# Registro de funciones con @cache_result y de cachés en memoria de otros
+# módulos (pagos, catálogos, libro de recepciones) para poder verlos,
+# vaciarlos y precalentarlos desde modules/cache_admin.py.
+
+ADMIN_SCAN_LIMIT = 5000  # claves a inspeccionar por función al medir tamaño
+
+_funciones = {}        # nombre -> {"ttl", "tags"}
+_caches_locales = {}   # nombre -> {"estadisticas", "vaciar", "precalentar"}
+
+
+def registrar_cache_local(nombre, estadisticas, vaciar, precalentar=None):
     """
-    Limpia todas las claves de caché que comiencen con un prefijo.
-    Ej: clear_cache('get_proyectos')
+    Registra una caché en memoria de un módulo.
+    estadisticas() -> dict, vaciar(clave=None) descarta su contenido, todo o
+    solo una parte (sin contexto de aplicación: puede correr en el hilo de
+    avisos) y precalentar() la llena.
     """
-    if redis_client is None:
-        return  # No hacer nada si Redis no está disponible
-    
+    _caches_locales[nombre] = {"estadisticas": estadisticas, "vaciar": vaciar, "precalentar": precalentar}
+
+
+def _vaciar_local(nombre, motivo=None, clave=None):
+    cache = _caches_locales.get(nombre)
+    if cache is None:
+        return False
+    if clave is None:
+        cache["vaciar"]()
+    else:
+        cache["vaciar"](clave)
+    cache["ultima_invalidacion"] = {"motivo": motivo, "clave": clave, "timestamp": time.time()}
+    return True
+
+
+def vaciar_cache_local(nombre, motivo=None, clave=None):
+    """Vacía una caché en memoria (o solo `clave` dentro de ella) en este worker y avisa al resto."""
+    if not _vaciar_local(nombre, motivo, clave):
+        return False
+    if redis_client is not None:
+        try:
+            aviso = {"local": nombre, "motivo": motivo, "clave": clave, "origen": _proceso["id"]}
+            redis_client.publish(CANAL_INVALIDACION, json.dumps(aviso))
+        except redis.exceptions.ConnectionError:
+            pass
+    return True
+
+
+def precalentar_cache_local(nombre):
+    cache = _caches_locales.get(nombre)
+    if cache is None or cache["precalentar"] is None:
+        return False
+    cache["precalentar"]()
+    return True
+
+
+def _medir_claves(nombre):
+    """Entradas y bytes aproximados de una función en Redis (muestra acotada)."""
+    entradas = 0
+    total_bytes = 0
+    pipe = redis_client.pipeline(transaction=False)
+    for key in redis_client.scan_iter(match=f"{nombre}:*", count=500):
+        pipe.strlen(key)
+        entradas += 1
+        if entradas >= ADMIN_SCAN_LIMIT:
+            break
+    if entradas:
+        total_bytes = sum(pipe.execute())
+    return {"entradas": entradas, "bytes": total_bytes, "truncado": entradas >= ADMIN_SCAN_LIMIT}
+
+
+def _invalidaciones():
     try:
-        for key in redis_client.scan_iter(f"{prefix}:*"):
-            redis_client.delete(key)
+        crudo = redis_client.hgetall(INVALIDACIONES_KEY) or {}
     except redis.exceptions.ConnectionError:
-        pass
+        return {}
+    resultado = {}
+    for tag, registro in crudo.items():
+        tag = tag.decode() if isinstance(tag, bytes) else tag
+        try:
+            resultado[tag] = json.loads(registro)
+        except (TypeError, ValueError):
+            continue
+    return resultado
+
+
+def _ultima_invalidacion(nombre, definicion, invalidaciones):
+    """La más reciente entre el nombre de la función y sus etiquetas fijas."""
+    tags = [nombre] + (definicion["tags"] if isinstance(definicion["tags"], list) else [])
+    registros = [invalidaciones[t] for t in tags if t in invalidaciones]
+    return max(registros, key=lambda r: r.get("timestamp", 0)) if registros else None
+
+
+def resumen_cache(medir=True):
+    """
+    Estado de todas las cachés: por función (totales de todos los workers y
+    de este worker), por etiqueta y cachés en memoria registradas.
+    """
+    locales = {}
+    for nombre, cache in _caches_locales.items():
+        try:
+            stats = cache["estadisticas"]()
+        except Exception as e:
+            stats = {"error": str(e)}
+        locales[nombre] = {**stats, "ultima_invalidacion": cache.get("ultima_invalidacion"),
+                           "precalentable": cache["precalentar"] is not None}
+
+    worker = cache_stats()
+    resumen = {"redis": redis_client is not None, "funciones": {}, "namespaces": {},
+               "locales": locales, "l1": worker["l1"]}
+    if redis_client is None:
+        return resumen
+
+    _publicar_metricas()
+    invalidaciones = _invalidaciones()
+    try:
+        for nombre, definicion in sorted(_funciones.items()):
+            crudo = redis_client.hgetall(f"{STATS_PREFIX}{nombre}") or {}
+            total = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in crudo.items()}
+            hits = total.get("l1_hits", 0) + total.get("l2_hits", 0)
+            consultas = hits + total.get("misses", 0)
+            recalculos = total.get("recalculos", 0)
+            resumen["funciones"][nombre] = {
+                **definicion,
+                "hits": int(hits),
+                "l1_hits": int(total.get("l1_hits", 0)),
+                "l2_hits": int(total.get("l2_hits", 0)),
+                "misses": int(total.get("misses", 0)),
+                "stale": int(total.get("stale", 0)),
+                "hit_rate": round(hits / consultas, 3) if consultas else None,
+                "recalculo_promedio_ms": round(total.get("segundos_recalculo", 0) / recalculos * 1000, 1) if recalculos else None,
+                "ultima_invalidacion": _ultima_invalidacion(nombre, definicion, invalidaciones),
+                "worker": worker["funciones"].get(nombre),
+                **(_medir_claves(nombre) if medir else {}),
+            }
+
+        tags = set(invalidaciones)
+        for definicion in _funciones.values():
+            if isinstance(definicion["tags"], list):
+                tags.update(definicion["tags"])
+        tags = sorted(tags)
+        versiones = redis_client.mget([f"{VERSION_PREFIX}{t}" for t in tags]) if tags else []
+        for tag, version in zip(tags, versiones):
+            resumen["namespaces"][tag] = {
+                "version": int(version) if version else 0,
+                "funciones": sorted(n for n, d in _funciones.items()
+                                    if n == tag or (isinstance(d["tags"], list) and tag in d["tags"])),
+                "ultima_invalidacion": invalidaciones.get(tag),
+            }
+    except redis.exceptions.ConnectionError as e:
+        resumen["error"] = str(e)
+    return resumen
+
+
+def clear_cache(prefix: str):
+    """
+    Invalida todas las entradas de una etiqueta (p.ej. el nombre de la función).
+    Ej: clear_cache('get_proyectos')
+    Se mantiene por compatibilidad; equivale a invalidate(prefix).
+    """
+    invalidate(prefix)
@@ -0,0 +1,303 @@
+# backend/utils/cola_mensajes.py
+"""
+Cola de trabajo para procesar mensajes fuera del request que los recibió
+(p.ej. el webhook de WhatsApp, que debe responder 200 de inmediato).
+
+- Un pool acotado de hilos consume la cola. Cada mensaje va a un "carril"
+  según su clave de orden (el teléfono): un carril lo atiende un solo hilo,
+  así los mensajes de un mismo teléfono se procesan en orden.
+- Los ids repetidos (reintentos de Meta) se descartan.
+- Se registran profundidad de la cola y tiempos de espera y de proceso.
+
+Dos backends con la misma interfaz:
+  - BackendMemoria: colas y deduplicación en el proceso.
+  - BackendRedis: listas en Redis por carril, deduplicación con SET NX y un
+    lease por carril para que, entre workers de gunicorn, un carril lo
+    consuma un solo proceso a la vez. Mientras un mensaje se procesa, un
+    hilo de latido renueva el lease; renovar y soltar comparan el dueño en
+    Redis (script Lua), así nunca se toca el lease que tomó otro proceso.
+"""
+import json
+import queue
+import threading
+import time
+import zlib
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_TTL = 3600  # segundos que se recuerda un id ya recibido
+DEDUPE_MAX = 10000
+LEASE_SECONDS = 30
+LATIDO_SECONDS = LEASE_SECONDS / 3  # cada cuánto se renuevan los carriles en proceso
+POLL_SECONDS = 5
+
+# Renovar / soltar el lease solo si sigue siendo nuestro (atómico en Redis)
+_LUA_RENOVAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_LUA_SOLTAR = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class BackendMemoria:
+    """Colas por carril y deduplicación en memoria del proceso."""
+
+    def __init__(self, carriles, max_items):
+        self.colas = [queue.Queue(maxsize=max_items) for _ in range(carriles)]
+        self._vistos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def marcar_visto(self, id_mensaje):
+        """True si es la primera vez que se ve el id."""
+        ahora = time.time()
+        with self._lock:
+            while self._vistos:
+                primero, vence = next(iter(self._vistos.items()))
+                if vence > ahora and len(self._vistos) < DEDUPE_MAX:
+                    break
+                self._vistos.popitem(last=False)
+            if id_mensaje in self._vistos:
+                return False
+            self._vistos[id_mensaje] = ahora + DEDUPE_TTL
+            return True
+
+    def desmarcar_visto(self, id_mensaje):
+        with self._lock:
+            self._vistos.pop(id_mensaje, None)
+
+    def poner(self, carril, item):
+        try:
+            self.colas[carril].put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def tomar(self, carril, timeout):
+        try:
+            return self.colas[carril].get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def tomar_carril(self, carril):
+        return True  # en memoria cada carril ya tiene un único hilo
+
+    def renovar_carril(self, carril):
+        return True
+
+    def soltar_carril(self, carril):
+        pass
+
+    def profundidad(self):
+        return [c.qsize() for c in self.colas]
+
+
+class BackendRedis:
+    """Colas por carril en listas de Redis, compartidas por todos los workers."""
+
+    def __init__(self, redis_client, nombre, carriles, max_items):
+        self.r = redis_client
+        self.prefijo = f"cola:{nombre}"
+        self.carriles = carriles
+        self.max_items = max_items
+        self._token = f"{id(self)}:{time.time()}"
+        self._renovar = redis_client.register_script(_LUA_RENOVAR)
+        self._soltar = redis_client.register_script(_LUA_SOLTAR)
+
+    def _clave(self, carril):
+        return f"{self.prefijo}:{carril}"
+
+    def _clave_lease(self, carril):
+        return f"{self.prefijo}:lease:{carril}"
+
+    def marcar_visto(self, id_mensaje):
+        return bool(self.r.set(f"{self.prefijo}:visto:{id_mensaje}", 1, nx=True, ex=DEDUPE_TTL))
+
+    def desmarcar_visto(self, id_mensaje):
+        self.r.delete(f"{self.prefijo}:visto:{id_mensaje}")
+
+    def poner(self, carril, item):
+        if self.r.llen(self._clave(carril)) >= self.max_items:
+            return False
+        self.r.lpush(self._clave(carril), json.dumps(item))
+        return True
+
+    def tomar(self, carril, timeout):
+        res = self.r.brpop(self._clave(carril), timeout=max(1, int(timeout)))
+        if not res:
+            return None
+        return json.loads(res[1])
+
+    def tomar_carril(self, carril):
+        """Lease del carril: solo un proceso lo consume (se renueva en cada vuelta)."""
+        if self.r.set(self._clave_lease(carril), self._token, nx=True, ex=LEASE_SECONDS):
+            return True
+        return self.renovar_carril(carril)
+
+    def renovar_carril(self, carril):
+        """True si el lease sigue siendo nuestro (y queda renovado)."""
+        return bool(self._renovar(keys=[self._clave_lease(carril)], args=[self._token, LEASE_SECONDS]))
+
+    def soltar_carril(self, carril):
+        self._soltar(keys=[self._clave_lease(carril)], args=[self._token])
+
+    def profundidad(self):
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(self.carriles):
+            pipe.llen(self._clave(i))
+        return pipe.execute()
+
+
+class ColaMensajes:
+    """
+    procesar(item) se ejecuta en los hilos del pool. clave_orden(item) define
+    el carril y clave_dedupe(item) el id para descartar repetidos.
+    """
+
+    def __init__(self, nombre, procesar, clave_orden, clave_dedupe=None,
+                 workers=4, max_items=1000, backend=None):
+        self.nombre = nombre
+        self.procesar = procesar
+        self.clave_orden = clave_orden
+        self.clave_dedupe = clave_dedupe
+        self.workers = workers
+        self.backend = backend or BackendMemoria(workers, max_items)
+        self._hilos = []
+        self._procesando = set()  # carriles con un mensaje en proceso (los renueva el latido)
+        self._lock = threading.Lock()
+        self.metricas = {
+            "encolados": 0, "procesados": 0, "errores": 0, "duplicados": 0, "descartados": 0,
+            "segundos_proceso": 0.0, "segundos_espera": 0.0, "max_segundos_proceso": 0.0,
+            "ultimo_proceso": None,
+        }
+
+    def _carril(self, item):
+        clave = str(self.clave_orden(item) or "")
+        return zlib.crc32(clave.encode("utf-8")) % self.workers
+
+    def _iniciar(self):
+        if self._hilos:
+            return
+        with self._lock:
+            if self._hilos:
+                return
+            for i in range(self.workers):
+                hilo = threading.Thread(target=self._consumir, args=(i,),
+                                        name=f"{self.nombre}-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+            latido = threading.Thread(target=self._latir, name=f"{self.nombre}-latido", daemon=True)
+            latido.start()
+
+    def encolar(self, item):
+        """
+        Agrega un item. Devuelve 'encolado', 'duplicado' o 'descartado'
+        (cola llena). Un mensaje descartado no queda como visto, para que el
+        reintento de Meta sí se encole.
+        """
+        self._iniciar()
+        id_item = None
+        if self.clave_dedupe:
+            id_item = self.clave_dedupe(item)
+            if id_item and not self.backend.marcar_visto(id_item):
+                self._sumar("duplicados")
+                return "duplicado"
+
+        item = {**item, "_encolado_ts": time.time()}
+        try:
+            encolado = self.backend.poner(self._carril(item), item)
+        except Exception:
+            if id_item:
+                self.backend.desmarcar_visto(id_item)
+            raise
+        if not encolado:
+            if id_item:
+                self.backend.desmarcar_visto(id_item)
+            self._sumar("descartados")
+            logger.error(f"❌ Cola {self.nombre} llena: mensaje descartado")
+            return "descartado"
+        self._sumar("encolados")
+        return "encolado"
+
+    def _sumar(self, campo, valor=1):
+        with self._lock:
+            self.metricas[campo] += valor
+
+    def _consumir(self, carril):
+        while True:
+            try:
+                if not self.backend.tomar_carril(carril):
+                    time.sleep(POLL_SECONDS)
+                    continue
+                item = self.backend.tomar(carril, POLL_SECONDS)
+                if item is None:
+                    continue
+                inicio = time.time()
+                espera = inicio - item.pop("_encolado_ts", inicio)
+                with self._lock:
+                    self._procesando.add(carril)
+                try:
+                    self.procesar(item)
+                    self._sumar("procesados")
+                except Exception as e:
+                    logger.exception(f"Error procesando item de la cola {self.nombre}: {e}")
+                    self._sumar("errores")
+                finally:
+                    with self._lock:
+                        self._procesando.discard(carril)
+                duracion = time.time() - inicio
+                with self._lock:
+                    self.metricas["segundos_proceso"] += duracion
+                    self.metricas["segundos_espera"] += espera
+                    self.metricas["max_segundos_proceso"] = max(self.metricas["max_segundos_proceso"], duracion)
+                    self.metricas["ultimo_proceso"] = int(time.time())
+            except Exception as e:
+                # Errores del backend (p.ej. Redis caído): esperar y reintentar
+                logger.error(f"Cola {self.nombre}, carril {carril}: {e}")
+                time.sleep(POLL_SECONDS)
+
+    def _latir(self):
+        """Renueva el lease de los carriles ocupados: procesar() puede durar más que el lease."""
+        while True:
+            time.sleep(LATIDO_SECONDS)
+            with self._lock:
+                carriles = list(self._procesando)
+            for carril in carriles:
+                try:
+                    if not self.backend.renovar_carril(carril):
+                        logger.warning(f"Cola {self.nombre}, carril {carril}: lease perdido durante el proceso")
+                except Exception as e:
+                    logger.error(f"Cola {self.nombre}, carril {carril}: no se pudo renovar el lease: {e}")
+
+    def estadisticas(self):
+        with self._lock:
+            m = dict(self.metricas)
+        atendidos = m["procesados"] + m["errores"]
+        try:
+            profundidad = self.backend.profundidad()
+        except Exception:
+            profundidad = None
+        return {
+            "backend": type(self.backend).__name__,
+            "workers": self.workers,
+            "hilos_activos": sum(1 for h in self._hilos if h.is_alive()),
+            "profundidad": sum(profundidad) if profundidad is not None else None,
+            "profundidad_por_carril": profundidad,
+            "encolados": m["encolados"],
+            "procesados": m["procesados"],
+            "errores": m["errores"],
+            "duplicados": m["duplicados"],
+            "descartados": m["descartados"],
+            "proceso_promedio_ms": round(m["segundos_proceso"] / atendidos * 1000, 1) if atendidos else None,
+            "proceso_max_ms": round(m["max_segundos_proceso"] * 1000, 1),
+            "espera_promedio_ms": round(m["segundos_espera"] / atendidos * 1000, 1) if atendidos else None,
+            "ultimo_proceso": m["ultimo_proceso"],
+        }
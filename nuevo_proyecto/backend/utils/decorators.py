@@ -1,11 +1,110 @@
 import os
 import jwt
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from functools import wraps
 from flask import request, jsonify, current_app
+from backend.utils.cache import registrar_cache_local
+from backend.utils.permisos import usuario_id_de_token, tiene_modulo
+
+# ================================================================
+# CACHÉ DE TOKENS VERIFICADOS
+# ================================================================
+# Una página del frontend dispara 5-10 llamadas en paralelo con el mismo
+# token; se guarda el payload ya verificado (clave = sha256 del token) para no
+# repetir las verificaciones HMAC. Una entrada nunca vive más allá del `exp`
+# del token.
+
+TOKEN_CACHE_MAX = 2048
+TOKEN_CACHE_TTL = 300  # segundos
+
+_token_cache = OrderedDict()  # hash -> (payload, origen, vence)
+_token_stats = {"hits": 0, "misses": 0, "sso": 0, "local": 0, "invalidos": 0}
+_token_lock = threading.Lock()
+
+
+def _token_hash(auth_token):
+    return hashlib.sha256(auth_token.encode("utf-8")).hexdigest()
+
+
+def _token_desde_cache(clave):
+    with _token_lock:
+        item = _token_cache.get(clave)
+        if item is None:
+            return None
+        payload, origen, vence = item
+        if vence <= time.time():
+            del _token_cache[clave]
+            return None
+        _token_cache.move_to_end(clave)
+        _token_stats["hits"] += 1
+        _token_stats[origen] += 1
+        return payload, origen
+
+
+def _token_a_cache(clave, payload, origen):
+    vence = time.time() + TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        vence = min(vence, exp)
+    with _token_lock:
+        _token_stats["misses"] += 1
+        _token_stats[origen] += 1
+        _token_cache[clave] = (payload, origen, vence)
+        _token_cache.move_to_end(clave)
+        while len(_token_cache) > TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+
+
+def token_cache_stats():
+    with _token_lock:
+        consultas = _token_stats["hits"] + _token_stats["misses"]
+        return {
+            **_token_stats,
+            "entradas": len(_token_cache),
+            "max": TOKEN_CACHE_MAX,
+            "ttl": TOKEN_CACHE_TTL,
+            "hit_rate": round(_token_stats["hits"] / consultas, 3) if consultas else None,
+        }
+
+
+def vaciar_token_cache():
+    with _token_lock:
+        _token_cache.clear()
+
+
+registrar_cache_local("tokens", token_cache_stats, vaciar_token_cache)
+
 
 def decode_auth_token(auth_token):
     """
     Decodifica el token aceptando tanto SSO (Llave Nueva) como Local (Llave Vieja).
+    Los tokens ya verificados se sirven desde la caché mientras no expiren.
+    El payload devuelto lleva 'token_origen' ("sso" o "local"): el 'user_id'
+    de un token SSO es el del portal, no el de la tabla usuarios.
+    """
+    clave = _token_hash(auth_token)
+    item = _token_desde_cache(clave)
+    if item is not None:
+        payload, origen = item
+        return {**payload, "token_origen": origen}
+
+    payload, origen = _verificar_token(auth_token)
+    if payload is None:
+        with _token_lock:
+            _token_stats["invalidos"] += 1
+        return "Token inválido o expirado"
+
+    _token_a_cache(clave, payload, origen)
+    return {**payload, "token_origen": origen}
+
+
+def _verificar_token(auth_token):
+    """
+    Verificación completa de la firma. Devuelve (payload, "sso" | "local")
+    o (None, None) si ninguna llave lo valida.
     """
     # 1. Obtenemos ambas llaves del entorno
     sso_secret = os.getenv('JWT_SECRET_KEY') # La llave del Portal
@@ -19,7 +118,7 @@ def decode_auth_token(auth_token):
             # verify_signature=True es el default
             # Intentamos abrirlo como si fuera del Portal
             payload = jwt.decode(auth_token, sso_secret, algorithms=["HS256"])
-            return payload # ¡Éxito!
+            return payload, "sso" # ¡Éxito!
         except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
             pass # Falló SSO, intentamos local
 
@@ -27,11 +126,11 @@ def decode_auth_token(auth_token):
     if local_secret:
         try:
             payload = jwt.decode(auth_token, local_secret, algorithms=["HS256"])
-            return payload
+            return payload, "local"
         except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
             pass
 
-    return "Token inválido o expirado"
+    return None, None
 
 def token_required(f):
     @wraps(f)
@@ -62,4 +161,36 @@ def token_required(f):
         
         return f(current_user, *args, **kwargs)
 
-    return decorated
\ No newline at end of file
+    return decorated
+
+def modulo_required(*modulos):
+    """
+    Restringe un endpoint a usuarios con alguno de los módulos indicados.
+    Va debajo de @token_required (recibe current_user como primer argumento):
+
+        @bp.route("/...")
+        @token_required
+        @modulo_required("Pagos")
+        def endpoint(current_user): ...
+
+    Los permisos salen de la caché de backend.utils.permisos: una consulta
+    por usuario cada PERMISOS_TTL, o cuando cambian sus permisos.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            supabase = current_app.config['SUPABASE']
+            try:
+                usuario_id = usuario_id_de_token(supabase, current_user)
+                permitido = usuario_id is not None and tiene_modulo(supabase, usuario_id, *modulos)
+            except Exception as e:
+                current_app.logger.error(f"Error verificando permisos: {e}")
+                return jsonify({'message': 'No se pudieron verificar los permisos'}), 503
+
+            if not permitido:
+                current_app.logger.warning(f"🚫 Acceso denegado a {f.__name__}: usuario {usuario_id} sin módulo {modulos}")
+                return jsonify({'message': 'No tiene acceso a este módulo'}), 403
+
+            return f(current_user, *args, **kwargs)
+        return decorated
+    return decorator
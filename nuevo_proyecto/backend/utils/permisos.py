@@ -0,0 +1,158 @@
+# backend/utils/permisos.py
+"""
+Caché de permisos por usuario: nombres de los módulos asignados en
+usuario_modulo.
+
+- modulos_por_usuario() carga en una sola consulta (in_) los usuarios que
+  falten en la caché, así la pantalla de administración hace un número fijo
+  de consultas sin importar cuántos usuarios tenga.
+- Los endpoints que cambian permisos llaman a invalidar_permisos(), que avisa
+  a todos los workers. PERMISOS_TTL es la red de seguridad.
+- Junto a los nombres se guarda un frozenset normalizado (casefold) para que
+  tiene_modulo() sea una pertenencia; ver modulo_required en decorators.py.
+"""
+import threading
+import time
+import logging
+from backend.utils.cache import registrar_cache_local, vaciar_cache_local
+
+logger = logging.getLogger(__name__)
+
+PERMISOS_TTL = 300  # segundos
+LOTE_IDS = 200      # ids por consulta in_ (largo de la URL)
+PAGE_SIZE = 1000
+
+_permisos = {}  # usuario_id -> (frozenset de nombres, frozenset normalizado, vence)
+_ids_por_email = {}  # email -> (usuario_id, vence), para tokens SSO sin id local
+_permisos_lock = threading.Lock()
+
+
+def _normalizar_modulo(nombre):
+    return str(nombre).strip().casefold()
+
+
+def _consultar(supabase, ids):
+    """usuario_id -> set de nombres de módulo, para los ids dados."""
+    resultado = {uid: set() for uid in ids}
+    for i in range(0, len(ids), LOTE_IDS):
+        lote = ids[i:i + LOTE_IDS]
+        offset = 0
+        while True:
+            filas = (
+                supabase.table('usuario_modulo')
+                .select('usuario_id, modulos(nombre_modulo)')
+                .in_('usuario_id', lote)
+                .order('id')
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute().data or []
+            )
+            for f in filas:
+                if f.get('modulos'):
+                    resultado.setdefault(f['usuario_id'], set()).add(f['modulos']['nombre_modulo'])
+            if len(filas) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+    return resultado
+
+
+def modulos_por_usuario(supabase, ids):
+    """
+    Dict usuario_id -> frozenset de módulos. Los usuarios que no estén en la
+    caché (o vencidos) se cargan juntos en una consulta.
+    """
+    ahora = time.time()
+    resultado = {}
+    faltantes = []
+    with _permisos_lock:
+        for uid in dict.fromkeys(ids):
+            item = _permisos.get(uid)
+            if item and item[2] > ahora:
+                resultado[uid] = item[0]
+            else:
+                faltantes.append(uid)
+
+    if faltantes:
+        cargados = _consultar(supabase, faltantes)
+        vence = time.time() + PERMISOS_TTL
+        with _permisos_lock:
+            for uid, nombres in cargados.items():
+                resultado[uid] = frozenset(nombres)
+                _permisos[uid] = (resultado[uid], frozenset(_normalizar_modulo(n) for n in nombres), vence)
+    return resultado
+
+
+def modulos_de_usuario(supabase, usuario_id):
+    """frozenset con los módulos de un usuario."""
+    return modulos_por_usuario(supabase, [usuario_id]).get(usuario_id, frozenset())
+
+
+def tiene_modulo(supabase, usuario_id, *modulos):
+    """True si el usuario tiene al menos uno de los módulos indicados (sin distinguir mayúsculas)."""
+    item = _permisos.get(usuario_id)
+    if item is None or item[2] <= time.time():
+        modulos_de_usuario(supabase, usuario_id)
+        item = _permisos.get(usuario_id)
+    normalizados = item[1] if item else frozenset()
+    return any(_normalizar_modulo(m) in normalizados for m in modulos)
+
+
+def usuario_id_de_token(supabase, current_user):
+    """
+    Id local del usuario del token: 'user_id' o 'id' en tokens locales. Los
+    tokens SSO traen el id del portal, así que se resuelven solo por email
+    (búsqueda cacheada).
+    """
+    if not isinstance(current_user, dict):
+        return None
+    if current_user.get('token_origen') != 'sso':
+        uid = current_user.get('user_id') or current_user.get('id')
+        if uid is not None:
+            return int(uid) if str(uid).isdigit() else uid
+
+    email = (current_user.get('email') or current_user.get('correo') or '').strip().lower()
+    if not email:
+        return None
+    ahora = time.time()
+    with _permisos_lock:
+        item = _ids_por_email.get(email)
+        if item and item[1] > ahora:
+            return item[0]
+    filas = supabase.table('usuarios').select('id').eq('email', email).limit(1).execute().data or []
+    uid = filas[0]['id'] if filas else None
+    with _permisos_lock:
+        _ids_por_email[email] = (uid, ahora + PERMISOS_TTL)
+    return uid
+
+
+def _descartar(usuario_id=None):
+    with _permisos_lock:
+        if usuario_id is None:
+            _permisos.clear()
+            _ids_por_email.clear()
+        elif isinstance(usuario_id, str) and usuario_id.startswith("email:"):
+            _ids_por_email.pop(usuario_id[len("email:"):], None)
+        else:
+            _permisos.pop(usuario_id, None)
+            for email, item in list(_ids_por_email.items()):
+                if item[0] == usuario_id:
+                    del _ids_por_email[email]
+
+
+def invalidar_permisos(usuario_id=None, motivo=None):
+    """Descarta los permisos de un usuario (o de todos) en todos los workers."""
+    vaciar_cache_local("permisos", motivo or "cambio de permisos", clave=usuario_id)
+
+
+def olvidar_email(email, motivo=None):
+    """Descarta el id cacheado (o la ausencia) de un email en todos los workers."""
+    email = (email or '').strip().lower()
+    if email:
+        vaciar_cache_local("permisos", motivo or "usuario creado", clave=f"email:{email}")
+
+
+def _estadisticas():
+    with _permisos_lock:
+        return {"ttl": PERMISOS_TTL, "entradas": len(_permisos), "emails": len(_ids_por_email)}
+
+
+registrar_cache_local("permisos", _estadisticas, _descartar)
@@ -0,0 +1,268 @@
+# backend/utils/recepciones.py
+"""
+Libro de recepciones: cantidades recibidas por línea de OC, en memoria.
+
+Mantiene, para cada (orden_compra, art_corr), la suma de `recepcion` de la
+tabla `ingresos`, y un estado memorizado por OC (Pendiente/Parcial/Recibida).
+
+- Se construye completo la primera vez que se usa (o con reconstruir()).
+- save_ingreso aplica sus filas con registrar_ingresos() y el borrado de una
+  OC llama a olvidar_oc().
+- Como cada worker de gunicorn tiene su propio libro, antes de leer se traen
+  los ingresos con id mayor al último visto (marca de agua), de modo que las
+  recepciones registradas en otro worker también aparecen. Esa consulta se
+  hace como máximo una vez cada SYNC_INTERVAL segundos.
+- Los ids de ingresos pueden hacerse visibles fuera de orden (inserciones
+  concurrentes), así que cada sincronización vuelve a leer VENTANA_IDS ids
+  bajo la marca de agua y descarta por id los ya aplicados. Además el libro
+  se reconstruye completo cada RECONSTRUIR_CADA segundos.
+"""
+import threading
+import time
+import logging
+from flask import current_app
+from backend.utils.cache import registrar_cache_local
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+SYNC_INTERVAL = 5  # segundos entre consultas de ingresos nuevos
+VENTANA_IDS = 100  # ids bajo la marca de agua que se vuelven a leer en cada sync
+RECONSTRUIR_CADA = 3600  # segundos entre reconstrucciones completas
+
+_ledger = {
+    "por_oc": {},       # oc -> {art_corr: cantidad recibida}
+    "estados": {},      # oc -> (firma de líneas, estado)
+    "max_id": 0,        # marca de agua: mayor ingresos.id leído de la tabla
+    "aplicados": set(),  # ids > max_id - VENTANA_IDS ya aplicados (leídos o registrados)
+    "filas": 0,         # registros de ingresos incorporados
+    "version": 0,       # se incrementa con cada cambio del libro
+    "construido": False,
+    "timestamp": 0,     # momento de la última construcción completa
+    "ultima_sync": 0,
+}
+_claves_cache = {"version": -1, "claves": frozenset()}
+_lock = threading.RLock()
+
+
+def normalizar_oc(value):
+    """Número de OC como string, para comparar entre tablas."""
+    return str(value).strip() if value is not None else ""
+
+
+def normalizar_art_corr(value):
+    """art_corr normalizado (mismo criterio que ordenes_no_recepcionadas)."""
+    if value is None:
+        return ""
+    return str(value).strip().upper()
+
+
+def _aplicar_filas(filas):
+    """Suma filas de ingresos al libro. Debe llamarse con el lock tomado."""
+    por_oc = _ledger["por_oc"]
+    estados = _ledger["estados"]
+    for ing in filas:
+        oc = normalizar_oc(ing.get("orden_compra"))
+        if not oc:
+            continue
+        art = normalizar_art_corr(ing.get("art_corr"))
+        lineas = por_oc.setdefault(oc, {})
+        lineas[art] = lineas.get(art, 0) + int(ing.get("recepcion") or 0)
+        estados.pop(oc, None)
+        _ledger["filas"] += 1
+    if filas:
+        _ledger["version"] += 1
+
+
+def _piso():
+    """Ids hasta aquí se consideran definitivos (fuera de la ventana)."""
+    return _ledger["max_id"] - VENTANA_IDS
+
+
+def _avanzar(filas):
+    """
+    Aplica filas leídas de la tabla (ordenadas por id) y mueve la marca de agua.
+    Omite las ya aplicadas. Debe llamarse con el lock tomado.
+    """
+    aplicados = _ledger["aplicados"]
+    nuevas = [f for f in filas if f["id"] > _piso() and f["id"] not in aplicados]
+    _aplicar_filas(nuevas)
+    aplicados.update(f["id"] for f in nuevas)
+    if filas:
+        _ledger["max_id"] = max(_ledger["max_id"], filas[-1]["id"])
+        piso = _piso()
+        _ledger["aplicados"] = {i for i in aplicados if i > piso}
+
+
+def _traer_desde(supabase, desde_id):
+    """Lee los ingresos con id > desde_id, paginando por id."""
+    filas = []
+    ultimo = desde_id
+    while True:
+        batch = (
+            supabase.table("ingresos")
+            .select("id, orden_compra, art_corr, recepcion")
+            .gt("id", ultimo)
+            .order("id")
+            .limit(PAGE_SIZE)
+            .execute().data or []
+        )
+        filas.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            break
+        ultimo = batch[-1]["id"]
+    return filas
+
+
+def reconstruir(supabase=None):
+    """Descarta el libro y lo vuelve a construir desde la tabla ingresos."""
+    supabase = supabase or current_app.config['SUPABASE']
+    inicio = time.time()
+    filas = _traer_desde(supabase, 0)
+    with _lock:
+        _ledger["por_oc"] = {}
+        _ledger["estados"] = {}
+        _ledger["max_id"] = 0
+        _ledger["aplicados"] = set()
+        _ledger["filas"] = 0
+        _avanzar(filas)
+        _ledger["version"] += 1
+        _ledger["construido"] = True
+        _ledger["timestamp"] = _ledger["ultima_sync"] = time.time()
+    logger.info(f"📒 Libro de recepciones construido: {len(filas)} ingresos en {time.time() - inicio:.2f}s")
+
+
+def sincronizar(supabase=None, forzar=False):
+    """
+    Incorpora los ingresos nuevos (desde VENTANA_IDS bajo la marca de agua).
+    Sin forzar=True no consulta más de una vez cada SYNC_INTERVAL segundos.
+    """
+    if not _ledger["construido"] or time.time() - _ledger["timestamp"] > RECONSTRUIR_CADA:
+        with _lock:
+            if not _ledger["construido"] or time.time() - _ledger["timestamp"] > RECONSTRUIR_CADA:
+                reconstruir(supabase)
+                return
+    if not forzar and time.time() - _ledger["ultima_sync"] < SYNC_INTERVAL:
+        return
+    _ledger["ultima_sync"] = time.time()
+    supabase = supabase or current_app.config['SUPABASE']
+    filas = _traer_desde(supabase, max(0, _piso()))
+    if filas:
+        with _lock:
+            _avanzar(filas)
+
+
+def registrar_ingresos(filas):
+    """
+    Aplica filas recién insertadas en ingresos (con su id) sin esperar a la
+    próxima sincronización. La marca de agua no se mueve: puede haber ids
+    intermedios insertados por otro worker que aún no hemos leído.
+    """
+    if not _ledger["construido"]:
+        return  # se incorporarán al construir
+    with _lock:
+        nuevas = [f for f in filas if f.get("id") is not None and f["id"] > _piso()
+                  and f["id"] not in _ledger["aplicados"]]
+        _aplicar_filas(nuevas)
+        _ledger["aplicados"].update(f["id"] for f in nuevas)
+
+
+def olvidar_oc(oc):
+    """Elimina del libro una OC borrada."""
+    oc = normalizar_oc(oc)
+    with _lock:
+        if _ledger["por_oc"].pop(oc, None) is not None:
+            _ledger["version"] += 1
+        _ledger["estados"].pop(oc, None)
+
+
+def recibido_por_linea(oc):
+    """Dict art_corr normalizado -> cantidad recibida para una OC."""
+    return dict(_ledger["por_oc"].get(normalizar_oc(oc), {}))
+
+
+def cantidad_recibida(oc, art_corr):
+    return _ledger["por_oc"].get(normalizar_oc(oc), {}).get(normalizar_art_corr(art_corr), 0)
+
+
+def tiene_ingreso(oc, art_corr):
+    """True si la línea tiene al menos un registro en ingresos."""
+    return normalizar_art_corr(art_corr) in _ledger["por_oc"].get(normalizar_oc(oc), {})
+
+
+def oc_tiene_ingresos(oc):
+    """True si la OC tiene al menos un registro en ingresos."""
+    return normalizar_oc(oc) in _ledger["por_oc"]
+
+
+def claves_ingresos():
+    """
+    Set compartido de claves (orden_compra, art_corr) normalizadas con al menos
+    un ingreso. Se reconstruye solo cuando el libro cambió.
+    """
+    if _claves_cache["version"] != _ledger["version"]:
+        with _lock:
+            version = _ledger["version"]
+            claves = frozenset(
+                (oc, art) for oc, lineas in _ledger["por_oc"].items() for art in lineas
+            )
+            _claves_cache["claves"] = claves
+            _claves_cache["version"] = version
+    return _claves_cache["claves"]
+
+
+def ocs_con_ingresos():
+    """Números de OC (string) con al menos un ingreso."""
+    return set(_ledger["por_oc"].keys())
+
+
+def calcular_estado(oc, lineas):
+    """
+    Estado de una OC a partir de sus líneas (dicts con art_corr y cantidad):
+    'Pendiente' si no hay nada recibido, 'Recibida' si lo recibido cubre lo
+    solicitado y 'Parcial' en otro caso. Se memoriza por OC hasta que llegue
+    un ingreso nuevo para ella.
+    """
+    oc = normalizar_oc(oc)
+    total_sol = sum(ln.get("cantidad") or 0 for ln in lineas)
+    firma = (len(lineas), total_sol)
+
+    memo = _ledger["estados"].get(oc)
+    if memo and memo[0] == firma:
+        return memo[1]
+
+    recibidas = _ledger["por_oc"].get(oc, {})
+    total_rec = sum(recibidas.get(normalizar_art_corr(ln.get("art_corr")), 0) for ln in lineas)
+
+    if total_rec == 0:
+        estado = "Pendiente"
+    elif total_rec >= total_sol:
+        estado = "Recibida"
+    else:
+        estado = "Parcial"
+
+    _ledger["estados"][oc] = (firma, estado)
+    return estado
+
+
+def estadisticas():
+    """Resumen del libro para diagnóstico."""
+    return {
+        "construido": _ledger["construido"],
+        "filas": _ledger["filas"],
+        "ocs": len(_ledger["por_oc"]),
+        "lineas": sum(len(v) for v in _ledger["por_oc"].values()),
+        "estados_memorizados": len(_ledger["estados"]),
+        "max_id": _ledger["max_id"],
+        "edad_segundos": int(time.time() - _ledger["timestamp"]) if _ledger["timestamp"] else None,
+    }
+
+
+def _descartar():
+    """Marca el libro para reconstruirlo en el próximo uso."""
+    with _lock:
+        _ledger["construido"] = False
+
+
+registrar_cache_local("recepciones", estadisticas, _descartar,
+                      lambda: sincronizar(forzar=True))
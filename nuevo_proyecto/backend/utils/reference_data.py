@@ -0,0 +1,223 @@
+# backend/utils/reference_data.py
+"""
+Caché en memoria de datos de referencia (catálogos pequeños que cambian poco).
+
+Cada catálogo se carga completo una sola vez por proceso y expone dos mapas:
+  - id -> fila
+  - nombre normalizado -> fila
+
+Los endpoints de creación/edición llaman a invalidar_catalogo(), que descarta
+el catálogo en este worker y avisa al resto por el canal de invalidaciones de
+backend.utils.cache; cada recarga incrementa la versión del catálogo
+(get_version) para que los índices derivados sepan que deben rehacerse.
+El TTL es solo una red de seguridad por si se pierde un aviso.
+"""
+import threading
+import time
+import logging
+from flask import current_app
+from backend.utils.cache import registrar_cache_local, vaciar_cache_local
+
+logger = logging.getLogger(__name__)
+
+REF_TTL = 300  # 5 minutos
+PAGE_SIZE = 1000
+
+# nombre -> definición del catálogo
+CATALOGOS = {
+    "materiales": {"tabla": "materiales", "campos": "id, cod, material, tipo, item", "nombre": "material"},
+    "items": {"tabla": "item", "campos": "*", "nombre": "tipo"},
+    "proveedores": {"tabla": "proveedores", "campos": "id, nombre, rut, cuenta, banco, paguese_a, correo", "nombre": "nombre"},
+    "proyectos": {"tabla": "proyectos", "campos": "id, proyecto, activo", "nombre": "proyecto"},
+    "trabajadores": {"tabla": "trabajadores", "campos": "*", "nombre": "nombre"},
+}
+
+# nombre -> {"rows", "by_id", "by_nombre", "timestamp", "version"}
+_ref_cache = {}
+_ref_versiones = {}  # nombre -> contador de recargas
+_ref_lock = threading.Lock()
+
+
+def normalize_text(text):
+    """Normaliza texto para comparación: lowercase, sin espacios múltiples."""
+    if not text:
+        return ''
+    return ' '.join(str(text).replace('\n', ' ').split()).lower()
+
+
+def _cargar_catalogo(supabase, nombre):
+    """Lee el catálogo completo desde Supabase con paginación."""
+    definicion = CATALOGOS[nombre]
+    rows = []
+    offset = 0
+    while True:
+        batch = (
+            supabase.table(definicion["tabla"])
+            .select(definicion["campos"])
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute().data or []
+        )
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+    campo_nombre = definicion["nombre"]
+    by_nombre = {}
+    for r in rows:
+        clave = normalize_text(r.get(campo_nombre))
+        # Ante nombres duplicados se conserva el primero (menor id)
+        if clave and clave not in by_nombre:
+            by_nombre[clave] = r
+
+    return {
+        "rows": rows,
+        "by_id": {r["id"]: r for r in rows if r.get("id") is not None},
+        "by_nombre": by_nombre,
+        "timestamp": time.time(),
+    }
+
+
+def get_catalogo(nombre, forzar=False):
+    """
+    Devuelve la entrada cacheada del catálogo, recargándola si venció o si forzar=True.
+    """
+    if nombre not in CATALOGOS:
+        raise KeyError(f"Catálogo desconocido: {nombre}")
+
+    entry = _ref_cache.get(nombre)
+    if not forzar and entry and time.time() - entry["timestamp"] < REF_TTL:
+        return entry
+
+    with _ref_lock:
+        # Otro hilo pudo haberlo recargado mientras esperábamos
+        entry = _ref_cache.get(nombre)
+        if not forzar and entry and time.time() - entry["timestamp"] < REF_TTL:
+            return entry
+
+        supabase = current_app.config['SUPABASE']
+        try:
+            entry = _cargar_catalogo(supabase, nombre)
+        except Exception as e:
+            logger.error(f"Error cargando catálogo {nombre}: {e}")
+            # Mejor servir datos viejos que fallar
+            if nombre in _ref_cache:
+                return _ref_cache[nombre]
+            raise
+        _ref_versiones[nombre] = _ref_versiones.get(nombre, 0) + 1
+        entry["version"] = _ref_versiones[nombre]
+        _ref_cache[nombre] = entry
+        logger.info(f"📚 Catálogo '{nombre}' cargado ({len(entry['rows'])} filas)")
+        return entry
+
+
+def get_version(nombre):
+    """Versión del catálogo vigente (cambia con cada recarga)."""
+    return get_catalogo(nombre)["version"]
+
+
+def get_mapa(nombre, campo=None):
+    """
+    Mapa id -> fila (o id -> valor de `campo`). Las claves son los ids tal
+    como vienen de la BD; ver get_por_id para ids en texto.
+    """
+    by_id = get_catalogo(nombre)["by_id"]
+    if campo is None:
+        return by_id
+    return {k: r.get(campo) for k, r in by_id.items()}
+
+
+def get_rows(nombre):
+    """Lista completa de filas del catálogo."""
+    return get_catalogo(nombre)["rows"]
+
+
+def get_por_id(nombre, id_valor, recargar_si_falta=False):
+    """
+    Busca una fila por id; None si no existe.
+    Con recargar_si_falta=True, un fallo fuerza una recarga antes de responder.
+    """
+    if id_valor is None or id_valor == "":
+        return None
+    if isinstance(id_valor, str) and id_valor.isdigit():
+        id_valor = int(id_valor)
+    row = get_catalogo(nombre)["by_id"].get(id_valor)
+    if row is None and recargar_si_falta:
+        row = get_catalogo(nombre, forzar=True)["by_id"].get(id_valor)
+    return row
+
+
+def get_por_nombre(nombre, texto, recargar_si_falta=False):
+    """
+    Busca una fila por nombre normalizado.
+    Con recargar_si_falta=True, un fallo fuerza una recarga (p.ej. un material
+    recién creado en otro worker) antes de responder None.
+    """
+    clave = normalize_text(texto)
+    if not clave:
+        return None
+    row = get_catalogo(nombre)["by_nombre"].get(clave)
+    if row is None and recargar_si_falta:
+        row = get_catalogo(nombre, forzar=True)["by_nombre"].get(clave)
+    return row
+
+
+def buscar_ids_por_nombre(nombre, texto):
+    """
+    Ids cuyo nombre normalizado contiene el texto, agrupados por relevancia:
+    0 = nombre exacto, 1 = empieza con el texto, 2 = lo contiene.
+    """
+    clave = normalize_text(texto)
+    niveles = {0: [], 1: [], 2: []}
+    if not clave:
+        return niveles
+    campo_nombre = CATALOGOS[nombre]["nombre"]
+    for row in get_rows(nombre):
+        nombre_norm = normalize_text(row.get(campo_nombre))
+        if not nombre_norm:
+            continue
+        if nombre_norm == clave:
+            niveles[0].append(row["id"])
+        elif nombre_norm.startswith(clave):
+            niveles[1].append(row["id"])
+        elif clave in nombre_norm:
+            niveles[2].append(row["id"])
+    return niveles
+
+
+def _descartar(nombre=None):
+    with _ref_lock:
+        if nombre is None:
+            _ref_cache.clear()
+        else:
+            _ref_cache.pop(nombre, None)
+
+
+def invalidar_catalogo(nombre=None, motivo=None):
+    """
+    Descarta un catálogo (o todos) para que se recargue en el próximo acceso,
+    en este worker y en los demás.
+    """
+    vaciar_cache_local("catalogos", motivo or "escritura", clave=nombre)
+
+
+def _estadisticas():
+    ahora = time.time()
+    return {
+        "ttl": REF_TTL,
+        "entradas": len(_ref_cache),
+        "catalogos": {
+            nombre: {"filas": len(entry["rows"]), "version": entry["version"],
+                     "edad_segundos": int(ahora - entry["timestamp"])}
+            for nombre, entry in list(_ref_cache.items())
+        },
+    }
+
+
+def _precalentar():
+    for nombre in CATALOGOS:
+        get_catalogo(nombre, forzar=True)
+
+
+registrar_cache_local("catalogos", _estadisticas, _descartar, _precalentar)
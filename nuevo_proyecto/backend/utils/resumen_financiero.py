@@ -0,0 +1,247 @@
+# backend/utils/resumen_financiero.py
+"""
+Resúmenes financieros precalculados por proyecto y por proveedor.
+
+Se arman recorriendo presupuesto, orden_de_pago, gastos_directos y abonos_op
+completos (paginados por id, sin el tope de filas de PostgREST) y se guardan
+en memoria, así el chatbot responde con una búsqueda por id:
+
+  por proyecto:  presupuesto, total de OP (con IVA), N° de OP, gastos directos
+  por proveedor: deuda (OP con IVA), pagado (abonos), saldo, N° de OP
+
+El resumen se reconstruye al vencer (RESUMEN_TTL) o cuando un endpoint que
+escribe en esas tablas llama a invalidar_resumenes(), que avisa a todos los
+workers. Salvo la primera vez, la reconstrucción corre en un hilo aparte y
+mientras tanto se sigue sirviendo el resumen anterior: las consultas del
+chatbot nunca esperan el recorrido de las tablas.
+"""
+import threading
+import time
+import logging
+from flask import current_app
+from backend.utils.cache import registrar_cache_local, vaciar_cache_local
+
+logger = logging.getLogger(__name__)
+
+RESUMEN_TTL = 300  # 5 minutos
+REINTENTO_SEGUNDOS = 30  # espera tras una reconstrucción fallida
+PAGE_SIZE = 1000
+
+_resumen = {
+    "proyectos": {},    # proyecto_id -> totales
+    "proveedores": {},  # proveedor_id -> totales
+    "timestamp": 0,
+    "segundos_construccion": 0.0,
+    "filas": 0,
+    "generacion": 0,            # sube con cada invalidación
+    "generacion_construida": 0,  # generación vigente al empezar la última construcción
+}
+_resumen_lock = threading.Lock()  # serializa las construcciones
+_fondo = {"supabase": None, "hilo": None, "fallo": 0}
+_fondo_lock = threading.Lock()
+
+
+def _clave_id(valor):
+    """Ids de las distintas tablas comparables entre sí (int si es numérico)."""
+    if isinstance(valor, str) and valor.strip().isdigit():
+        return int(valor)
+    return valor
+
+
+def _monto(valor):
+    try:
+        return float(valor or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _leer_tabla(supabase, tabla, campos):
+    """Lee la tabla completa con paginación por id."""
+    rows = []
+    offset = 0
+    while True:
+        batch = (
+            supabase.table(tabla)
+            .select(campos)
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute().data or []
+        )
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    return rows
+
+
+def _construir(supabase):
+    presupuestos = _leer_tabla(supabase, "presupuesto", "id, proyecto_id, monto")
+    ops = _leer_tabla(supabase, "orden_de_pago", "id, orden_numero, proyecto, proveedor, costo_final_con_iva")
+    gastos = _leer_tabla(supabase, "gastos_directos", "id, proyecto_id, monto")
+    abonos = _leer_tabla(supabase, "abonos_op", "id, orden_numero, monto_abono")
+
+    proyectos = {}
+    proveedores = {}
+
+    def proyecto(pid):
+        return proyectos.setdefault(_clave_id(pid), {
+            "presupuesto": 0.0, "total_ordenes_pago": 0.0, "ordenes_pago": set(), "gastos_directos": 0.0,
+        })
+
+    def proveedor(pid):
+        return proveedores.setdefault(_clave_id(pid), {
+            "deuda": 0.0, "pagado": 0.0, "ordenes_pago": set(),
+        })
+
+    for p in presupuestos:
+        if p.get("proyecto_id") is not None:
+            proyecto(p["proyecto_id"])["presupuesto"] += _monto(p.get("monto"))
+
+    for g in gastos:
+        if g.get("proyecto_id") is not None:
+            proyecto(g["proyecto_id"])["gastos_directos"] += _monto(g.get("monto"))
+
+    # Una OP tiene varias líneas; los abonos se registran por orden_numero
+    proveedor_por_op = {}
+    for op in ops:
+        numero = _clave_id(op.get("orden_numero"))
+        costo = _monto(op.get("costo_final_con_iva"))
+        if op.get("proyecto") is not None:
+            p = proyecto(op["proyecto"])
+            p["total_ordenes_pago"] += costo
+            p["ordenes_pago"].add(numero)
+        if op.get("proveedor") is not None:
+            prov = proveedor(op["proveedor"])
+            prov["deuda"] += costo
+            prov["ordenes_pago"].add(numero)
+            proveedor_por_op.setdefault(numero, _clave_id(op["proveedor"]))
+
+    for ab in abonos:
+        prov_id = proveedor_por_op.get(_clave_id(ab.get("orden_numero")))
+        if prov_id is not None:
+            proveedores[prov_id]["pagado"] += _monto(ab.get("monto_abono"))
+
+    for p in proyectos.values():
+        p["ordenes_pago"] = len(p["ordenes_pago"])
+        p["total_real"] = p["total_ordenes_pago"] + p["gastos_directos"]
+        p["diferencia"] = p["presupuesto"] - p["total_real"]
+    for prov in proveedores.values():
+        prov["ordenes_pago"] = len(prov["ordenes_pago"])
+        prov["saldo"] = prov["deuda"] - prov["pagado"]
+
+    filas = len(presupuestos) + len(ops) + len(gastos) + len(abonos)
+    return proyectos, proveedores, filas
+
+
+def _vencido():
+    return (time.time() - _resumen["timestamp"] >= RESUMEN_TTL
+            or _resumen["generacion_construida"] != _resumen["generacion"])
+
+
+def _reconstruir(supabase, forzar=False):
+    """
+    Construye el resumen y lo publica. Devuelve False si falló (se sigue
+    sirviendo el anterior); sin resumen previo el error se propaga.
+    """
+    with _resumen_lock:
+        if not forzar and not _vencido():
+            return True
+        generacion = _resumen["generacion"]
+        inicio = time.time()
+        try:
+            proyectos, proveedores, filas = _construir(supabase)
+        except Exception as e:
+            logger.error(f"Error construyendo resúmenes financieros: {e}")
+            _fondo["fallo"] = time.time()
+            # Mejor servir datos viejos que fallar
+            if _resumen["timestamp"]:
+                return False
+            raise
+        _resumen["proyectos"] = proyectos
+        _resumen["proveedores"] = proveedores
+        _resumen["filas"] = filas
+        _resumen["generacion_construida"] = generacion
+        _resumen["timestamp"] = time.time()
+        _resumen["segundos_construccion"] = time.time() - inicio
+        logger.info(f"📊 Resúmenes financieros: {filas} filas en {_resumen['segundos_construccion']:.2f}s")
+    return True
+
+
+def _reconstruir_mientras_vencido(supabase):
+    # Si llega otra invalidación durante la construcción, se vuelve a construir
+    while _vencido():
+        if not _reconstruir(supabase):
+            break
+
+
+def _reconstruir_en_fondo():
+    """Lanza (si no hay una en curso) la reconstrucción en un hilo aparte."""
+    supabase = _fondo["supabase"]
+    if supabase is None or time.time() - _fondo["fallo"] < REINTENTO_SEGUNDOS:
+        return  # sin cliente aún: se construirá en la próxima consulta
+    with _fondo_lock:
+        if _fondo["hilo"] is not None and _fondo["hilo"].is_alive():
+            return
+        hilo = threading.Thread(target=_reconstruir_mientras_vencido, args=(supabase,),
+                                name="resumen-financiero", daemon=True)
+        _fondo["hilo"] = hilo
+    hilo.start()
+
+
+def _vigente(forzar=False):
+    """
+    Resumen a servir. La primera vez (o con forzar=True) se construye aquí;
+    si venció, se reconstruye en segundo plano y se devuelve el anterior.
+    """
+    if _fondo["supabase"] is None:
+        _fondo["supabase"] = current_app.config['SUPABASE']
+    if forzar or not _resumen["timestamp"]:
+        _reconstruir(_fondo["supabase"], forzar=forzar)
+    elif _vencido():
+        _reconstruir_en_fondo()
+    return _resumen
+
+
+_VACIO_PROYECTO = {
+    "presupuesto": 0.0, "total_ordenes_pago": 0.0, "ordenes_pago": 0, "gastos_directos": 0.0,
+    "total_real": 0.0, "diferencia": 0.0,
+}
+_VACIO_PROVEEDOR = {"deuda": 0.0, "pagado": 0.0, "saldo": 0.0, "ordenes_pago": 0}
+
+
+def resumen_proyecto(proyecto_id):
+    """Totales del proyecto (ceros si no tiene movimientos)."""
+    return dict(_vigente()["proyectos"].get(_clave_id(proyecto_id), _VACIO_PROYECTO))
+
+
+def resumen_proveedor(proveedor_id):
+    """Deuda, pagado y saldo del proveedor (ceros si no tiene OP)."""
+    return dict(_vigente()["proveedores"].get(_clave_id(proveedor_id), _VACIO_PROVEEDOR))
+
+
+def _descartar():
+    with _fondo_lock:
+        _resumen["generacion"] += 1
+    _reconstruir_en_fondo()
+
+
+def invalidar_resumenes(motivo=None):
+    """Marca los resúmenes para reconstruirlos (en segundo plano), en este worker y en los demás."""
+    vaciar_cache_local("resumen_financiero", motivo or "escritura")
+
+
+def _estadisticas():
+    return {
+        "ttl": RESUMEN_TTL,
+        "proyectos": len(_resumen["proyectos"]),
+        "proveedores": len(_resumen["proveedores"]),
+        "filas": _resumen["filas"],
+        "construccion_ms": round(_resumen["segundos_construccion"] * 1000, 1),
+        "edad_segundos": int(time.time() - _resumen["timestamp"]) if _resumen["timestamp"] else None,
+        "vencido": _vencido() if _resumen["timestamp"] else None,
+        "reconstruyendo": bool(_fondo["hilo"] is not None and _fondo["hilo"].is_alive()),
+    }
+
+
+registrar_cache_local("resumen_financiero", _estadisticas, _descartar,
+                      lambda: _vigente(forzar=True))
@@ -0,0 +1,163 @@
+# backend/utils/typeahead.py
+"""
+Índice de búsqueda en memoria para autocompletado (typeahead).
+
+Se construye sobre los catálogos de reference_data y se rehace solo cuando
+cambia la versión del catálogo, así cada tecla no genera una consulta
+ilike '%term%' en Postgres.
+
+- Texto plegado: sin tildes, minúsculas y espacios simples ("Peñalolén" ->
+  "penalolen").
+- Términos de 3+ caracteres: candidatos por intersección de trigramas y luego
+  verificación de subcadena (misma semántica que ilike '%term%').
+- Términos de 1-2 caracteres: solo comienzos de palabra.
+- Orden: exacto > el texto empieza con el término > una palabra empieza con
+  el término > lo contiene; a igual nivel, alfabético.
+"""
+import heapq
+import threading
+import unicodedata
+from backend.utils import reference_data
+
+# Filtros disponibles por nombre (la clave forma parte de la clave del índice)
+FILTROS = {
+    "activos": lambda row: bool(row.get("activo")),
+}
+
+# (catalogo, campos, filtro) -> índice
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def fold(texto):
+    """Pliega texto para comparar: sin tildes, minúsculas, espacios simples."""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _construir(catalogo, campos, filtro):
+    filtro_fn = FILTROS[filtro] if filtro else None
+    campo_orden = reference_data.CATALOGOS[catalogo]["nombre"]
+    entry = reference_data.get_catalogo(catalogo)
+
+    docs = []
+    for row in entry["rows"]:
+        if filtro_fn and not filtro_fn(row):
+            continue
+        textos = tuple(fold(row.get(c)) for c in campos)
+        if not any(textos):
+            continue
+        docs.append({"row": row, "textos": textos, "orden": fold(row.get(campo_orden))})
+    docs.sort(key=lambda d: d["orden"])
+
+    trigramas = {}
+    prefijos = {}
+    for i, doc in enumerate(docs):
+        tris = set()
+        for texto in doc["textos"]:
+            tris |= _trigramas(texto)
+            for palabra in texto.split():
+                for n in (1, 2):
+                    if len(palabra) >= n:
+                        prefijos.setdefault(palabra[:n], set()).add(i)
+        for tri in tris:
+            trigramas.setdefault(tri, []).append(i)
+
+    return {
+        "version": entry["version"],
+        "docs": docs,
+        "trigramas": trigramas,
+        "prefijos": prefijos,
+    }
+
+
+def _get_indice(catalogo, campos, filtro):
+    clave = (catalogo, tuple(campos), filtro)
+    version = reference_data.get_version(catalogo)
+    indice = _indices.get(clave)
+    if indice is not None and indice["version"] == version:
+        return indice
+    with _indices_lock:
+        indice = _indices.get(clave)
+        if indice is None or indice["version"] != reference_data.get_version(catalogo):
+            indice = _construir(catalogo, campos, filtro)
+            _indices[clave] = indice
+    return indice
+
+
+def _nivel(textos, q):
+    """Relevancia del documento para q (menor es mejor); None si no coincide."""
+    mejor = None
+    for texto in textos:
+        if not texto:
+            continue
+        if texto == q:
+            return 0
+        if texto.startswith(q):
+            nivel = 1
+        elif texto.find(" " + q) >= 0:
+            nivel = 2
+        elif q in texto:
+            nivel = 3
+        else:
+            continue
+        if mejor is None or nivel < mejor:
+            mejor = nivel
+    return mejor
+
+
+def _candidatos(indice, q):
+    if len(q) < 3:
+        return indice["prefijos"].get(q, ())
+    listas = []
+    for tri in _trigramas(q):
+        lista = indice["trigramas"].get(tri)
+        if not lista:
+            return ()
+        listas.append(lista)
+    listas.sort(key=len)
+    candidatos = set(listas[0])
+    for lista in listas[1:]:
+        candidatos.intersection_update(lista)
+        if not candidatos:
+            break
+    return candidatos
+
+
+def buscar(catalogo, term, limite=20, campos=None, filtro=None):
+    """
+    Filas del catálogo que coinciden con term, ordenadas por relevancia.
+    campos: columnas donde buscar (por defecto la columna nombre del catálogo).
+    filtro: clave de FILTROS (p.ej. "activos").
+    """
+    campos = tuple(campos or (reference_data.CATALOGOS[catalogo]["nombre"],))
+    indice = _get_indice(catalogo, campos, filtro)
+    q = fold(term)
+    if not q:
+        return primeros(catalogo, limite, campos=campos, filtro=filtro)
+
+    docs = indice["docs"]
+    ranking = []
+    for i in _candidatos(indice, q):
+        doc = docs[i]
+        nivel = _nivel(doc["textos"], q)
+        if len(q) < 3 and nivel == 3:
+            continue  # con 1-2 caracteres solo comienzos de palabra
+        if nivel is not None:
+            ranking.append((nivel, i))
+    # docs ya está en orden alfabético: i desempata
+    return [docs[i]["row"] for _, i in heapq.nsmallest(limite, ranking)]
+
+
+def primeros(catalogo, limite=20, campos=None, filtro=None):
+    """Primeras filas en orden alfabético (para el desplegable sin término)."""
+    campos = tuple(campos or (reference_data.CATALOGOS[catalogo]["nombre"],))
+    indice = _get_indice(catalogo, campos, filtro)
+    return [d["row"] for d in indice["docs"][:limite]]